@@ -0,0 +1,1396 @@
+from __future__ import annotations
+import os
+import time
+from collections import deque
+import asyncio
+from io import BufferedReader, TextIOWrapper
+from typing import TYPE_CHECKING, AsyncIterator, Callable
+from returns.result import Result, Success, Failure
+from Assistant.Model.Constant import OpenApiTool, RunWaitMode, MetadataKind, StreamEventKind, RegistryKind
+from Assistant.Model.RunWaiter import RunWaiter
+from Assistant.Model.SessionManager import SessionManager
+from Assistant.Model.ResponseCache import ResponseCache
+from Assistant.Model.MessageTranscript import MessageTranscript, ChatReply
+from Assistant.Model.MetadataCache import MetadataCache, MetadataIndex
+from Assistant.Model.BulkDeleter import BulkDeleter, BulkDeleteReport
+from Assistant.Model.GarbageCollector import GarbageCollector, GarbageReport
+from Assistant.Model.FileManifest import FileManifest, file_sha256
+from Assistant.Model.UploadPipeline import UploadPipeline, UploadReport
+from Assistant.Model.DataCompactor import DataCompactor, CompactionSpec, CompactionReport
+from Assistant.Model.VectorStoreSync import VectorStoreSync, VectorStoreSyncPlan, VectorStoreSyncReport
+from Assistant.Model.FileDownloader import FileDownloader, ByteBudget
+from Assistant.Model.OutputPrefetcher import OutputPrefetcher
+from Assistant.Model.IngestionJob import IngestionJob, VectorStoreIngestor
+from Assistant.Model.RequestScheduler import RequestScheduler
+from Assistant.Model.ClientFactory import ClientFactory
+from Assistant.Model.Metrics import MetricsRegistry
+from Assistant.Model.StreamPipeline import StreamPipeline, StreamEvent, sse_frame
+from Assistant.Model.ThreadReserve import ThreadReserve
+from Assistant.Model.BatchChat import BatchChat, BatchChatReport
+from Assistant.Model.Registry import Registry, RegistryRecord, DefaultSessionKey
+
+if TYPE_CHECKING:
+    from openai.resources.beta.assistants import Assistant, AsyncCursorPage
+    from openai.types import FileDeleted
+    from openai.types.beta import VectorStore, VectorStoreDeleted
+    from openai.types.beta.assistant_deleted import AssistantDeleted
+    from openai.types.beta.threads.message import Message
+    from openai.types.beta.threads.run import Run
+    from openai.pagination import AsyncPage
+    from openai.types.file_object import FileObject
+    from openai.types.beta.thread import Thread
+
+# 自定義的GPT小助手class (非同步版本 / asyncio)
+class AsyncCustomAssistant:
+
+    def __init__(self, api_key: str, file_folder_path: str, download_folder_path: str, max_sessions: int = 1000, session_idle_timeout: float | None = 1800.0, metadata_ttl: float | None = 300.0, scheduler: RequestScheduler | None = None, metrics: MetricsRegistry | None = None, base_url: str | None = None, response_cache: ResponseCache | None = None, max_history: int = 100, client_factory: ClientFactory | None = None, thread_reserve: int = 0, run_timeout: float | None = 600.0, registry: Registry | None = None):
+        """
+        初始化助手 (所有API都是coroutine，可以在同一個event loop上同時跑很多個對話)
+
+        參數:
+            api_key: OpenAI的API-Key
+            file_folder_path: 要上傳的檔案資料夾路徑
+            download_folder_path: 要下載檔案的資料夾路徑
+            max_sessions: 最多同時保留的對話 (Thread) 數量
+            session_idle_timeout: 對話閒置多久 (秒) 後移除
+            metadata_ttl: 助手 / 檔案 / VectorStore列表快取的有效時間 (秒)
+            scheduler: 所有API請求共用的排程器 (限流 / 優先權 / 重試) (None = 整個程式共用的那一個)
+            metrics: 效能指標 (None = 整個程式共用的那一個，預設是關閉的)
+            base_url: API的網址 (None = OpenAI官方，測效能時可以指到本地的MockServer)
+            response_cache: chat()回答的快取 (None = 不使用快取)
+            max_history: 每個對話最多保留的本地對話記錄數量
+            client_factory: 建立client的ClientFactory (同一個API-Key + 網址共用連線池) (None = 整個程式共用的那一個)
+            thread_reserve: 預先建立的Thread數量 (0 = 第一次對話時才建立)
+            run_timeout: 每個Run最多等多久 (秒)，超過就取消 (None = 不限制)
+            registry: 本地的遠端物件登錄 (記錄建立過的助手 / Thread / 檔案 / VectorStore，重開程式後可以接回Thread) (None = 不使用)
+        """
+        self.scheduler = scheduler or RequestScheduler.default()
+        self.metrics = metrics or MetricsRegistry.default()
+        self.client_factory = client_factory or ClientFactory.default()
+        self.client = self.client_factory.async_client(api_key, base_url, self.scheduler, self.metrics)
+        self.file_folder_path = file_folder_path
+        self.download_folder_path = download_folder_path
+        self.assistant = None
+        self.assistant_loader = None
+        self.thread = None
+        self.thread_lock = asyncio.Lock()
+        self.thread_reserve = ThreadReserve(thread_reserve)
+        self.assistant_id = None
+        self.run_waiter = RunWaiter()
+        self.run_timeout = run_timeout
+        self.registry = registry
+        self.resume = False
+        self.transcript = MessageTranscript()
+        self.sessions = SessionManager(max_sessions=max_sessions, idle_timeout=session_idle_timeout, onEvicted=lambda session: self.transcript.forget(session.thread_id), max_history=max_history)
+        self.response_cache = response_cache
+        self.default_history = deque(maxlen=max_history)
+        self.metadata_cache = MetadataCache(ttl=metadata_ttl)
+        self.upload_manifest_path = f"{file_folder_path}/.upload_manifest.json"
+        self.vector_store_manifest_path = f"{file_folder_path}/.vector_store_manifest.json"
+        self.file_downloader = FileDownloader()
+        self.output_prefetcher = OutputPrefetcher(self.file_downloader, download_folder_path)
+        self.vector_store_ingestor = VectorStoreIngestor()
+
+    async def create(self, name: str, instructions: str, model: str = "gpt-4o") -> str:
+        """
+        建立助手
+
+        參數:
+            name: 助手名稱
+            instructions: 助手描述
+            model: GPT模型名稱
+        回傳:
+            str: 助手Id
+        """
+        self.assistant = await self.client.beta.assistants.create(name=name, instructions=instructions, model=model)
+        self.assistant_id = self.assistant.id
+        self.assistant_loader = None
+        self.thread = None
+        self.resume = False
+        await self.__remember__(MetadataKind.Assistant, self.assistant)
+        self.__reserve_threads__()
+
+        return self.assistant.id
+
+    async def items(self, order: str = "desc") -> AsyncCursorPage[Assistant]:
+        """
+        取得建立好的助手們
+
+        參數:
+            order: 照建立的順序排序
+        回傳:
+            AsyncCursorPage[Assistant]
+        """
+        return await self.client.beta.assistants.list(order=order)
+
+    async def upload_file_items(self) -> AsyncPage[FileObject]:
+        """
+        取得上傳好的檔案們
+
+        回傳:
+            AsyncPage[FileObject]
+        """
+        return await self.client.files.list()
+
+    async def vector_store_items(self, order: str = "desc") -> AsyncCursorPage[VectorStore]:
+        """
+        取得上傳傳好的向量資料們
+
+        參數:
+            order: 照建立的順序排序
+        回傳:
+            AsyncCursorPage[VectorStore]
+        """
+        return await self.client.beta.vector_stores.list(order=order)
+
+    async def remove_by_id(self, assistant_id: str) -> AssistantDeleted:
+        """
+        刪除該Id的助手
+
+        參數:
+            assistant_id: 助手Id
+        回傳:
+            AssistantDeleted
+        """
+        info = await self.client.beta.assistants.delete(assistant_id=assistant_id)
+        if info.deleted: await self.__forget__(MetadataKind.Assistant, assistant_id)
+
+        return info
+
+    async def remove_by_name(self, assistant_name: str, max_workers: int = 8, requests_per_second: float = 5.0) -> BulkDeleteReport:
+        """
+        刪除該名稱的助手們 (同時刪除 + 限流 + 暫時性錯誤重試)
+
+        參數:
+            assistant_name: 助手名稱
+            max_workers: 最多同時刪除的數量
+            requests_per_second: 每秒最多的刪除請求數
+        回傳:
+            BulkDeleteReport: 刪除成功 / 失敗 / 略過的Id們 (count = 被刪除同名稱的助手數量)
+        """
+        items = await self.find_by_name(assistant_name, refresh=True)
+        deleter = BulkDeleter(max_workers=max_workers, requests_per_second=requests_per_second)
+
+        return await deleter.run_async([item.id for item in items], self.remove_by_id)
+
+    async def remove_vector_store_by_id(self, id: str) -> VectorStoreDeleted:
+        """
+        刪除該Id的VectorStore
+
+        參數:
+            id: VectorStoreId
+        回傳:
+            VectorStoreDeleted
+        """
+        info = await self.client.beta.vector_stores.delete(id)
+        if info.deleted: await self.__forget__(MetadataKind.VectorStore, id)
+
+        return info
+
+    async def remove_vector_stores_by_name(self, name: str, max_workers: int = 8, requests_per_second: float = 5.0) -> BulkDeleteReport:
+        """
+        刪除該名稱的VectorStore們 (同時刪除 + 限流 + 暫時性錯誤重試)
+
+        參數:
+            name: VectorStore名稱
+            max_workers: 最多同時刪除的數量
+            requests_per_second: 每秒最多的刪除請求數
+        回傳:
+            BulkDeleteReport: 刪除成功 / 失敗 / 略過的Id們 (count = 被刪除同名稱的VectorStore數量)
+        """
+        items = await self.find_vector_stores_by_name(name, refresh=True)
+        deleter = BulkDeleter(max_workers=max_workers, requests_per_second=requests_per_second)
+
+        return await deleter.run_async([item.id for item in items], self.remove_vector_store_by_id)
+
+    async def remove_upload_file_by_id(self, id: str) -> FileDeleted:
+        """
+        刪除該File_Id的檔案
+
+        參數:
+            id: File_Id
+        回傳:
+            FileDeleted
+        """
+        info = await self.client.files.delete(id)
+        if info.deleted: await self.__forget__(MetadataKind.UploadFile, id)
+
+        return info
+
+    async def remove_upload_files_by_name(self, name: str, max_workers: int = 8, requests_per_second: float = 5.0) -> BulkDeleteReport:
+        """
+        刪除該名稱的檔案們 (同時刪除 + 限流 + 暫時性錯誤重試)
+
+        參數:
+            name: 檔案名稱
+            max_workers: 最多同時刪除的數量
+            requests_per_second: 每秒最多的刪除請求數
+        回傳:
+            BulkDeleteReport: 刪除成功 / 失敗 / 略過的Id們 (count = 被刪除同名稱的檔案數量)
+        """
+        items = await self.find_upload_files_by_name(name, refresh=True)
+        deleter = BulkDeleter(max_workers=max_workers, requests_per_second=requests_per_second)
+
+        return await deleter.run_async([item.id for item in items], self.remove_upload_file_by_id)
+
+    async def collect_garbage(self, dry_run: bool = True, grace_period: float = 86400.0, max_requests: int | None = 1000, max_workers: int = 8, requests_per_second: float = 5.0, protected_ids: list[str] | None = None) -> GarbageReport:
+        """
+        回收沒有被任何助手的tool_resources用到的上傳檔案 / VectorStore (重複上傳後被取代的舊檔案)
+
+        參數:
+            dry_run: True = 只列出不刪除
+            grace_period: 建立多久 (秒) 以上的孤兒才會刪除 (避免刪到剛上傳還沒掛上去的 / Thread用到的)
+            max_requests: 這次最多的請求數 (列表的每一頁 + 每個刪除，None = 不限制)
+            max_workers: 最多同時刪除的數量
+            requests_per_second: 每秒最多的刪除請求數
+            protected_ids: 不能刪除的FILE_ID / VECTOR_STORE_ID們
+        回傳:
+            GarbageReport: 引用中的Id們 / 孤兒 (Id => bytes) / 刪除結果 (complete = False 時表示額度不夠，沒掃描完)
+        """
+        collector = GarbageCollector(grace_period=grace_period, max_requests=max_requests, max_workers=max_workers, requests_per_second=requests_per_second)
+        return await collector.run_async(self.client, self.remove_upload_file_by_id, self.remove_vector_store_by_id, dry_run=dry_run, protected_ids=protected_ids or ())
+
+    async def find_by_id(self, assistant_id: str, refresh: bool = False) -> Result[Assistant, Exception]:
+        """
+        使用「助手Id」找出該建立好的助手
+
+        參數:
+            assistant_id: 助手Id
+            refresh: 是否略過快取，直接向遠端查詢
+        回傳:
+            Result[Assistant, Exception]
+        """
+        assistant = None if refresh else self.metadata_cache.get(MetadataKind.Assistant, assistant_id)
+        if assistant: return Success(assistant)
+
+        try:
+            assistant = await self.client.beta.assistants.retrieve(assistant_id=assistant_id)
+            await self.__remember__(MetadataKind.Assistant, assistant)
+            return Success(assistant)
+        except Exception as error:
+            return Failure(error)
+
+    async def find_by_name(self, assistant_name: str, refresh: bool = False) -> list[Assistant]:
+        """
+        使用「助手名稱」找出該建立好的助手們
+
+        參數:
+            assistant_name: 助手名稱
+            refresh: 是否略過快取，重新向遠端列出全部
+        回傳:
+            list[Assistant]: 同名的助手們
+        """
+        return await self.__find_metadata_by_name__(MetadataKind.Assistant, assistant_name, refresh)
+
+    async def find_upload_files_by_name(self, name: str, refresh: bool = False) -> list[FileObject]:
+        """
+        使用「檔案名稱」找出該建立好的檔案們
+
+        參數:
+            name: 檔案名稱
+            refresh: 是否略過快取，重新向遠端列出全部
+        回傳:
+            list[FileObject]: 同名的檔案們
+        """
+        return await self.__find_metadata_by_name__(MetadataKind.UploadFile, name, refresh)
+
+    async def find_vector_stores_by_name(self, name: str, refresh: bool = False) -> list[VectorStore]:
+        """
+        使用「Vector-Store名稱」找出該建立好的Vector-Store們
+
+        參數:
+            name: Store名稱
+            refresh: 是否略過快取，重新向遠端列出全部
+        回傳:
+            list[VectorStore]: 同名的VectorStore們
+        """
+        return await self.__find_metadata_by_name__(MetadataKind.VectorStore, name, refresh)
+
+    async def find_upload_files_by_hash(self, sha256: str) -> list[FileObject]:
+        """
+        使用「檔案內容的SHA-256」找出上傳過的檔案們 (registry只提供候選Id，逐一向遠端確認還存在)
+
+        參數:
+            sha256: SHA-256
+        回傳:
+            list[FileObject]: 內容一樣的檔案們 (沒有registry = [])
+        """
+        if self.registry is None: return []
+        objects, _ = await self.__confirm_registry__(MetadataKind.UploadFile, await self.registry.find_by_sha256_async(RegistryKind.UploadFile, sha256))
+        return objects
+
+    async def use_by_id(self, assistant_id: str, lazy: bool = False, resume: bool = False) -> Result[str, Exception]:
+        """
+        利用「助手id」來使用助手 (Thread在第一次對話時才建立 / 從預先建立好的拿)
+
+        參數:
+            assistant_id: 助手id
+            lazy: 是否在背景取得助手 (不等待，馬上回傳助手id，用到助手物件時才等待)
+            resume: 是否接回registry裡該助手之前的Thread們 (預設的Thread / 每個session_key最後使用的Thread)
+        回傳:
+            Result[<助手名稱> (lazy = <助手id>), Exception]
+        """
+        try:
+            self.assistant_id = assistant_id
+            self.thread = None
+            self.resume = resume and self.registry is not None
+            self.__reserve_threads__()
+
+            if lazy:
+                self.assistant = None
+                self.assistant_loader = asyncio.create_task(self.client.beta.assistants.retrieve(assistant_id=assistant_id))
+                return Success(assistant_id)
+
+            self.assistant = await self.client.beta.assistants.retrieve(assistant_id=assistant_id)
+            self.assistant_loader = None
+            await self.__remember__(MetadataKind.Assistant, self.assistant)
+
+            return Success(self.assistant.name)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def ready(self) -> Result[str, Exception]:
+        """
+        等待背景取得的助手 (use_by_id(lazy = True))
+
+        回傳:
+            Result[<助手名稱>, Exception]
+        """
+        try:
+            assistant = await self.__ready__()
+            return Success(assistant.name) if assistant else Failure(ValueError("還沒有使用助手…"))
+        except Exception as error:
+            return Failure(error)
+
+    async def use_by_name(self, assistant_name: str, refresh: bool = False) -> Result[str, Exception]:
+        """
+        利用「助手名稱」來使用找到的第一個助手
+
+        參數:
+            assistant_name: 助手名稱
+            refresh: 是否略過快取，重新向遠端列出全部
+        回傳:
+            Result[<助手名稱>, Exception]
+        """
+        assistants = await self.find_by_name(assistant_name, refresh)
+
+        if not assistants: return Failure(ValueError("找不到助手…"))
+        return await self.use_by_id(assistants[0].id)
+
+    async def update(self, parameters: dict) -> Result[str, Exception]:
+        """
+        更新助手資料
+
+        參數:
+            parameters: 要更新的相關參數
+        回傳:
+            Result[<助手Id>, Exception]
+        """
+        if not parameters: return Failure(ValueError("沒有任何參數…"))
+
+        try:
+            assistant = await self.client.beta.assistants.update(
+                assistant_id = self.assistant_id,
+                **parameters
+            )
+            await self.__assistant_updated__(assistant)
+            return Success(assistant.id)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def update_information(self, name: str | None, instructions: str | None, model: str | None) -> Result[str, Exception]:
+        """
+        更新助手的基本資料
+
+        參數:
+            name: 助手名稱
+            instructions: 助手敘述
+            model: 使用模型
+        回傳:
+            Result[<助手Id>, Exception]
+        """
+        parameters = {}
+
+        if (name != None and name.strip() != None): parameters["name"] = name
+        if (instructions != None and instructions.strip() != None): parameters["instructions"] = instructions
+        if (model != None and model.strip() != None): parameters["model"] = model
+
+        return await self.update(parameters)
+
+    async def update_tools(self, tools: list[OpenApiTool]) -> Result[str, Exception]:
+        """
+        開關助手的功能 (File Search / Code Interpreter)
+
+        參數:
+            tools: list[OpenApiTool]
+        回傳:
+            Result[<助手Id>, Exception]
+        """
+        parameters = {}
+        parameters["tools"] = [{ "type": tool.value } for tool in tools]
+
+        return await self.update(parameters)
+
+    async def upload_file_for_file_search(self, filename: str) -> Result[dict, Exception]:
+        """
+        上傳純文字說明檔 for File Search功能 (.txt / ...)
+
+        參數:
+            filename: 檔案名稱
+        回傳:
+            Result[<上傳檔案的Id資訊>, Exception]
+        """
+        result = await self.upload_vector_store_file(filename)
+
+        match result:
+            case Failure(error): return Failure(error)
+            case Success(vector_store_id):
+                try:
+                    assistant = await self.client.beta.assistants.update(
+                        assistant_id = self.assistant_id,
+                        tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+                    )
+                    await self.__assistant_updated__(assistant)
+                    return Success({ vector_store_id: filename })
+                except Exception as error:
+                    return Failure(error)
+
+    async def upload_file_for_code_interpreter(self, filename: str) -> Result[dict, Exception]:
+        """
+        上傳要傳成向量的資料檔 for Code Interpreter功能 (.txt / .csv / .xlsx / ...)
+
+        參數:
+            filename: 檔案名稱
+        回傳:
+            Result[<上傳檔案的Id資訊>, Exception]
+        """
+        result = await self.upload_code_interpreter_file(filename)
+
+        match result:
+            case Failure(error): return Failure(error)
+            case Success(file_id):
+                try:
+                    assistant = await self.client.beta.assistants.update(
+                        assistant_id = self.assistant_id,
+                        tool_resources={"code_interpreter": {"file_ids": [file_id]}},
+                    )
+                    await self.__assistant_updated__(assistant)
+                    return Success({ file_id: filename })
+                except Exception as error:
+                    return Failure(error)
+
+    async def ingest_files_for_file_search(self, filenames: list[str], name: str | None = None, attach: bool = True, onDone: Callable[[IngestionJob], None] | None = None) -> Result[IngestionJob, Exception]:
+        """
+        上傳檔案們到新的VectorStore for File Search (不等向量化完成，馬上回傳IngestionJob)
+          - 上傳 / 向量化 / 輪詢狀態都在背景進行，job.progress() = 目前的狀態與檔案數量
+          - 完成後才把VectorStore掛到助手上 (attach = True)，在這之前對話還是使用之前的VectorStore
+          - 上傳的檔案會記到快取 + registry，沒有完成時刪除這次建立的VectorStore與檔案們 (刪除失敗的FILE_ID們留在job.progress())
+
+        參數:
+            filenames: 檔案們的名稱
+            name: VectorStore名稱 (None = 第一個檔案的名稱)
+            attach: 完成後是否把助手的File Search設定成這個VectorStore
+            onDone: 工作結束時呼叫 ((IngestionJob) => None，成功 / 失敗都會呼叫)
+        回傳:
+            Result[IngestionJob, Exception]: job.result() / await job.result_async() = Result[<VECTOR_STORE_ID>, Exception]
+        """
+        try:
+            vector_store = await self.client.beta.vector_stores.create(name=name or filenames[0])
+            await self.__remember__(MetadataKind.VectorStore, vector_store, owner=self.assistant_id)
+        except Exception as error:
+            return Failure(error)
+
+        assistant_id = self.assistant_id
+        file_paths = { filename: f"{self.file_folder_path}{filename}" for filename in filenames }
+        onReady = (lambda vector_store_id: self.__attach_vector_store__(assistant_id, vector_store_id)) if attach else None
+        onUploaded = lambda file_path, upload_file: self.__remember_ingested_file__(file_path, upload_file, assistant_id)
+        job = self.vector_store_ingestor.submit_async(self.client, vector_store.id, file_paths, onReady, onUploaded, self.__discard_ingestion__)
+        if onDone: job.add_done_callback(onDone)
+
+        return Success(job)
+
+    async def upload_files_for_code_interpreter(self, filenames: list[str], max_workers: int = 4) -> Result[UploadReport, Exception]:
+        """
+        上傳要傳成向量的資料檔們 for Code Interpreter功能 (.txt / .csv / .xlsx / ...)
+          - 平行上傳，內容沒變的檔案直接沿用之前的FILE_ID (記錄在upload_manifest_path)
+          - 單一檔案失敗不會中斷，會記錄在UploadReport.failed
+
+        參數:
+            filenames: 檔案們的名稱
+            max_workers: 最多同時上傳的檔案數量
+        回傳:
+            Result[UploadReport, Exception]: UploadReport.files = 上傳檔案們的Id資訊
+        """
+        manifest = FileManifest(self.upload_manifest_path)
+        pipeline = UploadPipeline(manifest, max_workers=max_workers)
+        files = { filename: f"{self.file_folder_path}/{filename}" for filename in filenames }
+        report = await pipeline.run_async(files, self.upload_code_interpreter_file, self.__upload_file_exists__)
+
+        try:
+            assistant = await self.client.beta.assistants.update(
+                assistant_id = self.assistant_id,
+                tool_resources={"code_interpreter": {"file_ids": list(report.files.keys())}},
+            )
+            await self.__assistant_updated__(assistant)
+            return Success(report)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def upload_compacted_files_for_code_interpreter(self, filenames: list[str], specs: dict[str, CompactionSpec] | None = None, default_spec: CompactionSpec | None = None, bundle: bool = True, max_workers: int = 4) -> Result[CompactionReport, Exception]:
+        """
+        先在本地壓縮資料檔們再上傳 for Code Interpreter功能 (上傳 / 沙盒載入的時間跟檔案大小有關)
+          - .xlsx => CSV / Parquet、只保留需要的工作表 / 欄位 (specs)、JSON => CSV
+          - 一列一列串流處理 + 多個process同時處理，輸出到file_folder_path/.compacted/
+          - 小檔案們打包成一個zip (bundle = True)
+          - 壓縮失敗的檔案上傳原始檔案 (CompactionReport.failed)
+
+        參數:
+            filenames: 檔案們的名稱
+            specs: 檔案名稱 => CompactionSpec (format / sheets / columns)
+            default_spec: 沒有設定的檔案使用的CompactionSpec (None = 轉成CSV，保留全部)
+            bundle: 是否把小檔案們打包成zip
+            max_workers: 最多同時壓縮 / 上傳的檔案數量
+        回傳:
+            Result[CompactionReport, Exception]: results = 每個檔案省下的大小 (saved_bytes)，upload = UploadReport
+        """
+        try:
+            compactor = DataCompactor(f"{self.file_folder_path}/.compacted", max_workers=max_workers, bundle_max_bytes=1024 * 1024 if bundle else 0)
+            files = { filename: f"{self.file_folder_path}/{filename}" for filename in filenames }
+            report = await asyncio.to_thread(compactor.run, files, specs, default_spec)
+
+            pipeline = UploadPipeline(FileManifest(self.upload_manifest_path), max_workers=max_workers)
+            files = { os.path.relpath(file_path, self.file_folder_path): file_path for file_path in report.files.values() }
+            report.upload = await pipeline.run_async(files, self.upload_code_interpreter_file, self.__upload_file_exists__)
+
+            assistant = await self.client.beta.assistants.update(
+                assistant_id = self.assistant_id,
+                tool_resources={"code_interpreter": {"file_ids": list(report.upload.files.keys())}},
+            )
+            await self.__assistant_updated__(assistant)
+            return Success(report)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def sync_vector_store(self, name: str, max_workers: int = 4, batch_size: int = 500) -> Result[VectorStoreSyncReport, Exception]:
+        """
+        把file_folder_path整個資料夾同步到同一個具名的VectorStore for File Search
+          - 用清單檔 (vector_store_manifest_path) 比對，只上傳 / 取代 / 移除有變動的檔案
+          - 新檔案用file_batches整批加入，成功後才移除舊檔案
+          - 最後把助手的File Search設定成這個VectorStore
+
+        參數:
+            name: VectorStore名稱 (不存在就建立)
+            max_workers: 最多同時上傳的檔案數量
+            batch_size: 每個file_batch最多的檔案數量
+        回傳:
+            Result[VectorStoreSyncReport, Exception]
+        """
+        try:
+            stores = await self.find_vector_stores_by_name(name)
+            vector_store = stores[0] if stores else await self.client.beta.vector_stores.create(name=name)
+            if not stores: await self.__remember__(MetadataKind.VectorStore, vector_store, owner=self.assistant_id)
+
+            sync = VectorStoreSync(self.file_folder_path, FileManifest(self.vector_store_manifest_path), vector_store.id)
+            plan = await asyncio.to_thread(sync.plan)
+            report = VectorStoreSyncReport(vector_store_id=vector_store.id, unchanged=len(plan.unchanged))
+
+            uploaded = await self.__upload_sync_files__(sync, plan, report, max_workers)
+            await self.__attach_sync_files__(sync, plan, report, uploaded, batch_size)
+            await self.__detach_sync_files__(sync, plan, report)
+            await asyncio.to_thread(sync.manifest.save)
+
+            assistant = await self.client.beta.assistants.update(
+                assistant_id = self.assistant_id,
+                tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}},
+            )
+            await self.__assistant_updated__(assistant)
+            return Success(report)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def upload_vector_store_file(self, filename: str) -> Result[str, Exception]:
+        """
+        將檔案上傳到知識庫 for File Search，然後取得VECTOR_STORE_ID
+
+        參數:
+            filename: 檔案名稱
+        回傳:
+            Result[<VECTOR_STORE_ID>, Exception]
+        """
+        file_path = f"{self.file_folder_path}{filename}"
+        result = self.__open_file__(file_path)
+
+        match result:
+            case Failure(error): return Failure(error)
+            case Success(file):
+                try:
+                    with file:
+                        vector_store = await self.client.beta.vector_stores.create(name=filename)
+                        await self.__remember__(MetadataKind.VectorStore, vector_store, owner=self.assistant_id)
+                        response = await self.client.beta.vector_stores.file_batches.upload_and_poll(vector_store_id=vector_store.id, files=[file])
+
+                    if response.status == "completed": return Success(vector_store.id)
+                    return Failure(RuntimeError(f"向量化失敗 (status={response.status})"))
+                except Exception as error:
+                    return Failure(error)
+
+    async def upload_code_interpreter_file(self, filename: str) -> Result[str, Exception]:
+        """
+        將檔案上傳到知識庫 for Code Interpreter，然後取得FILE_ID
+
+        參數:
+            filename: 檔案名稱
+        回傳:
+            Result[<FILE_ID>, Exception]
+        """
+        file_path = f"{self.file_folder_path}/{filename}"
+        result = self.__open_file__(file_path)
+
+        match result:
+            case Failure(error): return Failure(error)
+            case Success(file):
+                try:
+                    with file: upload_file = await self.client.files.create(file=file, purpose="assistants")
+                    await self.__remember__(MetadataKind.UploadFile, upload_file, sha256=await asyncio.to_thread(file_sha256, file_path) if self.registry is not None else None, owner=self.assistant_id)
+                    return Success(upload_file.id)
+                except Exception as error:
+                    return Failure(error)
+
+    async def download_file(self, file_id: str) -> Result[bytes, Exception]:
+        """
+        檔案下載 (Purpose = assistants_output)
+
+        參數:
+            file_id: str
+        回傳:
+            Result[<二進制檔案>, Exception]
+        """
+        try:
+            response = await self.client.files.with_raw_response.content(file_id)
+            if (response.status_code != 200): return Failure(RuntimeError(f"下載失敗 (code={response.status_code})"))
+            return Success(response.content)
+        except Exception as error:
+            return Failure(error)
+
+    async def save_file(self, file_id: str, extension: str | None = None, sha256: str | None = None) -> Result[str, Exception]:
+        """
+        儲存下載的檔案 (Purpose = assistants_output)
+          - 串流寫入暫存檔，完成後才rename，中斷的話下次會續傳
+
+        參數:
+            file_id: str
+            extension: 要存的檔案副檔名 (jpg / png / csv) (None = 依檔頭 / 檔名自動判斷)
+            sha256: 預期的SHA-256 (None = 不驗證)
+        回傳:
+            Result[<檔案存檔路徑>, Exception]
+        """
+        return await self.output_prefetcher.save_async(self.client, file_id, extension=extension, sha256=sha256)
+
+    async def save_files(self, files: dict[str, str | None], max_workers: int = 4, max_bytes_in_flight: int = 256 * 1024 * 1024) -> dict[str, Result[str, Exception]]:
+        """
+        同時儲存多個下載的檔案 (Purpose = assistants_output)
+          - 依檔案大小限制同時下載的總量，大檔案不會一起塞爆記憶體 / 頻寬
+
+        參數:
+            files: FILE_ID => 要存的檔案副檔名 (None = 自動判斷)
+            max_workers: 最多同時下載的檔案數量
+            max_bytes_in_flight: 同時下載中的檔案總大小上限
+        回傳:
+            dict[<FILE_ID>, Result[<檔案存檔路徑>, Exception]]
+        """
+        budget = ByteBudget(max_bytes_in_flight)
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def save(file_id: str, extension: str) -> tuple[str, Result[str, Exception]]:
+            async with semaphore:
+                try:
+                    size = (await self.client.files.retrieve(file_id)).bytes or 0
+                except Exception as error:
+                    return file_id, Failure(error)
+
+                await budget.acquire_async(size)
+                try:
+                    return file_id, await self.save_file(file_id, extension)
+                finally:
+                    await budget.release_async(size)
+
+        return dict(await asyncio.gather(*(save(file_id, extension) for file_id, extension in files.items())))
+
+    async def vector_store_id_exists(self, vector_store_id: str, refresh: bool = False) -> bool:
+        """
+        測試VectorStoreId是否存在 / 已建立
+
+        參數:
+            vector_store_id: str
+            refresh: 是否略過快取，重新向遠端列出全部
+        回傳:
+            bool
+        """
+        if not refresh and self.metadata_cache.is_fresh(MetadataKind.VectorStore):
+            return self.metadata_cache.get(MetadataKind.VectorStore, vector_store_id) is not None
+
+        index = await self.refresh_metadata(MetadataKind.VectorStore)
+        return vector_store_id in index.objects
+
+    async def refresh_metadata(self, kind: MetadataKind) -> MetadataIndex:
+        """
+        重新向遠端列出全部的助手 / 檔案 / VectorStore，並更新快取
+
+        參數:
+            kind: MetadataKind
+        回傳:
+            MetadataIndex
+        """
+        match kind:
+            case MetadataKind.Assistant: objects = [item async for item in await self.items()]
+            case MetadataKind.UploadFile: objects = [item async for item in await self.upload_file_items()]
+            case MetadataKind.VectorStore: objects = [item async for item in await self.vector_store_items()]
+
+        return self.metadata_cache.load(kind, objects)
+
+    async def chat(self, content: str, delay_timeTime: float = 1.0, mode: RunWaitMode = RunWaitMode.Polling, session_key: str | None = None, use_cache: bool = False, timeout: float | None = None, hedge_after: float | None = None) -> Result[str, Exception]:
+        """
+        跟已建立好的「助手」詢問 / 對話 (等待時不會卡住event loop)
+
+        參數:
+            content: 對話文字內容
+            delay_timeTime: 輪詢間隔時間的上限 (一開始會快速輪詢，之後指數退避到這個值)
+            mode: 等待Run完成的方式 (Polling = 輪詢 / Streaming = 串流事件，不輪詢)
+            session_key: 對話的Key (None = 使用預設的self.thread)
+            use_cache: 是否使用response_cache (只有還沒有對話內容的新對話會用，有快取的回答就不呼叫API)
+            timeout: 這次的Run最多等多久 (秒)，超過就取消並回傳TimeoutError (None = run_timeout)
+            hedge_after: Run排隊超過幾秒，就用新的Thread再送出一次 (只有Polling + 還沒有對話內容的新對話，先完成的勝出，None = 不對沖)
+        回傳:
+            Result[str, Exception]
+        """
+        return (await self.chat_reply(content, delay_timeTime, mode, session_key, use_cache, timeout, hedge_after)).map(lambda reply: reply.text)
+
+    async def chat_reply(self, content: str, delay_timeTime: float = 1.0, mode: RunWaitMode = RunWaitMode.Polling, session_key: str | None = None, use_cache: bool = False, timeout: float | None = None, hedge_after: float | None = None) -> Result[ChatReply, Exception]:
+        """
+        跟已建立好的「助手」詢問 / 對話 (回傳完整的回答：所有的內容區塊 / 註解 / 圖片FileId)
+          - Run結束後只取該Run產生的訊息，不會列出整個Thread
+
+        參數:
+            content: 對話文字內容
+            delay_timeTime: 輪詢間隔時間的上限
+            mode: 等待Run完成的方式 (Polling = 輪詢 / Streaming = 串流事件，不輪詢)
+            session_key: 對話的Key (None = 使用預設的self.thread)
+            use_cache: 是否使用response_cache (只有還沒有對話內容的新對話會用，快取的回答只有文字)
+            timeout: 這次的Run最多等多久 (秒) (None = run_timeout)
+            hedge_after: Run排隊超過幾秒，就用新的Thread再送出一次 (只有新對話會對沖，對沖勝出時改用新的Thread)
+        回傳:
+            Result[ChatReply, Exception]
+        """
+        started_at = time.perf_counter()
+        result = await self.__chat__(content, delay_timeTime, mode, session_key, use_cache, timeout, hedge_after)
+
+        self.metrics.record("chat", time.perf_counter() - started_at, error=not isinstance(result, Success))
+        return result
+
+    async def __chat__(self, content: str, delay_timeTime: float, mode: RunWaitMode, session_key: str | None, use_cache: bool, timeout: float | None, hedge_after: float | None) -> Result[ChatReply, Exception]:
+        try:
+            if not content.strip(): return Failure(ValueError("不得輸入空白字串…"))
+
+            cache = self.response_cache if use_cache and self.response_cache is not None and await self.__ready__() and await self.__stateless__(session_key) else None
+            version = ResponseCache.version(self.assistant) if cache is not None else None
+            cached = await cache.get_async(self.assistant.id, version, content) if cache is not None else None
+
+            if cached is not None:
+                self.metrics.increment("response_cache_hits_total", "chat")
+                self.__record_exchange__(session_key, content, cached, cached=True)
+                return Success(ChatReply(cached, cached=True))
+
+            hedge_after = hedge_after if hedge_after is not None and await self.__stateless__(session_key) else None
+            thread_id = await self.__thread_id__(session_key)
+            await self.__input_content__(content, thread_id=thread_id)
+
+            timeout = self.run_timeout if timeout is None else timeout
+
+            match mode:
+                case RunWaitMode.Streaming:
+                    run, timing = await self.run_waiter.stream_async(self.client, thread_id, self.assistant_id, timeout=timeout)
+                case _:
+                    hedge = (lambda: self.client.beta.threads.create_and_run(assistant_id=self.assistant_id, thread={ "messages": [{ "role": "user", "content": content }] })) if hedge_after is not None else None
+                    run = await self.client.beta.threads.runs.create(thread_id=thread_id, assistant_id=self.assistant_id)
+                    run, timing = await self.run_waiter.wait_async(self.client, thread_id, run, max_delay=delay_timeTime, timeout=timeout, hedge=hedge, hedge_after=hedge_after)
+
+            self.metrics.observe("run_queued_seconds", "chat", timing.queued_time)
+            self.metrics.observe("run_in_progress_seconds", "chat", timing.in_progress_time)
+            if timing.hedged: self.metrics.increment("run_hedged_total", "chat")
+
+            if timing.timed_out:
+                self.metrics.increment("run_timeouts_total", "chat")
+                return Failure(TimeoutError(f"對話超過{timeout}秒沒有完成，已取消 (status={run.status if run else None})"))
+
+            if run is None or run.status != "completed": return Failure(RuntimeError(f"對話沒有完成 (status={run.status if run else None})"))
+
+            reply = await self.transcript.fetch_async(self.client, run.thread_id, run.id)
+            reply.timing = timing
+            if run.thread_id != thread_id: await self.__adopt_thread__(session_key, thread_id, run.thread_id)
+            text = reply.text
+
+            if not text: return Failure(ValueError("沒有回應文字…"))
+
+            self.__record_exchange__(session_key, content, text)
+            if cache is not None: await cache.put_async(self.assistant.id, version, content, text)
+
+            return Success(reply)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def stream_events(self, content: str, session_key: str | None = None, max_bytes: int = 32, max_delay: float = 0.02, max_pending: int = 256, prefetch_files: bool = True, onFileSaved: Callable[[str, Result[str, Exception]], None] | None = None) -> AsyncIterator[StreamEvent]:
+        """
+        跟已建立好的「助手」詢問 / 對話 (及時串流 / async generator，文字 / 程式碼輸入 / 執行記錄都是StreamEvent)
+          - 串流只讀一次，在背景Task讀取，delta直接交給讀取端
+          - 同類型的delta累積到max_bytes個字元，或等了max_delay秒才合併送出
+          - 讀取端太慢時，最多暫存max_pending個delta，之後暫停讀取串流
+          - 讀取端中途不讀了 (關閉generator / 連線中斷)，會取消遠端還沒結束的Run
+          - 助手產生的檔案 (圖片 / file_path註解) 一出現就在背景下載 (StreamEventKind.File = FileId，用output_file()拿到下載結果)
+
+        參數:
+            content: 對話文字內容
+            session_key: 對話的Key (None = 使用預設的self.thread)
+            max_bytes: 累積多少字元就送出
+            max_delay: 第一個delta最多等多久就送出 (秒)
+            max_pending: 最多暫存的delta數量
+            prefetch_files: 是否在背景下載助手產生的檔案
+            onFileSaved: 檔案下載完成時的callback ((FILE_ID, Result[<檔案存檔路徑>, Exception]) => None)
+        回傳:
+            AsyncIterator[StreamEvent]
+        """
+        meter = self.metrics.stream("chatting")
+        handlers, finished = [], False
+
+        try:
+            assistant = await self.__ready__()
+            thread_id = await self.__thread_id__(session_key)
+            await self.__input_content__(content, thread_id=thread_id)
+
+            async def produce(emit) -> None:
+                from Assistant.Model.AsyncChattingEventHandler import AsyncChattingEventHandler
+                onFile = (lambda file_id, filename: self.output_prefetcher.prefetch_async(self.client, file_id, filename, onFileSaved)) if prefetch_files else None
+                handler = AsyncChattingEventHandler(emit, meter, onFile)
+                handlers.append(handler)
+                async with self.client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant.id, instructions=assistant.instructions, event_handler=handler) as stream: await stream.until_done()
+
+            async for event in StreamPipeline(max_bytes, max_delay, max_pending).run_async(produce): yield event
+            finished = True
+
+        except Exception:
+            meter.fail()
+            raise
+        finally:
+            meter.finish()
+            if not finished and handlers: await asyncio.shield(self.__cancel_run__(thread_id, handlers[0].current_run))
+
+    async def chatting(self, content: str, onTextDeltaBlock: Callable[[str], None] | None = None, onCodeInterpreterInputBlock: Callable[[str], None] | None = None, session_key: str | None = None, onFileSaved: Callable[[str, Result[str, Exception]], None] | None = None):
+        """
+        跟已建立好的「助手」詢問 / 對話 (及時串流 / async generator，產生SSE的「data: 文字」，多行文字拆成多個data)
+
+        參數:
+            content: 對話文字內容
+            onTextDeltaBlock: 回答的文字訊息 (合併後的文字)
+            onCodeInterpreterInputBlock: 跟程式碼有關的部分 (GPT的想法實作)
+            session_key: 對話的Key (None = 使用預設的self.thread)
+            onFileSaved: 助手產生的檔案在背景下載完成時的callback ((FILE_ID, Result[<檔案存檔路徑>, Exception]) => None)
+        """
+        async for event in self.stream_events(content, session_key, onFileSaved=onFileSaved):
+            match event.kind:
+                case StreamEventKind.Text:
+                    if onTextDeltaBlock: onTextDeltaBlock(event.value)
+                    yield sse_frame(event.value)
+                case StreamEventKind.CodeInput:
+                    if onCodeInterpreterInputBlock: onCodeInterpreterInputBlock(event.value)
+
+    async def batch_chat(self, input_path: str, output_path: str, checkpoint_path: str | None = None, concurrency: int = 8, mode: RunWaitMode = RunWaitMode.Polling) -> BatchChatReport:
+        """
+        批次對話 (JSONL => JSONL，每個問題用自己的Thread，最多concurrency個同時進行，中斷後再執行會從進度檔續跑)
+
+        參數:
+            input_path: 輸入的JSONL檔 (每行: "問題" 或 { "content": "問題", "id": ... })
+            output_path: 輸出的JSONL檔 (每行: { "line", "id", "content", "text" / "error" })
+            checkpoint_path: 進度檔的路徑 (None = <輸出檔>.checkpoint)
+            concurrency: 最多同時進行的對話數量
+            mode: 等待Run完成的方式
+        回傳:
+            BatchChatReport
+        """
+        async def chat(content: str, line: int) -> Result[str, Exception]:
+            session_key = f"batch-{line}"
+
+            try:
+                return await self.chat(content, mode=mode, session_key=session_key)
+            finally:
+                await self.end_session(session_key)
+
+        return await BatchChat(concurrency).run_async(input_path, output_path, chat, checkpoint_path)
+
+    def output_file(self, file_id: str) -> asyncio.Task | None:
+        """
+        串流中在背景下載的檔案 (await之後 = Result[<檔案存檔路徑>, Exception])
+
+        參數:
+            file_id: FILE_ID
+        回傳:
+            asyncio.Task | None: None = 沒有在背景下載過
+        """
+        return self.output_prefetcher.output(file_id)
+
+    def history(self, session_key: str | None = None) -> list[dict]:
+        """
+        本地的對話記錄 (chat()的問題與回答，包含快取的回答)
+
+        參數:
+            session_key: 對話的Key (None = 預設的self.thread)
+        回傳:
+            list[dict]: [{ role, content, cached }]
+        """
+        if session_key is None: return list(self.default_history)
+
+        session = self.sessions.get(session_key)
+        return list(session.history) if session else []
+
+    def messages(self, session_key: str | None = None) -> list[Message]:
+        """
+        本地記錄的Thread訊息們 (由舊到新，包含每個內容區塊，不會呼叫API)
+
+        參數:
+            session_key: 對話的Key (None = 預設的self.thread)
+        回傳:
+            list[Message]
+        """
+        if session_key is None: return self.transcript.messages(self.thread.id) if self.thread else []
+
+        session = self.sessions.get(session_key)
+        return self.transcript.messages(session.thread_id) if session and session.thread_id else []
+
+    async def end_session(self, session_key: str) -> bool:
+        """
+        結束該Key的對話 (只移除本地的對應，遠端的Thread不會被刪除，registry裡的Thread之後也不會再被接回)
+
+        參數:
+            session_key: 對話的Key
+        回傳:
+            bool: 是否有這個對話
+        """
+        if self.registry is not None and self.assistant_id: await self.registry.detach_session_async(self.assistant_id, session_key)
+        return self.sessions.remove(session_key) is not None
+
+    async def __cancel_run__(self, thread_id: str, run: Run | None) -> bool:
+        """
+        取消遠端還沒結束的Run
+
+        參數:
+            thread_id: ThreadId
+            run: Run (None = 還沒收到Run的事件，改用該Thread最新的Run)
+        回傳:
+            bool: 是否有送出取消
+        """
+        try:
+            if run is None: run = next(iter((await self.client.beta.threads.runs.list(thread_id=thread_id, limit=1)).data), None)
+            if run is None or run.status not in ("queued", "in_progress", "requires_action"): return False
+
+            await self.client.beta.threads.runs.cancel(run_id=run.id, thread_id=thread_id)
+            return True
+        except Exception:
+            return False
+
+    async def __thread_id__(self, session_key: str | None = None) -> str:
+        """
+        取得對話要使用的ThreadId (該Key第一次使用時才建立Thread，resume時先從registry接回)
+
+        參數:
+            session_key: 對話的Key (None = 使用預設的self.thread)
+        回傳:
+            str: ThreadId
+        """
+        if session_key is None: return (await self.__default_thread__()).id
+
+        session = self.sessions.get(session_key)
+        if session and session.thread_id: return session.thread_id
+
+        thread_id = await self.registry.thread_id_async(self.assistant_id, session_key) if self.resume else None
+        if thread_id: return self.sessions.put(session_key, thread_id).thread_id
+
+        thread = await self.__new_thread__(session.history if session else ())
+        session = self.sessions.put(session_key, thread.id)
+        if session.thread_id == thread.id: await self.__register_thread__(thread, session_key)
+
+        return session.thread_id
+
+    async def __default_thread__(self) -> Thread:
+        """
+        預設的Thread (第一次對話時才建立 / 從預先建立好的拿)
+
+        回傳:
+            Thread
+        """
+        async with self.thread_lock:
+            if self.thread is None: self.thread = await self.__resume_thread__() or await self.__register_thread__(await self.__new_thread__(self.default_history))
+            return self.thread
+
+    async def __new_thread__(self, history) -> Thread:
+        """
+        建立新的Thread (本地已經有快取的對話記錄時，一起放進Thread，遠端的對話才會跟本地的一樣)
+
+        參數:
+            history: 本地的對話記錄 ({ role, content, cached })
+        回傳:
+            Thread
+        """
+        if not history: return await self.thread_reserve.take_async(self.client.beta.threads.create)
+        return await self.client.beta.threads.create(messages=[{ "role": item["role"], "content": item["content"] } for item in history])
+
+    async def __stateless__(self, session_key: str | None) -> bool:
+        """
+        是不是還沒有任何對話內容的新對話 (沒有Thread / 本地的對話記錄 / registry裡可以接回的Thread)，只有這種對話可以用快取的回答
+
+        參數:
+            session_key: 對話的Key (None = 預設的self.thread)
+        回傳:
+            bool
+        """
+        if session_key is None:
+            if self.thread is not None or self.default_history: return False
+        else:
+            session = self.sessions.get(session_key)
+            if session is not None: return session.thread_id is None and not session.history
+
+        return not (self.resume and await self.registry.thread_id_async(self.assistant_id, session_key))
+
+    async def __adopt_thread__(self, session_key: str | None, old_thread_id: str, thread_id: str) -> None:
+        """
+        對沖的Run勝出時改用它的Thread (只有新對話會對沖，所以這個Thread就是完整的對話)，原本的Thread (問題 + 取消的Run) 不再使用
+
+        參數:
+            session_key: 對話的Key (None = 預設的self.thread)
+            old_thread_id: 原本的ThreadId
+            thread_id: 對沖的ThreadId
+        """
+        thread = await self.__register_thread__(await self.client.beta.threads.retrieve(thread_id), session_key)
+
+        if session_key is None:
+            async with self.thread_lock: self.thread = thread
+        else:
+            (self.sessions.get(session_key) or self.sessions.put(session_key, None)).thread_id = thread.id
+
+        self.transcript.forget(old_thread_id)
+        if self.registry is not None: await self.registry.remove_async(RegistryKind.Thread, old_thread_id)
+
+    async def __resume_thread__(self) -> Thread | None:
+        """
+        從registry接回預設的Thread (遠端已經刪除的話，移除記錄後回傳None)
+
+        回傳:
+            Thread | None
+        """
+        from openai import NotFoundError
+        thread_id = await self.registry.thread_id_async(self.assistant_id) if self.resume else None
+        if thread_id is None: return None
+
+        try:
+            return await self.client.beta.threads.retrieve(thread_id)
+        except NotFoundError:
+            await self.registry.remove_async(RegistryKind.Thread, thread_id)
+            return None
+
+    async def __register_thread__(self, thread: Thread, session_key: str | None = None) -> Thread:
+        """
+        把建立好的Thread記到registry (助手Id + session_key)
+
+        回傳:
+            Thread
+        """
+        if self.registry is not None: await self.registry.put_async(RegistryKind.Thread, thread.id, assistant_id=self.assistant_id, session_key=DefaultSessionKey if session_key is None else session_key)
+        return thread
+
+    def __reserve_threads__(self) -> None:
+        self.thread_reserve.fill_async(self.client.beta.threads.create)
+
+    async def __ready__(self) -> Assistant | None:
+        """
+        等待背景取得的助手 (失敗時丟出錯誤)
+
+        回傳:
+            Assistant | None: 還沒有使用助手 => None
+        """
+        loader = self.assistant_loader
+        if loader is None: return self.assistant
+
+        assistant = await asyncio.shield(loader)
+
+        if self.assistant_loader is loader:
+            self.assistant, self.assistant_loader = assistant, None
+            await self.__remember__(MetadataKind.Assistant, assistant)
+
+        return self.assistant
+
+    async def __find_metadata_by_name__(self, kind: MetadataKind, name: str, refresh: bool = False) -> list:
+        """
+        用名稱找出遠端物件們 (快取有效時不會呼叫API；registry的記錄只當作候選Id，逐一向遠端確認，全部都還在且同名才不用列出遠端全部)
+
+        參數:
+            kind: MetadataKind
+            name: 名稱
+            refresh: 是否略過快取，重新向遠端列出全部 (同時移除registry裡遠端已經不存在的記錄)
+        回傳:
+            list
+        """
+        objects = None if refresh else self.metadata_cache.find_by_name(kind, name)
+        if objects is not None: return objects
+
+        records = [] if refresh or self.registry is None else await self.registry.find_by_name_async(RegistryKind(kind.value), name)
+        objects, consistent = await self.__confirm_registry__(kind, records, name)
+        if objects and consistent: return objects
+
+        index = await self.refresh_metadata(kind)
+        objects = index.find_by_name(name)
+        await self.__reconcile__(kind, name, objects)
+
+        return objects
+
+    async def __upload_file_exists__(self, file_id: str) -> bool:
+        """
+        遠端是否還有這個上傳的檔案 (用快取的檔案列表判斷)
+
+        參數:
+            file_id: FILE_ID
+        回傳:
+            bool
+        """
+        file_ids = self.metadata_cache.ids(MetadataKind.UploadFile)
+        if file_ids is None: file_ids = (await self.refresh_metadata(MetadataKind.UploadFile)).objects.keys()
+
+        return file_id in file_ids
+
+    async def __upload_sync_files__(self, sync: VectorStoreSync, plan: VectorStoreSyncPlan, report: VectorStoreSyncReport, max_workers: int) -> dict[str, str]:
+        """
+        平行上傳要同步的檔案們
+
+        回傳:
+            dict[<相對路徑>, <FILE_ID>]
+        """
+        uploaded: dict[str, str] = {}
+
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def upload(relative_path: str) -> None:
+            try:
+                async with semaphore:
+                    with open(sync.file_path(relative_path), "rb") as file: upload_file = await self.client.files.create(file=file, purpose="assistants")
+                await self.__remember__(MetadataKind.UploadFile, upload_file, sha256=plan.stats[relative_path]["sha256"], owner=self.assistant_id)
+                uploaded[relative_path] = upload_file.id
+            except Exception as error:
+                report.failed[relative_path] = error
+
+        await asyncio.gather(*(upload(relative_path) for relative_path in plan.uploads))
+
+        return uploaded
+
+    async def __attach_sync_files__(self, sync: VectorStoreSync, plan: VectorStoreSyncPlan, report: VectorStoreSyncReport, uploaded: dict[str, str], batch_size: int) -> None:
+        """
+        把上傳好的檔案們整批加到VectorStore，成功的才寫入清單檔
+        """
+        items = list(uploaded.items())
+
+        for index in range(0, len(items), max(1, batch_size)):
+            chunk = dict(items[index:index + batch_size])
+            batch = await self.client.beta.vector_stores.file_batches.create_and_poll(vector_store_id=sync.vector_store_id, file_ids=list(chunk.values()))
+            failed_ids = set()
+
+            if batch.status != "completed" or batch.file_counts.failed:
+                completed_ids = { file.id async for file in await self.client.beta.vector_stores.file_batches.list_files(batch.id, vector_store_id=sync.vector_store_id, filter="completed") }
+                failed_ids = set(chunk.values()) - completed_ids
+
+            for relative_path, file_id in chunk.items():
+                if file_id in failed_ids:
+                    report.failed[relative_path] = RuntimeError(f"向量化失敗 (batch={batch.id}, status={batch.status})")
+                    continue
+
+                sync.commit(relative_path, file_id, plan.stats[relative_path])
+                if relative_path in plan.replaced: report.replaced[relative_path] = file_id
+                else: report.added[relative_path] = file_id
+
+    async def __detach_sync_files__(self, sync: VectorStoreSync, plan: VectorStoreSyncPlan, report: VectorStoreSyncReport) -> None:
+        """
+        從VectorStore移除被取代 / 被刪掉的舊檔案 (取代的新檔案加入成功後才移除)
+        """
+        from openai import NotFoundError
+        detaches = { relative_path: file_id for relative_path, file_id in plan.replaced.items() if relative_path in report.replaced }
+        detaches.update(plan.removed)
+
+        for relative_path, file_id in detaches.items():
+            try:
+                await self.client.beta.vector_stores.files.delete(file_id, vector_store_id=sync.vector_store_id)
+            except NotFoundError:
+                pass
+            except Exception as error:
+                report.failed[relative_path] = error
+                continue
+
+            try:
+                await self.remove_upload_file_by_id(file_id)
+            except Exception:
+                pass    # 已經從VectorStore移除，檔案本身刪不掉也不影響同步
+
+            if relative_path in plan.removed:
+                sync.forget(relative_path)
+                report.removed.append(relative_path)
+
+    async def __remember__(self, kind: MetadataKind, object, sha256: str | None = None, owner: str | None = None) -> None:
+        """
+        記住建立 / 找到的遠端物件 (寫入快取 + registry)
+
+        參數:
+            kind: MetadataKind
+            object: 遠端物件
+            sha256: 檔案內容的SHA-256
+            owner: 所屬的助手Id (建立的時候才有)
+        """
+        self.metadata_cache.put(kind, object)
+        if self.registry is None: return
+
+        name = getattr(object, MetadataCache.NameFields[kind], None)
+        await self.registry.put_async(RegistryKind(kind.value), object.id, name=name, sha256=sha256, assistant_id=owner, data=object.to_dict())
+
+    async def __forget__(self, kind: MetadataKind, id: str) -> None:
+        """
+        遠端物件已經刪除 (從快取 + registry移除)
+        """
+        self.metadata_cache.remove(kind, id)
+        if self.registry is not None: await self.registry.remove_async(RegistryKind(kind.value), id)
+
+    async def __reconcile__(self, kind: MetadataKind, name: str, objects: list) -> None:
+        """
+        用遠端列出來的同名物件們更新registry (遠端已經不存在的記錄移除)
+        """
+        if self.registry is None: return
+
+        ids = { object.id for object in objects }
+        for record in await self.registry.find_by_name_async(RegistryKind(kind.value), name):
+            if record.id not in ids: await self.registry.remove_async(record.kind, record.id)
+
+        for object in objects: await self.__remember__(kind, object)
+
+    async def __confirm_registry__(self, kind: MetadataKind, records: list[RegistryRecord], name: str | None = None) -> tuple[list, bool]:
+        """
+        registry的記錄只當作候選Id，逐一用快取 / 向遠端取回確認 (遠端已經刪除的記錄移除，改名的更新)
+
+        參數:
+            kind: MetadataKind
+            records: registry的記錄們
+            name: 要符合的名稱 (None = 不檢查)
+        回傳:
+            tuple[list, bool]: (確認過的遠端物件們, registry跟遠端是否一致)
+        """
+        confirmed = await asyncio.gather(*(self.__confirm_record__(kind, record) for record in records))
+        objects = [object for object in confirmed if object is not None and (name is None or getattr(object, MetadataCache.NameFields[kind], None) == name)]
+
+        return objects, len(objects) == len(records)
+
+    async def __confirm_record__(self, kind: MetadataKind, record: RegistryRecord):
+        """
+        用快取 / 向遠端取回registry記錄的物件 (遠端已經刪除 => None)
+        """
+        from openai import NotFoundError
+        object = self.metadata_cache.get(kind, record.id)
+        if object is not None: return object
+
+        try:
+            object = await self.__retrieve_metadata__(kind, record.id)
+        except NotFoundError:
+            await self.__forget__(kind, record.id)
+            return None
+
+        await self.__remember__(kind, object)
+        return object
+
+    async def __retrieve_metadata__(self, kind: MetadataKind, id: str):
+        match kind:
+            case MetadataKind.Assistant: return await self.client.beta.assistants.retrieve(assistant_id=id)
+            case MetadataKind.UploadFile: return await self.client.files.retrieve(id)
+            case MetadataKind.VectorStore: return await self.client.beta.vector_stores.retrieve(id)
+
+    async def __remember_ingested_file__(self, file_path: str, upload_file: FileObject, assistant_id: str) -> None:
+        """
+        記住背景向量化上傳的檔案 (寫入快取 + registry)
+        """
+        await self.__remember__(MetadataKind.UploadFile, upload_file, sha256=await asyncio.to_thread(file_sha256, file_path) if self.registry is not None else None, owner=assistant_id)
+
+    async def __discard_ingestion__(self, job: IngestionJob) -> None:
+        """
+        向量化沒有完成時，刪除這次建立的VectorStore與上傳的檔案們 (全部都試過後，丟出第一個錯誤)
+        """
+        results = await asyncio.gather(self.remove_vector_store_by_id(job.vector_store_id), *(self.remove_upload_file_by_id(file_id) for file_id in job.file_ids.values()), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors: raise errors[0]
+
+    async def __attach_vector_store__(self, assistant_id: str, vector_store_id: str) -> None:
+        """
+        把助手的File Search設定成這個VectorStore (向量化完成時)
+        """
+        assistant = await self.client.beta.assistants.update(
+            assistant_id = assistant_id,
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+        )
+        await self.__assistant_updated__(assistant)
+
+    async def __assistant_updated__(self, assistant: Assistant) -> None:
+        """
+        助手更新後，同步本地的助手物件與快取 (該助手快取的回答全部作廢)
+
+        參數:
+            assistant: 更新後的助手
+        """
+        if assistant.id == self.assistant_id: self.assistant = assistant
+        await self.__remember__(MetadataKind.Assistant, assistant)
+        if self.response_cache is not None: await self.response_cache.invalidate_async(assistant.id)
+
+    def __record_exchange__(self, session_key: str | None, content: str, text: str, cached: bool = False) -> None:
+        """
+        把問題與回答加到本地的對話記錄 (快取的回答不會馬上送到遠端，之後建立Thread時才一起放進去)
+
+        參數:
+            session_key: 對話的Key (None = 預設的self.thread)
+            content: 問題
+            text: 回答
+            cached: 是不是快取的回答
+        """
+        history = self.default_history if session_key is None else (self.sessions.get(session_key) or self.sessions.put(session_key, None)).history
+        history.append({ "role": "user", "content": content, "cached": cached })
+        history.append({ "role": "assistant", "content": text, "cached": cached })
+
+    async def __input_content__(self, content: str, role: str = "user", thread_id: str | None = None) -> Message:
+        """
+        輸入要問的訊息
+
+        參數:
+            content: 對話文字內容
+            role: 角色
+            thread_id: ThreadId (None = 使用預設的self.thread)
+        """
+        thread_id = thread_id or (await self.__default_thread__()).id
+        message = await self.client.beta.threads.messages.create(thread_id=thread_id, role=role, content=content)
+        self.transcript.append(message)
+
+        return message
+
+    def __open_file__(self, file_path: TextIOWrapper, mode: str = "rb") -> Result[BufferedReader, Exception]:
+        """
+        開啟檔案
+
+        參數:
+            file_path: 檔案路徑
+            mode: 開檔模式
+        """
+        try:
+            file = open(file_path, mode)
+            return Success(file)
+        except Exception as error:
+            return Failure(error)
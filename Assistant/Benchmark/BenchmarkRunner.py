@@ -0,0 +1,177 @@
+import json
+import math
+import time
+import platform
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from returns.result import Failure
+
+@dataclass
+class BenchmarkResult:
+    """
+    單一情境的測試結果
+
+    參數:
+        scenario: 情境名稱
+        latencies: 每次操作花費的時間 (秒)
+        elapsed: 全部操作的總時間 (秒，同時執行時是牆上時間)
+        concurrency: 同時執行的數量
+        errors: 失敗的次數
+        extra: 情境自己的數據 (例如: 串流的每秒Token數)
+    """
+    scenario: str
+    latencies: list[float] = field(default_factory=list)
+    elapsed: float = 0.0
+    concurrency: int = 1
+    errors: int = 0
+    extra: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        分位數 (nearest-rank)
+
+        參數:
+            q: 0 ~ 100 (例如: 95 => p95)
+        回傳:
+            float: 秒數
+        """
+        if not self.latencies: return 0.0
+
+        latencies = sorted(self.latencies)
+        return latencies[max(0, math.ceil(q / 100 * len(latencies)) - 1)]
+
+    def summary(self) -> dict:
+        """
+        要存檔 / 比較的數據
+        """
+        return { "scenario": self.scenario, "count": self.count, "concurrency": self.concurrency, "errors": self.errors, "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99), "ops_per_second": self.ops_per_second, **self.extra }
+
+class BenchmarkRunner:
+    """
+    執行效能測試的情境
+      - setup在計時前先全部做完 (例如: 準備要上傳的檔案 / 要刪除的助手)
+      - operation丟出例外或回傳Failure都算失敗
+    """
+    def __init__(self, iterations: int = 20, concurrency: int = 1, warmup: int = 1) -> None:
+        """
+        初始化
+
+        參數:
+            iterations: 每個情境計時的次數
+            concurrency: 同時執行的數量
+            warmup: 不計時的暖身次數
+        """
+        self.iterations = iterations
+        self.concurrency = max(1, concurrency)
+        self.warmup = warmup
+
+    def run(self, scenario: str, operation: Callable[[Any], Any], setup: Callable[[int], Any] | None = None) -> BenchmarkResult:
+        """
+        執行單一情境
+
+        參數:
+            scenario: 情境名稱
+            operation: 要計時的操作 (參數 = setup的回傳值)
+            setup: 每次操作前的準備 (參數 = 第幾次，不計時)
+        回傳:
+            BenchmarkResult
+        """
+        result = BenchmarkResult(scenario, concurrency=self.concurrency)
+        arguments = [setup(index) if setup else index for index in range(self.warmup + self.iterations)]
+
+        for argument in arguments[:self.warmup]: self.__measure__(operation, argument)
+
+        started_at = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for latency, error in executor.map(lambda argument: self.__measure__(operation, argument), arguments[self.warmup:]):
+                result.latencies.append(latency)
+                if error: result.errors += 1
+
+        result.elapsed = time.perf_counter() - started_at
+        return result
+
+    def __measure__(self, operation: Callable[[Any], Any], argument: Any) -> tuple[float, bool]:
+        started_at = time.perf_counter()
+
+        try:
+            error = isinstance(operation(argument), Failure)
+        except Exception:
+            error = True
+
+        return time.perf_counter() - started_at, error
+
+def save_report(file_path: str, results: list[BenchmarkResult], parameters: dict) -> dict:
+    """
+    把結果存成JSON (記錄git commit，方便跨commit比較)
+
+    參數:
+        file_path: 存檔路徑
+        results: 各情境的結果
+        parameters: 測試參數 (延遲 / 次數 / 同時數量…)
+    回傳:
+        dict: 存檔的內容
+    """
+    report = { "commit": git_commit(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "parameters": parameters, "results": [result.summary() for result in results] }
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    return report
+
+def load_report(file_path: str) -> dict[str, dict]:
+    """
+    讀取之前存的結果
+
+    參數:
+        file_path: 存檔路徑
+    回傳:
+        dict[<情境名稱>, <數據>]
+    """
+    with open(file_path, "r", encoding="utf-8") as file:
+        return { summary["scenario"]: summary for summary in json.load(file)["results"] }
+
+def format_report(results: list[BenchmarkResult], baseline: dict[str, dict] | None = None) -> str:
+    """
+    把結果排成表格 (有baseline時，加上p50 / ops/s跟之前的差異百分比)
+
+    參數:
+        results: 各情境的結果
+        baseline: load_report()讀出來的之前結果
+    回傳:
+        str
+    """
+    header = f"{'scenario':<20}{'count':>7}{'errors':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'ops/s':>10}"
+    lines = [header + ("  Δp50    Δops/s" if baseline else ""), "-" * (len(header) + (16 if baseline else 0))]
+
+    for result in results:
+        summary = result.summary()
+        line = f"{result.scenario:<20}{result.count:>7}{result.errors:>8}{summary['p50'] * 1000:>10.1f}{summary['p95'] * 1000:>10.1f}{summary['p99'] * 1000:>10.1f}{summary['ops_per_second']:>10.2f}"
+
+        previous = (baseline or {}).get(result.scenario)
+        if previous: line += f"  {percent_change(previous['p50'], summary['p50']):>6}  {percent_change(previous['ops_per_second'], summary['ops_per_second']):>7}"
+
+        extra = "  ".join(f"{key}={value:.2f}" for key, value in result.extra.items())
+        lines.append(line + (f"  ({extra})" if extra else ""))
+
+    return "\n".join(lines)
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def percent_change(previous: float, current: float) -> str:
+    if not previous: return "-"
+    return f"{(current - previous) / previous * 100:+.1f}%"
@@ -0,0 +1,547 @@
+import re
+import json
+import time
+import random
+import secrets
+import threading
+from email.parser import BytesParser
+from email.policy import default as DefaultPolicy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class MockState:
+    """
+    模擬伺服器的資料 (助手 / Thread / Message / Run / 檔案 / VectorStore)，全部放在記憶體裡
+    """
+    def __init__(self, queue_time: float, run_time: float, ingest_time: float, reply: str, stall_rate: float = 0.0, seed: int | None = None) -> None:
+        """
+        初始化
+
+        參數:
+            queue_time: Run排隊 (queued) 的時間
+            run_time: Run執行中 (in_progress) 的時間
+            ingest_time: VectorStore處理檔案 (file_batches in_progress) 的時間
+            reply: 助手回答的文字 (串流時英數字一個單字、其它一個字元算一個Token)
+            stall_rate: 永遠停在queued (直到被取消) 的Run比例 (模擬卡住的Run)
+            seed: 哪些Run會卡住的亂數種子
+        """
+        self.queue_time = queue_time
+        self.run_time = run_time
+        self.ingest_time = ingest_time
+        self.reply = reply
+        self.stall_rate = stall_rate
+        self.random = random.Random(seed)
+        self.assistants: dict[str, dict] = {}
+        self.threads: dict[str, dict] = {}
+        self.messages: dict[str, list[dict]] = {}
+        self.runs: dict[str, dict] = {}
+        self.files: dict[str, dict] = {}
+        self.contents: dict[str, bytes] = {}
+        self.vector_stores: dict[str, dict] = {}
+        self.vector_store_files: dict[str, dict[str, dict]] = {}
+        self.file_batches: dict[str, dict] = {}
+        self.lock = threading.RLock()
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}{secrets.token_hex(12)}"
+
+    def new_run(self, thread_id: str, assistant: dict, parameters: dict) -> dict:
+        """
+        新增一個Run (依stall_rate決定會不會卡在queued)
+        """
+        with self.lock:
+            run = {
+                "id": self.new_id("run_"), "object": "thread.run", "created_at": int(time.time()), "thread_id": thread_id, "assistant_id": assistant["id"],
+                "status": "queued", "instructions": parameters.get("instructions") or assistant.get("instructions") or "", "model": assistant.get("model"),
+                "tools": assistant.get("tools", []), "metadata": {}, "parallel_tool_calls": True, "started_at": None, "completed_at": None,
+                "cancelled_at": None, "failed_at": None, "expires_at": None, "last_error": None, "required_action": None, "usage": None,
+                "_started_at": time.monotonic(), "_stalled": self.random.random() < self.stall_rate,
+            }
+            self.runs[run["id"]] = run
+            return run
+
+    def message(self, thread_id: str, role: str, text: str, run_id: str | None = None, assistant_id: str | None = None) -> dict:
+        """
+        新增一則訊息
+        """
+        message = {
+            "id": self.new_id("msg_"), "object": "thread.message", "created_at": int(time.time()), "thread_id": thread_id,
+            "role": role, "status": "completed", "run_id": run_id, "assistant_id": assistant_id, "attachments": [], "metadata": {},
+            "content": [{ "type": "text", "text": { "value": text, "annotations": [] } }],
+        }
+
+        with self.lock: self.messages.setdefault(thread_id, []).append(message)
+        return message
+
+    def advance(self, run: dict) -> dict:
+        """
+        依經過的時間推進Run的狀態 (queued => in_progress => completed，完成時新增助手的回答)
+        """
+        with self.lock:
+            if run["status"] not in ("queued", "in_progress") or run["_stalled"]: return run
+
+            elapsed = time.monotonic() - run["_started_at"]
+            status = "queued" if elapsed < self.queue_time else "in_progress" if elapsed < self.queue_time + self.run_time else "completed"
+
+            if status == "in_progress" and run["started_at"] is None: run["started_at"] = int(time.time())
+            if status == "completed": self.complete(run)
+            else: run["status"] = status
+
+            return run
+
+    def complete(self, run: dict) -> dict:
+        with self.lock:
+            if run["status"] in ("queued", "in_progress"):
+                run["status"] = "completed"
+                run["completed_at"] = int(time.time())
+                self.message(run["thread_id"], "assistant", self.reply, run_id=run["id"], assistant_id=run["assistant_id"])
+
+            return run
+
+    def advance_batch(self, batch: dict) -> dict:
+        with self.lock:
+            if batch["status"] == "in_progress" and time.monotonic() - batch["_started_at"] >= self.ingest_time:
+                batch["status"] = "completed"
+                batch["file_counts"] = { **batch["file_counts"], "in_progress": 0, "completed": batch["file_counts"]["total"] }
+                for file in self.vector_store_files.get(batch["vector_store_id"], {}).values(): file["status"] = "completed"
+
+            return batch
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    模擬OpenAI Assistants API的HTTP處理器 (路徑 / 回傳格式與官方API相同，openai套件可以直接連線)
+    """
+    protocol_version = "HTTP/1.1"
+    server: "MockServerCore"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None: self.__dispatch__("GET")
+
+    def do_POST(self) -> None: self.__dispatch__("POST")
+
+    def do_DELETE(self) -> None: self.__dispatch__("DELETE")
+
+    def __dispatch__(self, method: str) -> None:
+        url = urlparse(self.path)
+        path = url.path.removeprefix("/v1")
+        query = { key: values[-1] for key, values in parse_qs(url.query).items() }
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        self.server.sleep()
+
+        for route_method, pattern, action in Routes:
+            if route_method != method: continue
+
+            matched = re.fullmatch(pattern, path)
+            if not matched: continue
+
+            try:
+                action(self, self.server.state, query, body, *matched.groups())
+            except KeyError as error:
+                self.__json__({ "error": { "message": f"No such object: {error}", "type": "invalid_request_error" } }, status=404)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+            return
+
+        self.__json__({ "error": { "message": f"Unknown path: {method} {path}", "type": "invalid_request_error" } }, status=404)
+
+    def __json__(self, payload: dict, status: int = 200) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __binary__(self, data: bytes) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __list__(self, objects: list[dict], query: dict, order: str = "desc") -> None:
+        """
+        Cursor分頁的列表 (limit / order / after / before)
+        """
+        objects = sorted(objects, key=lambda object: object["created_at"], reverse=query.get("order", order) == "desc")
+        ids = [object["id"] for object in objects]
+
+        if "after" in query and query["after"] in ids: objects = objects[ids.index(query["after"]) + 1:]
+        if "before" in query and query["before"] in ids: objects = objects[:ids.index(query["before"])]
+
+        limit = int(query.get("limit") or 20)
+        page = [self.__public__(object) for object in objects[:limit]]
+
+        self.__json__({ "object": "list", "data": page, "first_id": page[0]["id"] if page else None, "last_id": page[-1]["id"] if page else None, "has_more": len(objects) > limit })
+
+    def __public__(self, object: dict) -> dict:
+        return { key: value for key, value in object.items() if not key.startswith("_") }
+
+    def __stream__(self, state: MockState, run: dict) -> None:
+        """
+        用SSE依序送出Run的事件 (created => queued => in_progress => message.delta... => completed)
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(event: str, data) -> None:
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False) if isinstance(data, dict) else data}\n\n".encode())
+            self.wfile.flush()
+
+        send("thread.run.created", self.__public__(run))
+        send("thread.run.queued", self.__public__(run))
+        time.sleep(state.queue_time)
+        while run["_stalled"] and run["status"] == "queued": time.sleep(0.01)
+
+        with state.lock:
+            if run["status"] == "cancelled": return self.__cancelled__(send, run)
+            run["status"] = "in_progress"
+            run["started_at"] = int(time.time())
+
+        send("thread.run.in_progress", self.__public__(run))
+
+        message_id = state.new_id("msg_")
+        message = { "id": message_id, "object": "thread.message", "created_at": int(time.time()), "thread_id": run["thread_id"], "role": "assistant", "status": "in_progress", "run_id": run["id"], "assistant_id": run["assistant_id"], "attachments": [], "metadata": {}, "content": [] }
+        send("thread.message.created", message)
+        send("thread.message.in_progress", message)
+
+        tokens = re.findall(r"[A-Za-z0-9]+\s*|\S\s*", state.reply) or [state.reply]
+        interval = state.run_time / max(1, len(tokens))
+
+        for token in tokens:
+            time.sleep(interval)
+            if run["status"] == "cancelled": return self.__cancelled__(send, run)
+            send("thread.message.delta", { "id": message_id, "object": "thread.message.delta", "delta": { "content": [{ "index": 0, "type": "text", "text": { "value": token, "annotations": [] } }] } })
+
+        state.complete(run)
+        send("thread.message.completed", { **message, "status": "completed", "content": [{ "type": "text", "text": { "value": state.reply, "annotations": [] } }] })
+        send("thread.run.completed", self.__public__(run))
+        send("done", "[DONE]")
+
+    def __cancelled__(self, send, run: dict) -> None:
+        send("thread.run.cancelled", self.__public__(run))
+        send("done", "[DONE]")
+
+    # MARK: - 助手
+
+    def create_assistant(self, state: MockState, query: dict, body: bytes) -> None:
+        parameters = json.loads(body or b"{}")
+        assistant = { "id": state.new_id("asst_"), "object": "assistant", "created_at": time.time(), "name": None, "description": None, "instructions": None, "tools": [], "tool_resources": {}, "metadata": {}, "model": "gpt-4o", **parameters }
+
+        with state.lock: state.assistants[assistant["id"]] = assistant
+        self.__json__(assistant)
+
+    def list_assistants(self, state: MockState, query: dict, body: bytes) -> None:
+        with state.lock: self.__list__(list(state.assistants.values()), query)
+
+    def retrieve_assistant(self, state: MockState, query: dict, body: bytes, assistant_id: str) -> None:
+        with state.lock: self.__json__(state.assistants[assistant_id])
+
+    def update_assistant(self, state: MockState, query: dict, body: bytes, assistant_id: str) -> None:
+        with state.lock:
+            assistant = state.assistants[assistant_id]
+            assistant.update(json.loads(body or b"{}"))
+            self.__json__(assistant)
+
+    def delete_assistant(self, state: MockState, query: dict, body: bytes, assistant_id: str) -> None:
+        with state.lock: del state.assistants[assistant_id]
+        self.__json__({ "id": assistant_id, "object": "assistant.deleted", "deleted": True })
+
+    # MARK: - 對話
+
+    def create_thread(self, state: MockState, query: dict, body: bytes) -> None:
+        parameters = json.loads(body or b"{}")
+        thread = { "id": state.new_id("thread_"), "object": "thread", "created_at": int(time.time()), "metadata": {}, "tool_resources": {} }
+
+        with state.lock:
+            state.threads[thread["id"]] = thread
+            state.messages[thread["id"]] = []
+
+            for message in parameters.get("messages", []):
+                content = message.get("content", "")
+                state.message(thread["id"], message.get("role", "user"), content if isinstance(content, str) else "".join(part.get("text", "") for part in content))
+
+        self.__json__(thread)
+
+    def retrieve_thread(self, state: MockState, query: dict, body: bytes, thread_id: str) -> None:
+        with state.lock: self.__json__(state.threads[thread_id])
+
+    def create_message(self, state: MockState, query: dict, body: bytes, thread_id: str) -> None:
+        parameters = json.loads(body or b"{}")
+        content = parameters.get("content", "")
+        text = content if isinstance(content, str) else "".join(part.get("text", "") for part in content)
+
+        with state.lock: state.threads[thread_id]
+        self.__json__(state.message(thread_id, parameters.get("role", "user"), text))
+
+    def list_messages(self, state: MockState, query: dict, body: bytes, thread_id: str) -> None:
+        with state.lock:
+            for run in state.runs.values():
+                if run["thread_id"] == thread_id: state.advance(run)
+
+            messages = [message for message in state.messages[thread_id] if not query.get("run_id") or message["run_id"] == query["run_id"]]
+            self.__list__([{ **message, "created_at": message["created_at"] + index * 1e-6 } for index, message in enumerate(messages)], query)
+
+    def create_run(self, state: MockState, query: dict, body: bytes, thread_id: str) -> None:
+        parameters = json.loads(body or b"{}")
+
+        with state.lock:
+            assistant = state.assistants[parameters["assistant_id"]]
+            state.threads[thread_id]
+            run = state.new_run(thread_id, assistant, parameters)
+
+        if parameters.get("stream"): self.__stream__(state, run)
+        else: self.__json__(self.__public__(run))
+
+    def create_thread_and_run(self, state: MockState, query: dict, body: bytes) -> None:
+        parameters = json.loads(body or b"{}")
+        thread = { "id": state.new_id("thread_"), "object": "thread", "created_at": int(time.time()), "metadata": {}, "tool_resources": {} }
+
+        with state.lock:
+            assistant = state.assistants[parameters["assistant_id"]]
+            state.threads[thread["id"]] = thread
+            state.messages[thread["id"]] = []
+
+            for message in (parameters.get("thread") or {}).get("messages", []):
+                content = message.get("content", "")
+                state.message(thread["id"], message.get("role", "user"), content if isinstance(content, str) else "".join(part.get("text", "") for part in content))
+
+            run = state.new_run(thread["id"], assistant, parameters)
+
+        if parameters.get("stream"): self.__stream__(state, run)
+        else: self.__json__(self.__public__(run))
+
+    def list_runs(self, state: MockState, query: dict, body: bytes, thread_id: str) -> None:
+        with state.lock: self.__list__([self.__public__(state.advance(run)) for run in state.runs.values() if run["thread_id"] == thread_id], query)
+
+    def retrieve_run(self, state: MockState, query: dict, body: bytes, thread_id: str, run_id: str) -> None:
+        self.__json__(self.__public__(state.advance(state.runs[run_id])))
+
+    def cancel_run(self, state: MockState, query: dict, body: bytes, thread_id: str, run_id: str) -> None:
+        with state.lock:
+            run = state.advance(state.runs[run_id])
+            if run["status"] in ("queued", "in_progress"): run.update(status="cancelled", cancelled_at=int(time.time()))
+            self.__json__(self.__public__(run))
+
+    # MARK: - 檔案
+
+    def create_file(self, state: MockState, query: dict, body: bytes) -> None:
+        message = BytesParser(policy=DefaultPolicy).parsebytes(f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + body)
+        fields, filename, content = {}, "upload", b""
+
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename(): filename, content = part.get_filename(), part.get_payload(decode=True) or b""
+            else: fields[name] = part.get_content()
+
+        file = { "id": state.new_id("file-"), "object": "file", "bytes": len(content), "created_at": int(time.time()), "filename": filename, "purpose": fields.get("purpose", "assistants"), "status": "processed" }
+
+        with state.lock:
+            state.files[file["id"]] = file
+            state.contents[file["id"]] = content
+
+        self.__json__(file)
+
+    def list_files(self, state: MockState, query: dict, body: bytes) -> None:
+        with state.lock: self.__list__([file for file in state.files.values() if not query.get("purpose") or file["purpose"] == query["purpose"]], { "limit": 10000, **query })
+
+    def retrieve_file(self, state: MockState, query: dict, body: bytes, file_id: str) -> None:
+        with state.lock: self.__json__(state.files[file_id])
+
+    def delete_file(self, state: MockState, query: dict, body: bytes, file_id: str) -> None:
+        with state.lock:
+            del state.files[file_id]
+            state.contents.pop(file_id, None)
+
+        self.__json__({ "id": file_id, "object": "file", "deleted": True })
+
+    def file_content(self, state: MockState, query: dict, body: bytes, file_id: str) -> None:
+        with state.lock: content = state.contents[file_id]
+
+        offset = int(re.match(r"bytes=(\d+)-", self.headers.get("Range", "bytes=0-")).group(1))
+        if not offset: return self.__binary__(content)
+
+        if offset >= len(content): return self.__json__({ "error": { "message": "Range Not Satisfiable" } }, status=416)
+
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content) - offset))
+        self.send_header("Content-Range", f"bytes {offset}-{len(content) - 1}/{len(content)}")
+        self.end_headers()
+        self.wfile.write(content[offset:])
+
+    # MARK: - VectorStore
+
+    def create_vector_store(self, state: MockState, query: dict, body: bytes) -> None:
+        parameters = json.loads(body or b"{}")
+        vector_store = { "id": state.new_id("vs_"), "object": "vector_store", "created_at": time.time(), "name": parameters.get("name"), "status": "completed", "usage_bytes": 0, "last_active_at": None, "metadata": parameters.get("metadata") or {}, "file_counts": { "in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": 0 } }
+
+        with state.lock:
+            state.vector_stores[vector_store["id"]] = vector_store
+            state.vector_store_files[vector_store["id"]] = {}
+            for file_id in parameters.get("file_ids", []): self.__attach__(state, vector_store["id"], file_id, "completed")
+
+        self.__json__(vector_store)
+
+    def list_vector_stores(self, state: MockState, query: dict, body: bytes) -> None:
+        with state.lock: self.__list__(list(state.vector_stores.values()), query)
+
+    def retrieve_vector_store(self, state: MockState, query: dict, body: bytes, vector_store_id: str) -> None:
+        with state.lock: self.__json__(state.vector_stores[vector_store_id])
+
+    def delete_vector_store(self, state: MockState, query: dict, body: bytes, vector_store_id: str) -> None:
+        with state.lock:
+            del state.vector_stores[vector_store_id]
+            state.vector_store_files.pop(vector_store_id, None)
+
+        self.__json__({ "id": vector_store_id, "object": "vector_store.deleted", "deleted": True })
+
+    def create_vector_store_file(self, state: MockState, query: dict, body: bytes, vector_store_id: str) -> None:
+        with state.lock: self.__json__(self.__attach__(state, vector_store_id, json.loads(body)["file_id"], "completed"))
+
+    def list_vector_store_files(self, state: MockState, query: dict, body: bytes, vector_store_id: str) -> None:
+        with state.lock: self.__list__([file for file in state.vector_store_files[vector_store_id].values() if not query.get("filter") or file["status"] == query["filter"]], query)
+
+    def delete_vector_store_file(self, state: MockState, query: dict, body: bytes, vector_store_id: str, file_id: str) -> None:
+        with state.lock: del state.vector_store_files[vector_store_id][file_id]
+        self.__json__({ "id": file_id, "object": "vector_store.file.deleted", "deleted": True })
+
+    def create_file_batch(self, state: MockState, query: dict, body: bytes, vector_store_id: str) -> None:
+        file_ids = json.loads(body)["file_ids"]
+
+        with state.lock:
+            state.vector_stores[vector_store_id]
+            status = "in_progress" if state.ingest_time > 0 else "completed"
+            for file_id in file_ids: self.__attach__(state, vector_store_id, file_id, status)
+
+            batch = { "id": state.new_id("vsfb_"), "object": "vector_store.file_batch", "created_at": int(time.time()), "vector_store_id": vector_store_id, "status": status, "file_counts": { "in_progress": len(file_ids) if status == "in_progress" else 0, "completed": 0 if status == "in_progress" else len(file_ids), "failed": 0, "cancelled": 0, "total": len(file_ids) }, "_file_ids": file_ids, "_started_at": time.monotonic() }
+            state.file_batches[batch["id"]] = batch
+
+        self.__json__(self.__public__(batch))
+
+    def retrieve_file_batch(self, state: MockState, query: dict, body: bytes, vector_store_id: str, batch_id: str) -> None:
+        self.__json__(self.__public__(state.advance_batch(state.file_batches[batch_id])))
+
+    def cancel_file_batch(self, state: MockState, query: dict, body: bytes, vector_store_id: str, batch_id: str) -> None:
+        with state.lock:
+            batch = state.advance_batch(state.file_batches[batch_id])
+            if batch["status"] == "in_progress": batch.update(status="cancelled", file_counts={ **batch["file_counts"], "in_progress": 0, "cancelled": batch["file_counts"]["in_progress"] })
+            self.__json__(self.__public__(batch))
+
+    def list_file_batch_files(self, state: MockState, query: dict, body: bytes, vector_store_id: str, batch_id: str) -> None:
+        with state.lock:
+            batch = state.advance_batch(state.file_batches[batch_id])
+            files = state.vector_store_files[vector_store_id]
+            self.__list__([files[file_id] for file_id in batch["_file_ids"] if file_id in files and (not query.get("filter") or files[file_id]["status"] == query["filter"])], query)
+
+    def __attach__(self, state: MockState, vector_store_id: str, file_id: str, status: str) -> dict:
+        file = { "id": file_id, "object": "vector_store.file", "created_at": int(time.time()), "vector_store_id": vector_store_id, "status": status, "usage_bytes": state.files[file_id]["bytes"], "last_error": None }
+        state.vector_store_files[vector_store_id][file_id] = file
+        return file
+
+Id = r"([^/]+)"
+Routes = [
+    ("POST", r"/assistants", MockHandler.create_assistant),
+    ("GET", r"/assistants", MockHandler.list_assistants),
+    ("GET", rf"/assistants/{Id}", MockHandler.retrieve_assistant),
+    ("POST", rf"/assistants/{Id}", MockHandler.update_assistant),
+    ("DELETE", rf"/assistants/{Id}", MockHandler.delete_assistant),
+    ("POST", r"/threads", MockHandler.create_thread),
+    ("POST", r"/threads/runs", MockHandler.create_thread_and_run),
+    ("GET", rf"/threads/{Id}", MockHandler.retrieve_thread),
+    ("POST", rf"/threads/{Id}/messages", MockHandler.create_message),
+    ("GET", rf"/threads/{Id}/messages", MockHandler.list_messages),
+    ("POST", rf"/threads/{Id}/runs", MockHandler.create_run),
+    ("GET", rf"/threads/{Id}/runs", MockHandler.list_runs),
+    ("GET", rf"/threads/{Id}/runs/{Id}", MockHandler.retrieve_run),
+    ("POST", rf"/threads/{Id}/runs/{Id}/cancel", MockHandler.cancel_run),
+    ("POST", r"/files", MockHandler.create_file),
+    ("GET", r"/files", MockHandler.list_files),
+    ("GET", rf"/files/{Id}", MockHandler.retrieve_file),
+    ("DELETE", rf"/files/{Id}", MockHandler.delete_file),
+    ("GET", rf"/files/{Id}/content", MockHandler.file_content),
+    ("POST", r"/vector_stores", MockHandler.create_vector_store),
+    ("GET", r"/vector_stores", MockHandler.list_vector_stores),
+    ("GET", rf"/vector_stores/{Id}", MockHandler.retrieve_vector_store),
+    ("DELETE", rf"/vector_stores/{Id}", MockHandler.delete_vector_store),
+    ("POST", rf"/vector_stores/{Id}/files", MockHandler.create_vector_store_file),
+    ("GET", rf"/vector_stores/{Id}/files", MockHandler.list_vector_store_files),
+    ("DELETE", rf"/vector_stores/{Id}/files/{Id}", MockHandler.delete_vector_store_file),
+    ("POST", rf"/vector_stores/{Id}/file_batches", MockHandler.create_file_batch),
+    ("GET", rf"/vector_stores/{Id}/file_batches/{Id}", MockHandler.retrieve_file_batch),
+    ("POST", rf"/vector_stores/{Id}/file_batches/{Id}/cancel", MockHandler.cancel_file_batch),
+    ("GET", rf"/vector_stores/{Id}/file_batches/{Id}/files", MockHandler.list_file_batch_files),
+]
+
+class MockServerCore(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], state: MockState, latency: float, jitter: float, seed: int | None) -> None:
+        super().__init__(address, MockHandler)
+        self.state = state
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+
+    def sleep(self) -> None:
+        """
+        模擬網路 + 伺服器的延遲 (latency ± jitter)
+        """
+        with self.random_lock: delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0: time.sleep(delay)
+
+class MockServer:
+    """
+    本地的模擬Assistants API伺服器 (不用花錢呼叫真的API，拿來測效能)
+      - 使用方式: with MockServer() as server: CustomAssistant(..., base_url=server.base_url)
+      - 每個請求都會延遲 latency ± jitter 秒 (seed固定的話，每次的延遲序列都一樣)
+    """
+    def __init__(self, latency: float = 0.02, jitter: float = 0.005, queue_time: float = 0.05, run_time: float = 0.2, ingest_time: float = 0.05, reply: str = "這是模擬伺服器的回答，" * 10, seed: int | None = 42, host: str = "127.0.0.1", port: int = 0, stall_rate: float = 0.0) -> None:
+        """
+        初始化
+
+        參數:
+            latency: 每個請求的延遲 (秒)
+            jitter: 延遲的隨機變動範圍 (秒)
+            queue_time: Run排隊的時間 (秒)
+            run_time: Run執行中的時間 (秒，串流時平均分給每個Token)
+            ingest_time: VectorStore處理檔案的時間 (秒)
+            reply: 助手回答的文字
+            seed: 延遲的亂數種子 (None = 每次都不一樣)
+            host: 監聽的位址
+            port: 監聽的Port (0 = 自動選一個沒被使用的)
+            stall_rate: 永遠停在queued (直到被取消) 的Run比例
+        """
+        self.state = MockState(queue_time, run_time, ingest_time, reply, stall_rate, seed)
+        self.server = MockServerCore((host, port), self.state, latency, jitter, seed)
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, name="MockServer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread: self.thread.join()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,118 @@
+import os
+import secrets
+from returns.result import Success, Failure
+from Assistant.CustomAssistant import CustomAssistant
+from Assistant.Model.Constant import RunWaitMode, MetadataKind
+from Assistant.Benchmark.BenchmarkRunner import BenchmarkRunner, BenchmarkResult
+
+class BenchmarkScenarios:
+    """
+    CustomAssistant的效能測試情境 (對話 / 串流 / 批次上傳 / 批次刪除 / 名稱查詢)
+    """
+    Names = ("chat_polling", "chat_streaming", "chatting_stream", "bulk_upload", "bulk_delete", "name_lookup", "name_lookup_cached")
+
+    def __init__(self, assistant: CustomAssistant, runner: BenchmarkRunner, batch_size: int = 10, file_size: int = 4096) -> None:
+        """
+        初始化
+
+        參數:
+            assistant: 已經use_by_id / create過的助手 (連到MockServer)
+            runner: BenchmarkRunner
+            batch_size: 批次上傳 / 刪除時，每次操作的數量
+            file_size: 批次上傳時，每個檔案的大小 (bytes)
+        """
+        self.assistant = assistant
+        self.runner = runner
+        self.batch_size = batch_size
+        self.file_size = file_size
+
+    def run(self, names: list[str] | None = None) -> list[BenchmarkResult]:
+        """
+        執行情境們
+
+        參數:
+            names: 要執行的情境名稱 (None = 全部)
+        回傳:
+            list[BenchmarkResult]
+        """
+        return [getattr(self, name)() for name in (names or self.Names)]
+
+    def chat_polling(self) -> BenchmarkResult:
+        return self.runner.run("chat_polling", lambda key: self.assistant.chat("你好", mode=RunWaitMode.Polling, session_key=key), self.__session__)
+
+    def chat_streaming(self) -> BenchmarkResult:
+        return self.runner.run("chat_streaming", lambda key: self.assistant.chat("你好", mode=RunWaitMode.Streaming, session_key=key), self.__session__)
+
+    def chatting_stream(self) -> BenchmarkResult:
+        """
+        chatting()整段串流的時間 + 每秒收到的文字數 / SSE frame數 (所有串流加總)
+        """
+        counts = []
+
+        def operation(key: str) -> None:
+            texts, frames = [], 0
+            for _ in self.assistant.chatting("你好", onTextDeltaBlock=texts.append, session_key=key): frames += 1
+            counts.append((sum(len(text) for text in texts), frames))
+
+        result = self.runner.run("chatting_stream", operation, self.__session__)
+        counts = counts[-result.count:]
+
+        if result.elapsed > 0:
+            result.extra["chars_per_second"] = sum(characters for characters, _ in counts) / result.elapsed
+            result.extra["frames_per_second"] = sum(frames for _, frames in counts) / result.elapsed
+
+        return result
+
+    def bulk_upload(self) -> BenchmarkResult:
+        """
+        每次平行上傳batch_size個內容都不一樣的新檔案
+        """
+        def setup(index: int) -> list[str]:
+            filenames = [f"benchmark-upload-{secrets.token_hex(4)}-{number}.txt" for number in range(self.batch_size)]
+
+            for filename in filenames:
+                with open(os.path.join(os.path.expanduser(self.assistant.file_folder_path), filename), "wb") as file: file.write(os.urandom(self.file_size))
+
+            return filenames
+
+        def operation(filenames: list[str]):
+            result = self.assistant.upload_files_for_code_interpreter(filenames)
+
+            match result:
+                case Success(report): return Failure(RuntimeError(report.failed)) if report.failed else result
+                case _: return result
+
+        return self.runner.run("bulk_upload", operation, setup)
+
+    def bulk_delete(self) -> BenchmarkResult:
+        """
+        每次刪除batch_size個同名稱的助手 (建立助手不計時)
+        """
+        def setup(index: int) -> str:
+            name = f"benchmark-delete-{secrets.token_hex(4)}"
+
+            for _ in range(self.batch_size):
+                assistant = self.assistant.client.beta.assistants.create(name=name, instructions="benchmark", model="gpt-4o")
+                self.assistant.metadata_cache.put(MetadataKind.Assistant, assistant)
+
+            return name
+
+        def operation(name: str):
+            report = self.assistant.remove_by_name(name, requests_per_second=0)
+            return Failure(RuntimeError(report.failed)) if report.failed or report.count != self.batch_size else Success(report)
+
+        return self.runner.run("bulk_delete", operation, setup)
+
+    def name_lookup(self) -> BenchmarkResult:
+        return self.runner.run("name_lookup", lambda _: self.assistant.find_by_name(self.assistant.assistant.name, refresh=True))
+
+    def name_lookup_cached(self) -> BenchmarkResult:
+        return self.runner.run("name_lookup_cached", lambda _: self.assistant.find_by_name(self.assistant.assistant.name))
+
+    def __session__(self, index: int) -> str:
+        """
+        每次對話都用自己的Thread (先建立好，不計時)
+        """
+        key = f"benchmark-{secrets.token_hex(4)}-{index}"
+        self.assistant.__thread_id__(key)
+        return key
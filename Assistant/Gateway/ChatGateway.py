@@ -0,0 +1,246 @@
+import json
+import time
+import asyncio
+import secrets
+from dataclasses import dataclass, field
+from urllib.parse import urlparse, parse_qs
+from returns.result import Success, Failure
+from Assistant.AsyncCustomAssistant import AsyncCustomAssistant
+from Assistant.Model.Constant import RunWaitMode, StreamEventKind
+from Assistant.Model.StreamPipeline import sse_frame
+
+StatusTexts = { 200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 502: "Bad Gateway", 503: "Service Unavailable" }
+
+@dataclass
+class GatewayRequest:
+    """
+    解析好的HTTP請求
+
+    參數:
+        method: HTTP方法
+        path: 路徑
+        query: 網址參數
+        headers: 標頭 (名稱都是小寫)
+        body: 內容
+    """
+    method: str
+    path: str
+    query: dict[str, str] = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def parameters(self) -> dict:
+        """
+        網址參數 + JSON內容 (JSON優先)
+        """
+        if not self.body: return dict(self.query)
+
+        body = json.loads(self.body)
+        if not isinstance(body, dict): raise ValueError("內容必須是JSON物件")
+
+        return { **self.query, **body }
+
+class ChatGateway:
+    """
+    把AsyncCustomAssistant的對話開放成HTTP服務 (asyncio，一個process同時撐上千個串流)
+      - POST /chat => JSON { text, session }
+      - GET / POST /chat/stream => text/event-stream (SSE，跟chatting()一樣用sse_frame()：多行文字拆成多個「data: 」)
+      - GET /health => JSON { streams, max_streams, sessions, pools }
+      - 參數: content (對話文字) / session (或X-Session-Key標頭，每個使用者一個Thread，沒給就自動產生)
+      - HTTP/1.1 keep-alive，SSE用chunked傳送，閒置時送「: keep-alive」註解
+      - 連線中斷時取消遠端的Run，同時進行中的對話超過max_streams時回傳503
+    """
+    def __init__(self, assistant: AsyncCustomAssistant, host: str = "127.0.0.1", port: int = 8080, max_streams: int = 1000, heartbeat: float = 15.0, idle_timeout: float = 60.0, max_body: int = 64 * 1024) -> None:
+        """
+        初始化
+
+        參數:
+            assistant: 已經use_by_id / use_by_name過的AsyncCustomAssistant
+            host: 監聽的位址
+            port: 監聽的Port
+            max_streams: 同時進行中的對話上限
+            heartbeat: SSE閒置多久送一次「: keep-alive」(秒)
+            idle_timeout: keep-alive的連線閒置多久後關閉 (秒)
+            max_body: 請求內容的大小上限 (bytes)
+        """
+        self.assistant = assistant
+        self.host = host
+        self.port = port
+        self.max_streams = max_streams
+        self.heartbeat = heartbeat
+        self.idle_timeout = idle_timeout
+        self.max_body = max_body
+        self.streams = 0
+        self.busy_sessions: set[str] = set()
+
+    async def start(self) -> asyncio.Server:
+        """
+        開始監聽 (不會卡住)
+
+        回傳:
+            asyncio.Server
+        """
+        return await asyncio.start_server(self.__connection__, self.host, self.port)
+
+    async def serve(self) -> None:
+        """
+        開始監聽，直到被取消
+        """
+        server = await self.start()
+        async with server: await server.serve_forever()
+
+    async def __connection__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        處理一條連線 (keep-alive時同一條連線會有多個請求)
+        """
+        try:
+            while True:
+                request = await self.__read_request__(reader, writer)
+                if request is None: break
+
+                keep_alive = await self.__route__(request, reader, writer)
+                if not keep_alive or not request.keep_alive: break
+
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    async def __read_request__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> GatewayRequest | None:
+        """
+        讀取一個請求 (連線關閉 / 閒置太久 / 格式錯誤 (回傳400後關閉連線) => None)
+        """
+        line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        if not line.strip(): return None
+
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+            url = urlparse(target)
+            headers = {}
+
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length") or 0)
+            if length < 0: raise ValueError(f"Content-Length不能是負數: {length}")
+
+        except ValueError as error:
+            await self.__respond__(writer, 400, { "error": f"請求格式錯誤: {error}" }, keep_alive=False)
+            return None
+
+        if length > self.max_body:
+            await self.__respond__(writer, 413, { "error": "請求內容太大" }, keep_alive=False)
+            return None
+
+        body = await reader.readexactly(length) if length else b""
+        return GatewayRequest(method.upper(), url.path, { key: values[-1] for key, values in parse_qs(url.query).items() }, headers, body)
+
+    async def __route__(self, request: GatewayRequest, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """
+        依路徑處理請求
+
+        回傳:
+            bool: 連線是否可以繼續使用
+        """
+        match (request.method, request.path):
+            case ("GET", "/health"): return await self.__respond__(writer, 200, { "streams": self.streams, "max_streams": self.max_streams, "sessions": len(self.assistant.sessions), "pools": self.assistant.client_factory.stats() })
+            case ("POST", "/chat"): handler = self.__chat__
+            case ("GET" | "POST", "/chat/stream"): handler = self.__stream__
+            case (_, "/health" | "/chat" | "/chat/stream"): return await self.__respond__(writer, 405, { "error": "不支援的HTTP方法" })
+            case _: return await self.__respond__(writer, 404, { "error": "找不到這個路徑" })
+
+        try:
+            parameters = request.parameters()
+        except ValueError as error:
+            return await self.__respond__(writer, 400, { "error": f"JSON格式錯誤: {error}" })
+
+        content = str(parameters.get("content") or "")
+        session_key = request.headers.get("x-session-key") or str(parameters.get("session") or "") or secrets.token_urlsafe(16)
+
+        if not content.strip(): return await self.__respond__(writer, 400, { "error": "不得輸入空白字串…" })
+        if self.streams >= self.max_streams: return await self.__respond__(writer, 503, { "error": "同時進行中的對話太多了" }, headers={ "Retry-After": "1" })
+        if session_key in self.busy_sessions: return await self.__respond__(writer, 409, { "error": "這個對話還有進行中的回答" })
+
+        self.streams += 1
+        self.busy_sessions.add(session_key)
+
+        try:
+            return await handler(content, session_key, reader, writer)
+        finally:
+            self.streams -= 1
+            self.busy_sessions.discard(session_key)
+
+    async def __chat__(self, content: str, session_key: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        result = await self.assistant.chat(content, mode=RunWaitMode.Streaming, session_key=session_key)
+
+        match result:
+            case Success(text): return await self.__respond__(writer, 200, { "text": text, "session": session_key }, headers={ "X-Session-Key": session_key })
+            case Failure(error): return await self.__respond__(writer, 502, { "error": str(error), "session": session_key }, headers={ "X-Session-Key": session_key })
+
+    async def __stream__(self, content: str, session_key: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """
+        SSE串流 (一邊收到一邊送出，連線中斷時取消串流 = 取消遠端的Run)
+
+        回傳:
+            bool: 連線是否可以繼續使用
+        """
+        writer.write(self.__head__(200, { "Content-Type": "text/event-stream", "Cache-Control": "no-cache", "Transfer-Encoding": "chunked", "X-Session-Key": session_key }))
+        last_write = [time.monotonic()]
+
+        async def pump() -> None:
+            try:
+                async for event in self.assistant.stream_events(content, session_key, max_pending=32):
+                    writer.write(self.__chunk__(sse_frame(event.value, None if event.kind == StreamEventKind.Text else event.kind.value).encode()))
+                    last_write[0] = time.monotonic()
+                    await writer.drain()
+            except Exception as error:
+                writer.write(self.__chunk__(sse_frame(str(error), "error").encode()))
+
+            writer.write(self.__chunk__(sse_frame("[DONE]", "done").encode()) + self.__chunk__(b""))
+            await writer.drain()
+
+        async def heartbeat() -> None:
+            while True:
+                await asyncio.sleep(max(0.0, last_write[0] + self.heartbeat - time.monotonic()))
+                if time.monotonic() - last_write[0] < self.heartbeat: continue
+
+                writer.write(self.__chunk__(b": keep-alive\n\n"))
+                last_write[0] = time.monotonic()
+
+        stream = asyncio.create_task(pump())
+        watcher = asyncio.create_task(reader.read(1))
+        beater = asyncio.create_task(heartbeat())
+
+        try:
+            await asyncio.wait({ stream, watcher }, return_when=asyncio.FIRST_COMPLETED)
+            if watcher.done() and not watcher.exception() and watcher.result(): await stream
+        finally:
+            for task in (stream, watcher, beater): task.cancel()
+            await asyncio.gather(stream, watcher, beater, return_exceptions=True)
+
+        return not watcher.done() or watcher.cancelled()
+
+    async def __respond__(self, writer: asyncio.StreamWriter, status: int, payload: dict, headers: dict[str, str] | None = None, keep_alive: bool = True) -> bool:
+        """
+        回傳JSON
+
+        回傳:
+            bool: 連線是否可以繼續使用
+        """
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        writer.write(self.__head__(status, { "Content-Type": "application/json; charset=utf-8", "Content-Length": str(len(data)), "Connection": "keep-alive" if keep_alive else "close", **(headers or {}) }) + data)
+        await writer.drain()
+
+        return keep_alive
+
+    def __head__(self, status: int, headers: dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {StatusTexts.get(status, '')}"] + [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", errors="replace")
+
+    def __chunk__(self, data: bytes) -> bytes:
+        return b"%x\r\n%s\r\n" % (len(data), data)
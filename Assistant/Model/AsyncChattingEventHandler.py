@@ -0,0 +1,52 @@
+from typing import override, Awaitable, Callable, List
+from openai import AsyncAssistantEventHandler
+from openai.types.beta.threads.runs.code_interpreter_tool_call_delta import CodeInterpreterOutput
+from Assistant.Model.Constant import StreamEventKind
+from Assistant.Model.Metrics import StreamMeter, NullStreamMeter
+
+class AsyncChattingEventHandler(AsyncAssistantEventHandler):
+
+    def __init__(self, emit: Callable[[StreamEventKind, str], Awaitable[None]], meter: StreamMeter = NullStreamMeter, onFile: Callable[[str, str | None], Awaitable] | None = None) -> None:
+        super().__init__()
+        self.emit = emit
+        self.meter = meter
+        self.onFile = onFile
+        self.file_ids: set[str] = set()
+
+    @override
+    async def on_text_delta(self, delta, snapshot):
+        for annotation in delta.annotations or []:
+            if annotation.type == "file_path" and annotation.file_path: await self.__file__(annotation.file_path.file_id, annotation.text)
+
+        if not delta.value: return
+        self.meter.delta()
+        await self.emit(StreamEventKind.Text, delta.value)
+
+    @override
+    async def on_image_file_done(self, image_file):
+        await self.__file__(image_file.file_id)
+
+    @override
+    async def on_tool_call_created(self, tool_call):
+        await self.emit(StreamEventKind.ToolCall, tool_call.type)
+
+    @override
+    async def on_tool_call_delta(self, delta, snapshot):
+        if delta.type != 'code_interpreter': return
+        if delta.code_interpreter.input: await self.emit(StreamEventKind.CodeInput, delta.code_interpreter.input); return
+        if delta.code_interpreter.outputs: await self.__code_interpreter_outputs__(delta.code_interpreter.outputs); return
+
+    async def __code_interpreter_outputs__(self, outputs: List[CodeInterpreterOutput]):
+        for output in outputs:
+            if output.type == "logs": await self.emit(StreamEventKind.Logs, output.logs)
+            if output.type == "image" and output.image: await self.__file__(output.image.file_id)
+
+    async def __file__(self, file_id: str | None, filename: str | None = None):
+        """
+        助手產生的檔案 (同一個FileId只通知一次，code interpreter的圖片和訊息裡的圖片是同一個)
+        """
+        if not file_id or file_id in self.file_ids: return
+
+        self.file_ids.add(file_id)
+        if self.onFile: await self.onFile(file_id, filename)
+        await self.emit(StreamEventKind.File, file_id)
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator
+from returns.result import Result, Success, Failure
+
+@dataclass
+class BatchChatReport:
+    """
+    批次對話的結果
+
+    參數:
+        succeeded: 成功的數量
+        failed: 失敗的數量
+        skipped: 之前已經完成、這次略過的數量 (續跑)
+        invalid: 格式錯誤的行數
+        elapsed: 花費的時間 (秒)
+    """
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return self.succeeded + self.failed + self.skipped + self.invalid
+
+class BatchCheckpoint:
+    """
+    批次對話的進度檔
+      - watermark: 這行之前全部都完成了
+      - done: watermark之後已經完成的行 (最多只有同時進行中的數量那麼多)
+      - 存檔時先寫暫存檔再rename，不會寫壞原本的進度
+    """
+    def __init__(self, file_path: str) -> None:
+        """
+        初始化 (進度檔不存在 / 壞掉時從頭開始)
+
+        參數:
+            file_path: 進度檔的路徑
+        """
+        self.file_path = os.path.expanduser(file_path)
+        self.watermark = 0
+        self.done: set[int] = set()
+
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as file: state = json.load(file)
+            self.watermark, self.done = int(state["watermark"]), set(state["done"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def is_done(self, line: int) -> bool:
+        return line < self.watermark or line in self.done
+
+    def complete(self, line: int) -> None:
+        """
+        記錄完成的行 (連續完成的部分併進watermark)
+
+        參數:
+            line: 行號 (從0開始)
+        """
+        self.done.add(line)
+        while self.watermark in self.done: self.done.remove(self.watermark); self.watermark += 1
+
+    def save(self) -> None:
+        temporary_path = f"{self.file_path}.tmp"
+
+        with open(temporary_path, "w", encoding="utf-8") as file: json.dump({ "watermark": self.watermark, "done": sorted(self.done) }, file)
+        os.replace(temporary_path, self.file_path)
+
+class BatchChat:
+    """
+    批次對話 (JSONL => JSONL)
+      - 一行一行讀輸入檔，最多concurrency個對話同時進行，記憶體用量跟檔案大小無關
+      - 每個完成的對話馬上寫到輸出檔 (順序 = 完成的順序，用line對應輸入)，並更新進度檔
+      - 中斷後再執行一次，會略過已經完成的行 (寫完輸出、還沒更新進度時中斷的那幾行會再跑一次)
+      - 輸入每行: "問題" 或 { "content": "問題", "id": ... }
+      - 輸出每行: { "line", "id", "content", "text" } 或 { "line", "id", "content", "error" }
+    """
+    def __init__(self, concurrency: int = 8) -> None:
+        """
+        初始化
+
+        參數:
+            concurrency: 最多同時進行的對話數量
+        """
+        self.concurrency = max(1, concurrency)
+
+    def run(self, input_path: str, output_path: str, chat: Callable[[str, int], Result[str, Exception]], checkpoint_path: str | None = None) -> BatchChatReport:
+        """
+        批次對話
+
+        參數:
+            input_path: 輸入的JSONL檔
+            output_path: 輸出的JSONL檔 (續跑時接在後面)
+            chat: 對話的函式 ((問題, 行號) => Result[<回答>, Exception])
+            checkpoint_path: 進度檔的路徑 (None = <輸出檔>.checkpoint)
+        回傳:
+            BatchChatReport
+        """
+        report, checkpoint, started_at = BatchChatReport(), BatchCheckpoint(checkpoint_path or f"{output_path}.checkpoint"), time.perf_counter()
+        slots = threading.BoundedSemaphore(self.concurrency)
+        lock = threading.Lock()
+
+        with open(os.path.expanduser(output_path), "a", encoding="utf-8") as output:
+
+            def task(line: int, record: dict) -> None:
+                try:
+                    result = self.__chat__(chat, record, line)
+                    with lock: self.__write__(output, checkpoint, report, line, record, result)
+                finally:
+                    slots.release()
+
+            for line, record, text in self.__records__(input_path, checkpoint, report):
+                if record is None:
+                    with lock: self.__invalid__(checkpoint, report, line, text)
+                    continue
+
+                slots.acquire()
+                threading.Thread(target=task, args=(line, record), name=f"BatchChat-{line}", daemon=True).start()
+
+            for _ in range(self.concurrency): slots.acquire()
+            checkpoint.save()
+
+        report.elapsed = time.perf_counter() - started_at
+        return report
+
+    async def run_async(self, input_path: str, output_path: str, chat: Callable[[str, int], Awaitable[Result[str, Exception]]], checkpoint_path: str | None = None) -> BatchChatReport:
+        """
+        批次對話 (非同步版本)
+
+        參數:
+            input_path: 輸入的JSONL檔
+            output_path: 輸出的JSONL檔 (續跑時接在後面)
+            chat: 對話的coroutine函式 ((問題, 行號) => Result[<回答>, Exception])
+            checkpoint_path: 進度檔的路徑 (None = <輸出檔>.checkpoint)
+        回傳:
+            BatchChatReport
+        """
+        report, checkpoint, started_at = BatchChatReport(), BatchCheckpoint(checkpoint_path or f"{output_path}.checkpoint"), time.perf_counter()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task] = set()
+
+        with open(os.path.expanduser(output_path), "a", encoding="utf-8") as output:
+
+            async def task(line: int, record: dict) -> None:
+                try:
+                    self.__write__(output, checkpoint, report, line, record, await self.__chat_async__(chat, record, line))
+                finally:
+                    slots.release()
+
+            for line, record, text in self.__records__(input_path, checkpoint, report):
+                if record is None: self.__invalid__(checkpoint, report, line, text); continue
+
+                await slots.acquire()
+                running = asyncio.create_task(task(line, record))
+                tasks.add(running)
+                running.add_done_callback(tasks.discard)
+
+            await asyncio.gather(*tasks)
+            checkpoint.save()
+
+        report.elapsed = time.perf_counter() - started_at
+        return report
+
+    def __records__(self, input_path: str, checkpoint: BatchCheckpoint, report: BatchChatReport) -> Iterator[tuple[int, dict | None, str]]:
+        """
+        一行一行讀取輸入檔 (略過已完成的行，格式錯誤 / 空白的行 => record = None)
+        """
+        with open(os.path.expanduser(input_path), "r", encoding="utf-8") as file:
+            for line, text in enumerate(file):
+                if checkpoint.is_done(line): report.skipped += 1; continue
+                yield line, self.__parse__(text), text
+
+    def __invalid__(self, checkpoint: BatchCheckpoint, report: BatchChatReport, line: int, text: str) -> None:
+        """
+        格式錯誤 / 空白的行直接算完成 (呼叫前要先拿到lock)
+        """
+        if text.strip(): report.invalid += 1
+        checkpoint.complete(line)
+
+    def __parse__(self, text: str) -> dict | None:
+        try:
+            record = json.loads(text)
+        except ValueError:
+            return None
+
+        if isinstance(record, str): record = { "content": record }
+        if not isinstance(record, dict) or not isinstance(record.get("content"), str) or not record["content"].strip(): return None
+
+        return record
+
+    def __chat__(self, chat: Callable[[str, int], Result[str, Exception]], record: dict, line: int) -> Result[str, Exception]:
+        """
+        對話 (丟出例外也當成失敗的結果，一樣寫到輸出檔、更新進度)
+        """
+        try:
+            return chat(record["content"], line)
+        except Exception as error:
+            return Failure(error)
+
+    async def __chat_async__(self, chat: Callable[[str, int], Awaitable[Result[str, Exception]]], record: dict, line: int) -> Result[str, Exception]:
+        try:
+            return await chat(record["content"], line)
+        except Exception as error:
+            return Failure(error)
+
+    def __write__(self, output, checkpoint: BatchCheckpoint, report: BatchChatReport, line: int, record: dict, result: Result[str, Exception]) -> None:
+        """
+        寫入一筆結果，然後更新進度 (呼叫前要先拿到lock)
+        """
+        entry = { "line": line, "id": record.get("id"), "content": record["content"] }
+
+        match result:
+            case Success(text): entry["text"] = text; report.succeeded += 1
+            case Failure(error): entry["error"] = str(error); report.failed += 1
+
+        output.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        output.flush()
+
+        checkpoint.complete(line)
+        checkpoint.save()
@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+from Assistant.Model.RateLimiter import RateLimiter
+
+@dataclass
+class BulkDeleteReport:
+    """
+    批次刪除的結果
+
+    參數:
+        deleted: 刪除成功的Id們
+        failed: 刪除失敗的Id => 錯誤
+        skipped: 不存在 / 沒有被刪除的Id們
+    """
+    deleted: list[str] = field(default_factory=list)
+    failed: dict[str, Exception] = field(default_factory=dict)
+    skipped: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        """
+        刪除成功的數量
+        """
+        return len(self.deleted)
+
+class BulkDeleter:
+    """
+    批次刪除引擎
+      - 最多max_workers個刪除同時進行
+      - 所有刪除共用每秒requests_per_second個請求的額度
+      - 暫時性的錯誤 (429 / 5xx / 連線逾時) 由RequestScheduler統一重試
+    """
+    def __init__(self, max_workers: int = 8, requests_per_second: float = 5.0) -> None:
+        """
+        初始化
+
+        參數:
+            max_workers: 最多同時刪除的數量
+            requests_per_second: 每秒最多的請求數 (<= 0 = 不限流)
+        """
+        self.max_workers = max(1, max_workers)
+        self.limiter = RateLimiter(requests_per_second)
+
+    def run(self, ids: Iterable[str], delete: Callable[[str], Any]) -> BulkDeleteReport:
+        """
+        批次刪除
+
+        參數:
+            ids: 要刪除的Id們
+            delete: 刪除單一Id的函式 (回傳有deleted屬性的物件)
+        回傳:
+            BulkDeleteReport
+        """
+        from openai import NotFoundError
+        report = BulkDeleteReport()
+        ids = list(dict.fromkeys(ids))
+
+        def task(id: str) -> None:
+            self.limiter.acquire()
+            try:
+                self.__record__(report, id, delete(id))
+            except NotFoundError:
+                report.skipped.append(id)
+            except Exception as error:
+                report.failed[id] = error
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(ids)))) as executor:
+            list(executor.map(task, ids))
+
+        return report
+
+    async def run_async(self, ids: Iterable[str], delete: Callable[[str], Awaitable[Any]]) -> BulkDeleteReport:
+        """
+        批次刪除 (非同步版本)
+
+        參數:
+            ids: 要刪除的Id們
+            delete: 刪除單一Id的coroutine函式 (回傳有deleted屬性的物件)
+        回傳:
+            BulkDeleteReport
+        """
+        from openai import NotFoundError
+        report = BulkDeleteReport()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def task(id: str) -> None:
+            async with semaphore:
+                await self.limiter.acquire_async()
+                try:
+                    self.__record__(report, id, await delete(id))
+                except NotFoundError:
+                    report.skipped.append(id)
+                except Exception as error:
+                    report.failed[id] = error
+
+        await asyncio.gather(*(task(id) for id in dict.fromkeys(ids)))
+        return report
+
+    def __record__(self, report: BulkDeleteReport, id: str, info: Any) -> None:
+        if getattr(info, "deleted", False): report.deleted.append(id)
+        else: report.skipped.append(id)
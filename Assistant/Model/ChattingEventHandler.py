@@ -1,33 +1,52 @@
-from typing import override, List
+from typing import override, Callable, List
 from openai import AssistantEventHandler
 from openai.types.beta.threads.runs.code_interpreter_tool_call_delta import CodeInterpreterOutput
+from Assistant.Model.Constant import StreamEventKind
+from Assistant.Model.Metrics import StreamMeter, NullStreamMeter
 
 class ChattingEventHandler(AssistantEventHandler):
 
-    def __init__(self, onTextDeltaBlock: lambda value: str, onCodeInterpreterInputBlock: lambda input: str) -> None:
+    def __init__(self, emit: Callable[[StreamEventKind, str], None], meter: StreamMeter = NullStreamMeter, onFile: Callable[[str, str | None], None] | None = None) -> None:
         super().__init__()
-        self.onTextDeltaBlock = onTextDeltaBlock
-        self.onCodeInterpreterInputBlock = onCodeInterpreterInputBlock
+        self.emit = emit
+        self.meter = meter
+        self.onFile = onFile
+        self.file_ids: set[str] = set()
 
     @override
-    def on_text_created(self, text) -> None:
-        print(f"\n\n[on_text_created] assistant > \n", end="", flush=True)
+    def on_text_delta(self, delta, snapshot):
+        for annotation in delta.annotations or []:
+            if annotation.type == "file_path" and annotation.file_path: self.__file__(annotation.file_path.file_id, annotation.text)
+
+        if not delta.value: return
+        self.meter.delta()
+        self.emit(StreamEventKind.Text, delta.value)
 
     @override
-    def on_text_delta(self, delta, snapshot):
-        self.onTextDeltaBlock(lambda: delta.value)
+    def on_image_file_done(self, image_file):
+        self.__file__(image_file.file_id)
 
+    @override
     def on_tool_call_created(self, tool_call):
-        print(f"\n\n[on_tool_call_created] assistant > {tool_call.type}\n", end="", flush=True)
+        self.emit(StreamEventKind.ToolCall, tool_call.type)
 
+    @override
     def on_tool_call_delta(self, delta, snapshot):
         if delta.type != 'code_interpreter': return
-        if delta.code_interpreter.input: self.__code_interpreter_input__(delta.code_interpreter.input); return
+        if delta.code_interpreter.input: self.emit(StreamEventKind.CodeInput, delta.code_interpreter.input); return
         if delta.code_interpreter.outputs: self.__code_interpreter_outputs__(delta.code_interpreter.outputs); return
 
-    def __code_interpreter_input__(self, input: str):
-        self.onCodeInterpreterInputBlock(lambda: input)
-
     def __code_interpreter_outputs__(self, outputs: List[CodeInterpreterOutput]):
         for output in outputs:
-            if output.type == "logs": self.util.print(f"\n{output.logs}", __file__, self.util.current_line()) 
\ No newline at end of file
+            if output.type == "logs": self.emit(StreamEventKind.Logs, output.logs)
+            if output.type == "image" and output.image: self.__file__(output.image.file_id)
+
+    def __file__(self, file_id: str | None, filename: str | None = None):
+        """
+        助手產生的檔案 (同一個FileId只通知一次，code interpreter的圖片和訊息裡的圖片是同一個)
+        """
+        if not file_id or file_id in self.file_ids: return
+
+        self.file_ids.add(file_id)
+        if self.onFile: self.onFile(file_id, filename)
+        self.emit(StreamEventKind.File, file_id)
\ No newline at end of file
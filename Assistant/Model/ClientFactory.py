@@ -0,0 +1,332 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+import httpx
+from Assistant.Model.RequestScheduler import RequestScheduler, SchedulingTransport, AsyncSchedulingTransport
+from Assistant.Model.RequestCoalescer import RequestCoalescer, CoalescingTransport, AsyncCoalescingTransport
+from Assistant.Model.Metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+DefaultBaseUrl = "https://api.openai.com/v1"
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """
+    連線池的設定
+
+    參數:
+        max_connections: 最多同時開啟的連線數
+        max_keepalive_connections: 最多保留的閒置連線數
+        keepalive_expiry: 閒置連線保留多久 (秒)
+        connect_timeout: 建立連線的逾時 (秒)
+        read_timeout: 讀取回應的逾時 (秒)
+        write_timeout: 送出請求的逾時 (秒)
+        pool_timeout: 等待連線池空出連線的逾時 (秒)
+    """
+    max_connections: int = 1000
+    max_keepalive_connections: int = 100
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 600.0
+    write_timeout: float = 600.0
+    pool_timeout: float = 10.0
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive_connections, keepalive_expiry=self.keepalive_expiry)
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(connect=self.connect_timeout, read=self.read_timeout, write=self.write_timeout, pool=self.pool_timeout)
+
+class PoolStats:
+    """
+    連線池的統計 (請求數 / 同時使用中的連線數高峰 / 等不到連線的次數)
+    """
+    def __init__(self) -> None:
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.pool_timeouts = 0
+        self.lock = threading.Lock()
+
+    def begin(self) -> None:
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def end(self, error: Exception | None = None) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            if isinstance(error, httpx.PoolTimeout): self.pool_timeouts += 1
+
+    def snapshot(self, pool, settings: PoolSettings) -> dict:
+        """
+        目前的統計
+
+        參數:
+            pool: httpcore的連線池 (用來數目前的連線 / 閒置連線)
+            settings: PoolSettings
+        回傳:
+            dict
+        """
+        connections = list(getattr(pool, "connections", []))
+
+        with self.lock:
+            return {
+                "connections": len(connections),
+                "idle_connections": sum(1 for connection in connections if connection.is_idle()),
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "pool_timeouts": self.pool_timeouts,
+                "max_connections": settings.max_connections,
+                "max_keepalive_connections": settings.max_keepalive_connections,
+            }
+
+class PooledTransport(httpx.BaseTransport):
+    """
+    共用的HTTP連線池 (每個client關閉時不會關掉它，由ClientFactory.close()統一關閉)
+    """
+    def __init__(self, settings: PoolSettings) -> None:
+        self.settings = settings
+        self.transport = httpx.HTTPTransport(limits=settings.limits())
+        self.stats = PoolStats()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.begin()
+        error = None
+
+        try:
+            return self.transport.handle_request(request)
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self.stats.end(error)
+
+    def snapshot(self) -> dict:
+        return self.stats.snapshot(getattr(self.transport, "_pool", None), self.settings)
+
+    def close(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        self.transport.close()
+
+class AsyncPooledTransport(httpx.AsyncBaseTransport):
+    """
+    共用的HTTP連線池 (非同步版本，只能在同一個event loop裡共用)
+    """
+    def __init__(self, settings: PoolSettings) -> None:
+        self.settings = settings
+        self.transport = httpx.AsyncHTTPTransport(limits=settings.limits())
+        self.stats = PoolStats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.begin()
+        error = None
+
+        try:
+            return await self.transport.handle_async_request(request)
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self.stats.end(error)
+
+    def snapshot(self) -> dict:
+        return self.stats.snapshot(getattr(self.transport, "_pool", None), self.settings)
+
+    async def aclose(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        await self.transport.aclose()
+
+class ClientFactory:
+    """
+    建立OpenAI的client (同一個API-Key + 網址共用同一個連線池，不用每個助手都重新建立連線 / TLS握手)
+      - 每個client還是有自己的RequestScheduler / MetricsRegistry
+      - 第一次建立client時才載入openai (import很慢)
+      - warm_up()可以在啟動時先把連線開好
+      - 同時進行中的相同讀取請求 (GET) 只送出一次 (RequestCoalescer)，coalescing_stats()可以看每個API合併掉多少
+    """
+    Shared = None
+    SharedLock = threading.Lock()
+
+    def __init__(self, settings: PoolSettings | None = None, coalesce: bool = True) -> None:
+        """
+        初始化
+
+        參數:
+            settings: 連線池的設定 (None = PoolSettings())
+            coalesce: 是否合併同時進行中的相同讀取請求
+        """
+        self.settings = settings or PoolSettings()
+        self.coalescer = RequestCoalescer(enabled=coalesce)
+        self.transports: dict[tuple[str, str], PooledTransport] = {}
+        self.async_transports: dict[tuple[str, str], AsyncPooledTransport] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "ClientFactory":
+        """
+        整個程式共用的ClientFactory
+
+        回傳:
+            ClientFactory
+        """
+        with cls.SharedLock:
+            if cls.Shared is None: cls.Shared = cls()
+            return cls.Shared
+
+    def client(self, api_key: str, base_url: str | None = None, scheduler: RequestScheduler | None = None, metrics: MetricsRegistry | None = None) -> OpenAI:
+        """
+        建立OpenAI的client (共用連線池)
+
+        參數:
+            api_key: OpenAI的API-Key
+            base_url: API的網址 (None = OpenAI官方)
+            scheduler: RequestScheduler (None = 整個程式共用的那一個)
+            metrics: MetricsRegistry (None = 整個程式共用的那一個)
+        回傳:
+            OpenAI
+        """
+        from openai import OpenAI, DefaultHttpxClient
+        metrics = metrics or MetricsRegistry.default()
+        transport = CoalescingTransport(self.coalescer, SchedulingTransport(scheduler or RequestScheduler.default(), transport=self.__transport__(api_key, base_url), metrics=metrics), metrics=metrics)
+        return OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=self.settings.timeout(), http_client=DefaultHttpxClient(transport=transport, timeout=self.settings.timeout()))
+
+    def async_client(self, api_key: str, base_url: str | None = None, scheduler: RequestScheduler | None = None, metrics: MetricsRegistry | None = None) -> AsyncOpenAI:
+        """
+        建立AsyncOpenAI的client (共用連線池)
+
+        參數:
+            api_key: OpenAI的API-Key
+            base_url: API的網址 (None = OpenAI官方)
+            scheduler: RequestScheduler (None = 整個程式共用的那一個)
+            metrics: MetricsRegistry (None = 整個程式共用的那一個)
+        回傳:
+            AsyncOpenAI
+        """
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        metrics = metrics or MetricsRegistry.default()
+        transport = AsyncCoalescingTransport(self.coalescer, AsyncSchedulingTransport(scheduler or RequestScheduler.default(), transport=self.__async_transport__(api_key, base_url), metrics=metrics), metrics=metrics)
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=self.settings.timeout(), http_client=DefaultAsyncHttpxClient(transport=transport, timeout=self.settings.timeout()))
+
+    def warm_up(self, api_key: str, base_url: str | None = None, connections: int = 4) -> int:
+        """
+        先建立連線 (同時送出connections個GET /models，不經過RequestScheduler)
+
+        參數:
+            api_key: OpenAI的API-Key
+            base_url: API的網址 (None = OpenAI官方)
+            connections: 要建立的連線數
+        回傳:
+            int: 成功的數量
+        """
+        transport = self.__transport__(api_key, base_url)
+
+        def open_connection(_) -> bool:
+            try:
+                response = transport.handle_request(self.__warm_up_request__(api_key, base_url))
+                response.read()
+                response.close()
+                return True
+            except httpx.HTTPError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as executor: return sum(executor.map(open_connection, range(connections)))
+
+    async def warm_up_async(self, api_key: str, base_url: str | None = None, connections: int = 4) -> int:
+        """
+        先建立連線 (非同步版本)
+
+        參數:
+            api_key: OpenAI的API-Key
+            base_url: API的網址 (None = OpenAI官方)
+            connections: 要建立的連線數
+        回傳:
+            int: 成功的數量
+        """
+        transport = self.__async_transport__(api_key, base_url)
+
+        async def open_connection() -> bool:
+            try:
+                response = await transport.handle_async_request(self.__warm_up_request__(api_key, base_url))
+                await response.aread()
+                await response.aclose()
+                return True
+            except httpx.HTTPError:
+                return False
+
+        return sum(await asyncio.gather(*(open_connection() for _ in range(connections))))
+
+    def stats(self) -> dict[str, dict]:
+        """
+        每個連線池的統計 (Key = 網址#API-Key的指紋，不會露出API-Key)
+
+        回傳:
+            dict[str, dict]
+        """
+        with self.lock:
+            pools = [(key, transport, "sync") for key, transport in self.transports.items()] + [(key, transport, "async") for key, transport in self.async_transports.items()]
+
+        return { f"{base_url}#{fingerprint}/{kind}": transport.snapshot() for (base_url, fingerprint), transport, kind in pools }
+
+    def coalescing_stats(self) -> dict[str, dict]:
+        """
+        每個API合併同時進行中的相同讀取請求的統計
+
+        回傳:
+            dict[str, dict]: { 操作 (例如: GET /assistants/{id}): { calls, upstream, collapsed } }
+        """
+        return self.coalescer.stats()
+
+    def close(self) -> None:
+        """
+        關閉所有同步的連線池
+        """
+        with self.lock:
+            transports = list(self.transports.values())
+            self.transports.clear()
+
+        for transport in transports: transport.shutdown()
+
+    async def aclose(self) -> None:
+        """
+        關閉所有非同步的連線池
+        """
+        with self.lock:
+            transports = list(self.async_transports.values())
+            self.async_transports.clear()
+
+        for transport in transports: await transport.shutdown()
+
+    def __key__(self, api_key: str, base_url: str | None) -> tuple[str, str]:
+        return ((base_url or DefaultBaseUrl).rstrip("/"), hashlib.sha256(api_key.encode()).hexdigest()[:8])
+
+    def __transport__(self, api_key: str, base_url: str | None) -> PooledTransport:
+        key = self.__key__(api_key, base_url)
+
+        with self.lock:
+            transport = self.transports.get(key)
+            if transport is None: transport = self.transports[key] = PooledTransport(self.settings)
+            return transport
+
+    def __async_transport__(self, api_key: str, base_url: str | None) -> AsyncPooledTransport:
+        key = self.__key__(api_key, base_url)
+
+        with self.lock:
+            transport = self.async_transports.get(key)
+            if transport is None: transport = self.async_transports[key] = AsyncPooledTransport(self.settings)
+            return transport
+
+    def __warm_up_request__(self, api_key: str, base_url: str | None) -> httpx.Request:
+        return httpx.Request("GET", f"{(base_url or DefaultBaseUrl).rstrip('/')}/models", headers={ "Authorization": f"Bearer {api_key}" })
@@ -2,4 +2,37 @@ from enum import Enum
 
 class OpenApiTool(Enum):
     CodeInterpreter = "code_interpreter"
-    FileSearch = "file_search"
\ No newline at end of file
+    FileSearch = "file_search"
+
+class RunWaitMode(Enum):
+    Polling = "polling"
+    Streaming = "streaming"
+
+class MetadataKind(Enum):
+    Assistant = "assistant"
+    UploadFile = "upload_file"
+    VectorStore = "vector_store"
+
+class RequestPriority(Enum):
+    Interactive = 0
+    Background = 1
+
+class StreamEventKind(Enum):
+    Text = "text"
+    CodeInput = "code_input"
+    Logs = "logs"
+    ToolCall = "tool_call"
+    File = "file"
+
+class RegistryKind(Enum):
+    Assistant = "assistant"
+    Thread = "thread"
+    UploadFile = "upload_file"
+    VectorStore = "vector_store"
+
+class IngestionStatus(Enum):
+    Uploading = "uploading"
+    InProgress = "in_progress"
+    Completed = "completed"
+    Failed = "failed"
+    Cancelled = "cancelled"
\ No newline at end of file
@@ -0,0 +1,351 @@
+import os
+import csv
+import json
+import zipfile
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
+from Assistant.Model.UploadPipeline import UploadReport
+
+# 可以轉換的副檔名
+SpreadsheetExtensions = (".xlsx", ".xlsm")
+DelimitedExtensions = (".csv", ".tsv")
+JsonExtensions = (".json", ".jsonl", ".ndjson")
+
+# 每次讀取的大小 (串流處理，記憶體用量跟檔案大小無關)
+ChunkSize = 1024 * 1024
+
+@dataclass(frozen=True)
+class CompactionSpec:
+    """
+    單一檔案的壓縮設定
+
+    參數:
+        format: 輸出的格式 ("csv" / "parquet"，parquet需要pyarrow)
+        sheets: 只保留的工作表們 (None = 全部，只對試算表有效)
+        columns: 只保留的欄位們 (用標題列的名稱，None = 全部)
+    """
+    format: str = "csv"
+    sheets: tuple[str, ...] | None = None
+    columns: tuple[str, ...] | None = None
+
+@dataclass
+class CompactionResult:
+    """
+    單一檔案的壓縮結果
+
+    參數:
+        filename: 原始的檔案名稱
+        outputs: 輸出的檔案路徑們 (試算表每個工作表一個檔案，不能轉換 / 失敗 = 原始檔案)
+        original_bytes: 原始的大小
+        compacted_bytes: 輸出的總大小
+        error: 失敗的原因 (失敗時上傳原始檔案)
+    """
+    filename: str
+    outputs: list[str] = field(default_factory=list)
+    original_bytes: int = 0
+    compacted_bytes: int = 0
+    error: Exception | None = None
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.compacted_bytes
+
+@dataclass
+class CompactionReport:
+    """
+    上傳前壓縮的結果
+
+    參數:
+        results: 檔案名稱 => CompactionResult
+        bundle_path: 小檔案們打包成的zip (None = 沒有打包)
+        bundled: 打包進zip的輸出檔案路徑們
+        upload: 上傳的結果 (UploadReport，只壓縮不上傳 = None)
+    """
+    results: dict[str, CompactionResult] = field(default_factory=dict)
+    bundle_path: str | None = None
+    bundled: list[str] = field(default_factory=list)
+    upload: UploadReport | None = None
+
+    @property
+    def saved_bytes(self) -> int:
+        """
+        總共省下的大小 (打包的zip也算進去)
+        """
+        original = sum(result.original_bytes for result in self.results.values())
+        return original - sum(os.path.getsize(file_path) for file_path in self.files.values())
+
+    @property
+    def failed(self) -> dict[str, Exception]:
+        return { filename: result.error for filename, result in self.results.items() if result.error }
+
+    @property
+    def files(self) -> dict[str, str]:
+        """
+        要上傳的 檔案名稱 => 檔案路徑 (打包的zip + 沒打包的輸出檔案)
+        """
+        files = { os.path.basename(self.bundle_path): self.bundle_path } if self.bundle_path else {}
+        bundled = set(self.bundled)
+
+        for result in self.results.values():
+            for file_path in result.outputs:
+                if file_path not in bundled: files[os.path.basename(file_path)] = file_path
+
+        return files
+
+def compact_file(filename: str, file_path: str, output_folder_path: str, spec: CompactionSpec) -> CompactionResult:
+    """
+    壓縮單一檔案 (給子process呼叫的模組層級函式)
+    """
+    return DataCompactor(output_folder_path, max_workers=1).compact(filename, file_path, spec)
+
+class DataCompactor:
+    """
+    上傳給Code Interpreter前的本地壓縮
+      - 試算表 => CSV / Parquet、只保留需要的工作表 / 欄位、JSON => CSV
+      - 一列一列串流處理，記憶體用量跟檔案大小無關
+      - 多個檔案用多個process同時處理
+      - 小檔案們打包成一個zip (檔案內容一樣時zip也一樣，上傳的雜湊去重有效)
+      - openpyxl / pyarrow 用到時才載入
+    """
+    def __init__(self, output_folder_path: str, max_workers: int | None = None, bundle_max_bytes: int = 1024 * 1024, bundle_name: str = "bundle.zip") -> None:
+        """
+        初始化
+
+        參數:
+            output_folder_path: 輸出的資料夾
+            max_workers: 最多同時處理的process數量 (None = CPU數量，1 = 不開子process)
+            bundle_max_bytes: 小於這個大小的輸出檔案打包成zip (0 = 不打包)
+            bundle_name: 打包的zip檔名
+        """
+        self.output_folder_path = os.path.expanduser(output_folder_path)
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.bundle_max_bytes = bundle_max_bytes
+        self.bundle_name = bundle_name
+
+    def run(self, file_paths: dict[str, str], specs: dict[str, CompactionSpec] | None = None, default_spec: CompactionSpec | None = None) -> CompactionReport:
+        """
+        壓縮檔案們 (再打包小檔案)
+
+        參數:
+            file_paths: 檔案名稱 => 檔案路徑
+            specs: 檔案名稱 => CompactionSpec (沒有設定的檔案用default_spec)
+            default_spec: 預設的CompactionSpec (None = CompactionSpec())
+        回傳:
+            CompactionReport
+        """
+        self.__unique__(file_paths.keys(), "檔案名稱")
+        os.makedirs(self.output_folder_path, exist_ok=True)
+        specs, default_spec = specs or {}, default_spec or CompactionSpec()
+        arguments = [(filename, file_path, self.output_folder_path, specs.get(filename, default_spec)) for filename, file_path in file_paths.items()]
+        report = CompactionReport()
+
+        if self.max_workers == 1 or len(arguments) < 2:
+            results = [compact_file(*argument) for argument in arguments]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(arguments))) as executor: results = list(executor.map(compact_file, *zip(*arguments)))
+
+        report.results = { result.filename: result for result in results }
+        self.__unique__([output for result in results for output in result.outputs] + ([self.bundle_name] if self.bundle_max_bytes > 0 else []), "輸出檔案")
+        self.__bundle__(report)
+
+        return report
+
+    def compact(self, filename: str, file_path: str, spec: CompactionSpec) -> CompactionResult:
+        """
+        壓縮單一檔案 (失敗時使用原始檔案)
+          - 輸出的檔名保留原始的副檔名 (data.json => data.json.csv)，不同格式的同名檔案不會互相覆蓋
+          - .xlsx => 每個工作表一個CSV / Parquet (openpyxl的read_only模式，一列一列讀)
+          - .csv / .tsv => 只保留需要的欄位的CSV / Parquet
+          - .json (物件的陣列) / .jsonl => CSV / Parquet
+          - 其它 => 原始檔案
+
+        參數:
+            filename: 檔案名稱
+            file_path: 檔案路徑
+            spec: CompactionSpec
+        回傳:
+            CompactionResult
+        """
+        result = CompactionResult(filename=filename, original_bytes=os.path.getsize(file_path))
+        stem = os.path.basename(filename)
+        extension = os.path.splitext(stem)[1].lower()
+
+        try:
+            if extension in SpreadsheetExtensions: result.outputs = list(self.__compact_spreadsheet__(file_path, stem, spec))
+            elif extension in DelimitedExtensions and (spec.columns or spec.format != "csv" or extension == ".tsv"): result.outputs = [self.__compact_rows__(self.__delimited_rows__(file_path, extension), stem, spec)]
+            elif extension in JsonExtensions: result.outputs = [self.__compact_rows__(self.__json_rows__(file_path, extension), stem, spec)]
+            else: result.outputs = [file_path]
+        except Exception as error:
+            result.outputs = [file_path]
+            result.error = error
+
+        result.compacted_bytes = sum(os.path.getsize(output) for output in result.outputs)
+        return result
+
+    def __bundle__(self, report: CompactionReport) -> None:
+        """
+        把小檔案們打包成zip (至少要有2個小檔案)
+        """
+        if self.bundle_max_bytes <= 0: return
+
+        small = sorted({ output for result in report.results.values() for output in result.outputs if os.path.getsize(output) < self.bundle_max_bytes })
+        if len(small) < 2: return
+
+        bundle_path = os.path.join(self.output_folder_path, self.bundle_name)
+        temporary_path = f"{bundle_path}.tmp"
+
+        with zipfile.ZipFile(temporary_path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for file_path in small:
+                info = zipfile.ZipInfo(os.path.basename(file_path), date_time=(1980, 1, 1, 0, 0, 0))
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+                with open(file_path, "rb") as source, bundle.open(info, "w") as target:
+                    while chunk := source.read(ChunkSize): target.write(chunk)
+
+        os.replace(temporary_path, bundle_path)
+        report.bundle_path = bundle_path
+        report.bundled = small
+
+    def __compact_spreadsheet__(self, file_path: str, stem: str, spec: CompactionSpec) -> Iterator[str]:
+        """
+        試算表的每個工作表 => CSV / Parquet
+        """
+        try:
+            from openpyxl import load_workbook
+        except ImportError as error:
+            raise ImportError("轉換試算表需要openpyxl (pip3 install openpyxl)") from error
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+
+        try:
+            names = [name for name in workbook.sheetnames if spec.sheets is None or name in spec.sheets]
+            if not names: raise ValueError(f"找不到工作表: {', '.join(spec.sheets or ())}")
+            self.__unique__([self.__safe_name__(name) for name in names], "工作表名稱")
+
+            for name in names:
+                rows = (["" if value is None else value for value in row] for row in workbook[name].iter_rows(values_only=True))
+                yield self.__compact_rows__(rows, f"{stem}.{self.__safe_name__(name)}" if len(workbook.sheetnames) > 1 else stem, spec)
+        finally:
+            workbook.close()
+
+    def __compact_rows__(self, rows: Iterator[list], stem: str, spec: CompactionSpec) -> str:
+        """
+        一列一列寫成CSV (Parquet = 先寫CSV，再用pyarrow一批一批轉換)，第一列是標題
+        """
+        csv_path = os.path.join(self.output_folder_path, f"{stem}.csv")
+        temporary_path = f"{csv_path}.tmp"
+
+        try:
+            with open(temporary_path, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                indexes = None
+
+                for row in rows:
+                    if indexes is None: indexes = self.__column_indexes__(row, spec.columns)
+                    writer.writerow([row[index] if index < len(row) else "" for index in indexes])
+
+            if spec.format != "csv": return self.__to_parquet__(temporary_path, os.path.join(self.output_folder_path, f"{stem}.parquet"))
+
+            os.replace(temporary_path, csv_path)
+            return csv_path
+        finally:
+            if os.path.exists(temporary_path): os.remove(temporary_path)
+
+    def __column_indexes__(self, header: list, columns: tuple[str, ...] | None) -> list[int]:
+        if columns is None: return list(range(len(header)))
+
+        names = [str(name).strip() for name in header]
+        missing = [column for column in columns if column not in names]
+        if missing: raise ValueError(f"找不到欄位: {', '.join(missing)}")
+
+        return [index for index, name in enumerate(names) if name in columns]
+
+    def __to_parquet__(self, csv_path: str, parquet_path: str) -> str:
+        try:
+            from pyarrow import csv as arrow_csv, parquet
+        except ImportError as error:
+            raise ImportError("輸出Parquet需要pyarrow (pip3 install pyarrow)") from error
+
+        reader = arrow_csv.open_csv(csv_path)
+
+        with parquet.ParquetWriter(parquet_path, reader.schema, compression="zstd") as writer:
+            for batch in reader: writer.write_batch(batch)
+
+        return parquet_path
+
+    def __delimited_rows__(self, file_path: str, extension: str) -> Iterator[list]:
+        with open(file_path, newline="", encoding="utf-8-sig") as file: yield from csv.reader(file, delimiter="\t" if extension == ".tsv" else ",")
+
+    def __json_rows__(self, file_path: str, extension: str) -> Iterator[list]:
+        """
+        JSON物件們 => 標題列 + 資料列 (欄位 = 第一個物件的Key們)
+        """
+        records = self.__json_lines__(file_path) if extension != ".json" else self.__json_array__(file_path)
+        keys = None
+
+        for record in records:
+            if not isinstance(record, dict): raise ValueError("JSON要是物件的陣列 / 一行一個物件")
+            if keys is None: keys = list(record.keys()); yield keys
+
+            yield [self.__cell__(record.get(key)) for key in keys]
+
+    def __json_lines__(self, file_path: str) -> Iterator:
+        with open(file_path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip(): yield json.loads(line)
+
+    def __json_array__(self, file_path: str) -> Iterator:
+        """
+        一個一個讀出最外層陣列的元素 (不用整個檔案載入記憶體)
+        """
+        decoder = json.JSONDecoder()
+
+        with open(file_path, encoding="utf-8") as file:
+            buffer, position, started = "", 0, False
+
+            while True:
+                chunk = file.read(ChunkSize)
+                buffer = buffer[position:] + chunk
+                position = 0
+
+                while True:
+                    position = self.__skip__(buffer, position, "," if started else "")
+
+                    if not started and position < len(buffer):
+                        if buffer[position] != "[": raise ValueError("JSON的最外層要是陣列")
+                        started, position = True, position + 1
+                        continue
+
+                    if position < len(buffer) and buffer[position] == "]": return
+
+                    try:
+                        value, position = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        if not chunk: raise
+                        break
+
+                    yield value
+
+    def __skip__(self, buffer: str, position: int, separators: str) -> int:
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] in separators): position += 1
+        return position
+
+    def __cell__(self, value) -> str:
+        if value is None: return ""
+        if isinstance(value, (dict, list)): return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        return value
+
+    def __unique__(self, names, kind: str) -> None:
+        """
+        檔名 (basename) 不能重複，重複的話輸出會互相覆蓋 (平行處理時還會同時寫入同一個檔案)
+        """
+        seen = set()
+
+        for name in names:
+            basename = os.path.basename(name)
+            if basename in seen: raise ValueError(f"{kind}重複，輸出會互相覆蓋: {basename}")
+            seen.add(basename)
+
+    def __safe_name__(self, name: str) -> str:
+        return "".join(character if character.isalnum() or character in "-_" else "_" for character in name)
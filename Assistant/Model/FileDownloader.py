@@ -0,0 +1,163 @@
+from __future__ import annotations
+import os
+import asyncio
+import hashlib
+import threading
+from typing import TYPE_CHECKING
+from returns.result import Result, Success, Failure
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+class ByteBudget:
+    """
+    同時下載中的檔案總大小上限 (大檔案會佔比較多的額度，小檔案可以多個一起下載)
+      - 單一檔案比上限還大時，等其它檔案都下載完後自己下載
+    """
+    def __init__(self, max_bytes: int) -> None:
+        """
+        初始化
+
+        參數:
+            max_bytes: 同時下載中的檔案總大小上限
+        """
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.async_condition = asyncio.Condition()
+
+    def acquire(self, size: int) -> None:
+        with self.condition:
+            self.condition.wait_for(lambda: self.__fits__(size))
+            self.in_flight += size
+
+    def release(self, size: int) -> None:
+        with self.condition:
+            self.in_flight -= size
+            self.condition.notify_all()
+
+    async def acquire_async(self, size: int) -> None:
+        async with self.async_condition:
+            await self.async_condition.wait_for(lambda: self.__fits__(size))
+            self.in_flight += size
+
+    async def release_async(self, size: int) -> None:
+        async with self.async_condition:
+            self.in_flight -= size
+            self.async_condition.notify_all()
+
+    def __fits__(self, size: int) -> bool:
+        return self.in_flight == 0 or self.in_flight + size <= self.max_bytes
+
+class FileDownloader:
+    """
+    串流下載檔案
+      - 一塊一塊寫進暫存檔 (.part)，不會把整個檔案讀進記憶體
+      - 下載完成 (+ 驗證SHA-256) 後才rename成正式檔名
+      - 暫存檔還在的話，用Range從中斷的地方繼續下載
+    """
+    def __init__(self, chunk_size: int = 1024 * 1024) -> None:
+        """
+        初始化
+
+        參數:
+            chunk_size: 每次寫入的大小
+        """
+        self.chunk_size = chunk_size
+
+    def download(self, client: OpenAI, file_id: str, file_path: str, sha256: str | None = None, resume: bool = True) -> Result[str, Exception]:
+        """
+        串流下載檔案
+
+        參數:
+            client: OpenAI
+            file_id: FILE_ID
+            file_path: 要存檔的路徑
+            sha256: 預期的SHA-256 (None = 不驗證)
+            resume: 暫存檔還在的話是否繼續下載
+        回傳:
+            Result[<檔案存檔路徑>, Exception]
+        """
+        from openai import APIStatusError
+        part_path = f"{file_path}.part"
+
+        try:
+            offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+            digest = self.__digest__(part_path, offset)
+            headers = { "Range": f"bytes={offset}-" } if offset else None
+
+            try:
+                with client.files.with_streaming_response.content(file_id, extra_headers=headers) as response:
+                    if response.status_code != 206: offset = 0; digest = hashlib.sha256()
+                    with open(part_path, "ab" if offset else "wb") as file:
+                        for chunk in response.iter_bytes(self.chunk_size): self.__write__(file, digest, chunk)
+
+            except APIStatusError as error:
+                if error.status_code != 416 or not offset: raise
+
+            return self.__finish__(part_path, file_path, digest, sha256)
+
+        except Exception as error:
+            return Failure(error)
+
+    async def download_async(self, client: AsyncOpenAI, file_id: str, file_path: str, sha256: str | None = None, resume: bool = True) -> Result[str, Exception]:
+        """
+        串流下載檔案 (非同步版本)
+
+        參數:
+            client: AsyncOpenAI
+            file_id: FILE_ID
+            file_path: 要存檔的路徑
+            sha256: 預期的SHA-256 (None = 不驗證)
+            resume: 暫存檔還在的話是否繼續下載
+        回傳:
+            Result[<檔案存檔路徑>, Exception]
+        """
+        from openai import APIStatusError
+        part_path = f"{file_path}.part"
+
+        try:
+            offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+            digest = await asyncio.to_thread(self.__digest__, part_path, offset)
+            headers = { "Range": f"bytes={offset}-" } if offset else None
+
+            try:
+                async with client.files.with_streaming_response.content(file_id, extra_headers=headers) as response:
+                    if response.status_code != 206: offset = 0; digest = hashlib.sha256()
+                    with open(part_path, "ab" if offset else "wb") as file:
+                        async for chunk in response.iter_bytes(self.chunk_size): await asyncio.to_thread(self.__write__, file, digest, chunk)
+
+            except APIStatusError as error:
+                if error.status_code != 416 or not offset: raise
+
+            return self.__finish__(part_path, file_path, digest, sha256)
+
+        except Exception as error:
+            return Failure(error)
+
+    def __digest__(self, part_path: str, offset: int) -> "hashlib._Hash":
+        """
+        已經下載的部分先算好雜湊 (續傳時要接著算)
+        """
+        digest = hashlib.sha256()
+        if not offset: return digest
+
+        with open(part_path, "rb") as file:
+            while chunk := file.read(self.chunk_size): digest.update(chunk)
+
+        return digest
+
+    def __write__(self, file, digest: "hashlib._Hash", chunk: bytes) -> None:
+        file.write(chunk)
+        digest.update(chunk)
+
+    def __finish__(self, part_path: str, file_path: str, digest: "hashlib._Hash", sha256: str | None) -> Result[str, Exception]:
+        """
+        驗證SHA-256後，把暫存檔rename成正式檔名 (驗證失敗會刪掉暫存檔)
+        """
+        if sha256 and digest.hexdigest() != sha256.lower():
+            os.remove(part_path)
+            return Failure(ValueError(f"檔案驗證失敗 (sha256={digest.hexdigest()})"))
+
+        os.replace(part_path, file_path)
+        return Success(file_path)
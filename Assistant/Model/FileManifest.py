@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    計算檔案內容的SHA-256 (分塊讀取，不會一次把整個檔案讀進記憶體)
+
+    參數:
+        file_path: 檔案路徑
+        chunk_size: 每次讀取的大小
+    回傳:
+        str: 十六進位的雜湊值
+    """
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as file:
+        while chunk := file.read(chunk_size): digest.update(chunk)
+
+    return digest.hexdigest()
+
+class FileManifest:
+    """
+    本地的JSON清單檔 (Key => 資訊)，用來記住哪些檔案已經上傳過
+      - 多執行緒共用安全
+      - 存檔時先寫暫存檔再rename，不會寫壞原本的清單
+    """
+    def __init__(self, file_path: str) -> None:
+        """
+        初始化 (清單檔不存在 / 壞掉時視為空的)
+
+        參數:
+            file_path: 清單檔的路徑
+        """
+        self.file_path = os.path.expanduser(file_path)
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+        try:
+            with open(self.file_path, "r", encoding="utf-8") as file: self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """
+        取得資訊
+
+        參數:
+            key: Key
+        回傳:
+            dict | None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            return dict(entry) if entry else None
+
+    def set(self, key: str, entry: dict[str, Any]) -> None:
+        """
+        設定資訊
+
+        參數:
+            key: Key
+            entry: 資訊
+        """
+        with self.lock: self.entries[key] = dict(entry)
+
+    def remove(self, key: str) -> dict[str, Any] | None:
+        """
+        移除資訊
+
+        參數:
+            key: Key
+        回傳:
+            dict | None: 被移除的資訊
+        """
+        with self.lock: return self.entries.pop(key, None)
+
+    def items(self) -> list[tuple[str, dict[str, Any]]]:
+        """
+        所有的 (Key, 資訊)
+
+        回傳:
+            list[tuple[str, dict]]
+        """
+        with self.lock: return [(key, dict(entry)) for key, entry in self.entries.items()]
+
+    def save(self) -> None:
+        """
+        存檔 (先寫暫存檔再rename)
+        """
+        with self.lock: content = json.dumps(self.entries, ensure_ascii=False, indent=2)
+
+        folder = os.path.dirname(self.file_path)
+        if folder: os.makedirs(folder, exist_ok=True)
+
+        temp_path = f"{self.file_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file: file.write(content)
+        os.replace(temp_path, self.file_path)
@@ -0,0 +1,282 @@
+from __future__ import annotations
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from Assistant.Model.BulkDeleter import BulkDeleter, BulkDeleteReport
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+class RequestBudget:
+    """
+    請求的額度 (列表的每一頁 / 每個刪除都算一個請求)
+    """
+    def __init__(self, max_requests: int | None = 1000) -> None:
+        """
+        初始化
+
+        參數:
+            max_requests: 最多的請求數 (None = 不限制)
+        """
+        self.max_requests = max_requests
+        self.used = 0
+
+    @property
+    def remaining(self) -> int | None:
+        """
+        剩下的請求數 (None = 不限制)
+        """
+        if self.max_requests is None: return None
+        return max(0, self.max_requests - self.used)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining == 0
+
+    def spend(self, count: int = 1) -> bool:
+        """
+        使用額度
+
+        參數:
+            count: 請求數
+        回傳:
+            bool: 額度是否足夠 (不夠 = 不使用)
+        """
+        if self.remaining is not None and self.remaining < count: return False
+        self.used += count
+        return True
+
+@dataclass
+class GarbageReport:
+    """
+    回收孤兒檔案 / VectorStore的結果
+
+    參數:
+        dry_run: 是否只列出不刪除
+        referenced_file_ids: 還有被用到的FILE_ID們 (助手的code_interpreter + 不會被刪除的VectorStore裡的檔案)
+        referenced_vector_store_ids: 還有被助手 (file_search) 用到的VECTOR_STORE_ID們
+        orphaned_files: 沒被用到且超過保留時間的 FILE_ID => bytes
+        orphaned_vector_stores: 沒被用到且超過保留時間的 VECTOR_STORE_ID => usage_bytes
+        recent: 沒被用到但還在保留時間內的數量
+        scanned: 列出的檔案 + VectorStore數量
+        requests: 使用的請求數
+        complete: 是否在額度內掃描完 (引用沒掃描完時不會刪除任何東西)
+        deferred: 額度不夠沒有刪除的Id們 (下次再刪)
+        files: 檔案的刪除結果 (dry_run = None)
+        vector_stores: VectorStore的刪除結果 (dry_run = None)
+    """
+    dry_run: bool
+    referenced_file_ids: set[str] = field(default_factory=set)
+    referenced_vector_store_ids: set[str] = field(default_factory=set)
+    orphaned_files: dict[str, int] = field(default_factory=dict)
+    orphaned_vector_stores: dict[str, int] = field(default_factory=dict)
+    recent: int = 0
+    scanned: int = 0
+    requests: int = 0
+    complete: bool = True
+    deferred: list[str] = field(default_factory=list)
+    files: BulkDeleteReport | None = None
+    vector_stores: BulkDeleteReport | None = None
+
+    @property
+    def orphaned_bytes(self) -> int:
+        """
+        孤兒檔案 + VectorStore佔用的總量
+        """
+        return sum(self.orphaned_files.values()) + sum(self.orphaned_vector_stores.values())
+
+    @property
+    def deleted(self) -> int:
+        """
+        刪除成功的數量
+        """
+        return sum(report.count for report in (self.files, self.vector_stores) if report)
+
+class GarbageCollector:
+    """
+    回收沒有被任何助手用到的上傳檔案 / VectorStore
+      - 引用 = 所有助手的tool_resources (code_interpreter.file_ids + file_search.vector_store_ids) + protected_ids
+      - 不會被刪除的VectorStore (有被引用 / protected_ids / 還在保留時間內) 裡的檔案也算是有被用到
+      - 列表一頁一頁讀 (has_next_page / get_next_page)，每一頁都算在請求額度裡，額度用完就停
+      - 只刪除超過grace_period的孤兒 (剛上傳還沒掛到助手上 / 被Thread的tool_resources用到的，API無法列出Thread)
+      - 刪除用BulkDeleter (同時刪除 + 限流)
+    """
+    def __init__(self, grace_period: float = 86400.0, max_requests: int | None = 1000, max_workers: int = 8, requests_per_second: float = 5.0, purposes: Iterable[str] = ("assistants",)) -> None:
+        """
+        初始化
+
+        參數:
+            grace_period: 建立多久 (秒) 以上的孤兒才會刪除
+            max_requests: 一次回收最多的請求數 (None = 不限制)
+            max_workers: 最多同時刪除的數量
+            requests_per_second: 每秒最多的刪除請求數
+            purposes: 要回收的檔案Purpose們 (預設不回收assistants_output)
+        """
+        self.grace_period = grace_period
+        self.max_requests = max_requests
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.purposes = tuple(purposes)
+
+    def run(self, client: OpenAI, delete_file: Callable[[str], Any], delete_vector_store: Callable[[str], Any], dry_run: bool = True, protected_ids: Iterable[str] = ()) -> GarbageReport:
+        """
+        回收孤兒檔案 / VectorStore
+
+        參數:
+            client: OpenAI
+            delete_file: 刪除單一檔案的函式
+            delete_vector_store: 刪除單一VectorStore的函式
+            dry_run: True = 只列出不刪除
+            protected_ids: 不能刪除的FILE_ID / VECTOR_STORE_ID們 (例如: Thread的tool_resources)
+        回傳:
+            GarbageReport
+        """
+        budget = RequestBudget(self.max_requests)
+        report = GarbageReport(dry_run=dry_run)
+
+        for assistant in self.__items__(lambda: client.beta.assistants.list(limit=100), budget, report):
+            self.__reference__(report, assistant)
+
+        if not report.complete: return self.__finish__(report, budget)
+        protected_ids = set(protected_ids)
+        cutoff = time.time() - self.grace_period
+        vector_store_ids = []
+
+        for vector_store in self.__items__(lambda: client.beta.vector_stores.list(limit=100), budget, report):
+            self.__classify__(report, vector_store, report.referenced_vector_store_ids | protected_ids, cutoff, report.orphaned_vector_stores, vector_store.usage_bytes)
+            vector_store_ids.append(vector_store.id)
+
+        for vector_store_id in self.__surviving__(report, vector_store_ids):
+            for file in self.__items__(lambda: client.beta.vector_stores.files.list(vector_store_id, limit=100), budget, report):
+                report.referenced_file_ids.add(file.id)
+
+        if not report.complete: return self.__finish__(report, budget)
+
+        for purpose in self.purposes:
+            for file in self.__items__(lambda: client.files.list(purpose=purpose), budget, report):
+                self.__classify__(report, file, report.referenced_file_ids | protected_ids, cutoff, report.orphaned_files, file.bytes)
+
+        if dry_run: return self.__finish__(report, budget)
+
+        deleter = BulkDeleter(max_workers=self.max_workers, requests_per_second=self.requests_per_second)
+        report.vector_stores = deleter.run(self.__allot__(report, report.orphaned_vector_stores, budget), delete_vector_store)
+        report.files = deleter.run(self.__allot__(report, report.orphaned_files, budget), delete_file)
+
+        return self.__finish__(report, budget)
+
+    async def run_async(self, client: AsyncOpenAI, delete_file: Callable[[str], Awaitable[Any]], delete_vector_store: Callable[[str], Awaitable[Any]], dry_run: bool = True, protected_ids: Iterable[str] = ()) -> GarbageReport:
+        """
+        回收孤兒檔案 / VectorStore (非同步版本)
+
+        參數:
+            client: AsyncOpenAI
+            delete_file: 刪除單一檔案的coroutine函式
+            delete_vector_store: 刪除單一VectorStore的coroutine函式
+            dry_run: True = 只列出不刪除
+            protected_ids: 不能刪除的FILE_ID / VECTOR_STORE_ID們 (例如: Thread的tool_resources)
+        回傳:
+            GarbageReport
+        """
+        budget = RequestBudget(self.max_requests)
+        report = GarbageReport(dry_run=dry_run)
+
+        async for assistant in self.__items_async__(lambda: client.beta.assistants.list(limit=100), budget, report):
+            self.__reference__(report, assistant)
+
+        if not report.complete: return self.__finish__(report, budget)
+        protected_ids = set(protected_ids)
+        cutoff = time.time() - self.grace_period
+        vector_store_ids = []
+
+        async for vector_store in self.__items_async__(lambda: client.beta.vector_stores.list(limit=100), budget, report):
+            self.__classify__(report, vector_store, report.referenced_vector_store_ids | protected_ids, cutoff, report.orphaned_vector_stores, vector_store.usage_bytes)
+            vector_store_ids.append(vector_store.id)
+
+        for vector_store_id in self.__surviving__(report, vector_store_ids):
+            async for file in self.__items_async__(lambda: client.beta.vector_stores.files.list(vector_store_id, limit=100), budget, report):
+                report.referenced_file_ids.add(file.id)
+
+        if not report.complete: return self.__finish__(report, budget)
+
+        for purpose in self.purposes:
+            async for file in self.__items_async__(lambda: client.files.list(purpose=purpose), budget, report):
+                self.__classify__(report, file, report.referenced_file_ids | protected_ids, cutoff, report.orphaned_files, file.bytes)
+
+        if dry_run: return self.__finish__(report, budget)
+
+        deleter = BulkDeleter(max_workers=self.max_workers, requests_per_second=self.requests_per_second)
+        report.vector_stores = await deleter.run_async(self.__allot__(report, report.orphaned_vector_stores, budget), delete_vector_store)
+        report.files = await deleter.run_async(self.__allot__(report, report.orphaned_files, budget), delete_file)
+
+        return self.__finish__(report, budget)
+
+    def __items__(self, fetch: Callable, budget: RequestBudget, report: GarbageReport) -> Iterator:
+        """
+        一頁一頁列出 (每一頁用一個請求，額度不夠時標記為沒掃描完)
+        """
+        if not budget.spend(): report.complete = False; return
+        page = fetch()
+
+        while True:
+            yield from page.data
+            if not self.__has_next_page__(page): return
+            if not budget.spend(): report.complete = False; return
+            page = page.get_next_page()
+
+    async def __items_async__(self, fetch: Callable, budget: RequestBudget, report: GarbageReport) -> AsyncIterator:
+        if not budget.spend(): report.complete = False; return
+        page = await fetch()
+
+        while True:
+            for item in page.data: yield item
+            if not self.__has_next_page__(page): return
+            if not budget.spend(): report.complete = False; return
+            page = await page.get_next_page()
+
+    def __has_next_page__(self, page) -> bool:
+        """
+        還有沒有下一頁 (有has_more時直接用，不用多花一個請求去拿空白的最後一頁)
+        """
+        if getattr(page, "has_more", None) is False: return False
+        return page.has_next_page()
+
+    def __reference__(self, report: GarbageReport, assistant) -> None:
+        """
+        記錄助手tool_resources用到的檔案 / VectorStore
+        """
+        resources = assistant.tool_resources
+        if resources is None: return
+
+        if resources.code_interpreter and resources.code_interpreter.file_ids: report.referenced_file_ids.update(resources.code_interpreter.file_ids)
+        if resources.file_search and resources.file_search.vector_store_ids: report.referenced_vector_store_ids.update(resources.file_search.vector_store_ids)
+
+    def __surviving__(self, report: GarbageReport, vector_store_ids: list[str]) -> list[str]:
+        """
+        這次不會被刪除的VectorStore們 (有被引用 / protected_ids / 還在保留時間內)，它們裡面的檔案也算是有被用到
+        """
+        return [vector_store_id for vector_store_id in vector_store_ids if vector_store_id not in report.orphaned_vector_stores]
+
+    def __classify__(self, report: GarbageReport, object, referenced_ids: set[str], cutoff: float, orphans: dict[str, int], size: int | None) -> None:
+        """
+        沒被用到 + 超過保留時間 => 孤兒，沒被用到但還在保留時間內 => recent
+        """
+        report.scanned += 1
+        if object.id in referenced_ids: return
+        if object.created_at > cutoff: report.recent += 1; return
+
+        orphans[object.id] = size or 0
+
+    def __allot__(self, report: GarbageReport, orphans: dict[str, int], budget: RequestBudget) -> list[str]:
+        """
+        依剩下的額度決定這次要刪除的Id們，其它的放到deferred
+        """
+        ids = list(orphans.keys())
+        count = len(ids) if budget.remaining is None else min(len(ids), budget.remaining)
+        budget.spend(count)
+        report.deferred.extend(ids[count:])
+
+        return ids[:count]
+
+    def __finish__(self, report: GarbageReport, budget: RequestBudget) -> GarbageReport:
+        report.requests = budget.used
+        return report
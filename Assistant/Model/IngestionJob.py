@@ -0,0 +1,292 @@
+from __future__ import annotations
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+from returns.result import Result, Success, Failure
+from Assistant.Model.Constant import IngestionStatus
+from Assistant.Model.RunWaiter import RunWaiter
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+# 結束的狀態 (不會再變)
+FinishedIngestionStatuses = frozenset({ IngestionStatus.Completed, IngestionStatus.Failed, IngestionStatus.Cancelled })
+
+class IngestionJob:
+    """
+    一個VectorStore的向量化工作 (背景上傳檔案 + 等待file_batch完成)
+      - progress(): 目前的狀態與檔案數量 (in_progress / completed / failed / cancelled / total) + 已經上傳的FILE_ID們
+      - add_done_callback(): 結束時呼叫 (已經結束的話馬上呼叫)
+      - result() / result_async(): 等待結束，回傳Result[<VECTOR_STORE_ID>, Exception]
+    """
+    def __init__(self, vector_store_id: str, file_paths: dict[str, str]) -> None:
+        """
+        初始化
+
+        參數:
+            vector_store_id: VECTOR_STORE_ID
+            file_paths: 檔案名稱 => 檔案路徑
+        """
+        self.vector_store_id = vector_store_id
+        self.file_paths = file_paths
+        self.file_ids: dict[str, str] = {}
+        self.batch_id = None
+        self.status = IngestionStatus.Uploading
+        self.file_counts = { "in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": len(file_paths) }
+        self.error: Exception | None = None
+        self.cleaned_up = False
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.future: Future | asyncio.Task | None = None
+        self.callbacks: list[Callable[[IngestionJob], None]] = []
+        self.lock = threading.Lock()
+
+    def done(self) -> bool:
+        return self.status in FinishedIngestionStatuses
+
+    def progress(self) -> dict:
+        """
+        目前的進度
+
+        回傳:
+            dict: { vector_store_id, batch_id, file_ids, status, file_counts, error, cleaned_up, elapsed } (cleaned_up = 失敗後已經刪除VectorStore與檔案們)
+        """
+        with self.lock:
+            return {
+                "vector_store_id": self.vector_store_id,
+                "batch_id": self.batch_id,
+                "file_ids": dict(self.file_ids),
+                "status": self.status.value,
+                "file_counts": dict(self.file_counts),
+                "error": str(self.error) if self.error else None,
+                "cleaned_up": self.cleaned_up,
+                "elapsed": (self.finished_at or time.time()) - self.started_at,
+            }
+
+    def add_done_callback(self, callback: Callable[[IngestionJob], None]) -> None:
+        """
+        結束時呼叫 (已經結束的話馬上呼叫)
+
+        參數:
+            callback: (IngestionJob) => None
+        """
+        with self.lock:
+            if not self.done(): self.callbacks.append(callback); return
+
+        callback(self)
+
+    def result(self, timeout: float | None = None) -> Result[str, Exception]:
+        """
+        等待結束 (背景執行緒的工作)
+
+        參數:
+            timeout: 最多等幾秒 (None = 等到結束)
+        回傳:
+            Result[<VECTOR_STORE_ID>, Exception]: 超過timeout還沒結束 = Failure(TimeoutError)
+        """
+        wait([self.future], timeout=timeout)
+        return self.__result__()
+
+    async def result_async(self, timeout: float | None = None) -> Result[str, Exception]:
+        """
+        等待結束 (非同步版本，取消等待不會取消工作)
+
+        參數:
+            timeout: 最多等幾秒 (None = 等到結束)
+        回傳:
+            Result[<VECTOR_STORE_ID>, Exception]
+        """
+        await asyncio.wait({ self.future }, timeout=timeout)
+        return self.__result__()
+
+    def update(self, status: IngestionStatus, file_counts: dict | None = None) -> None:
+        with self.lock:
+            self.status = status
+            if file_counts: self.file_counts.update(file_counts)
+
+    def finish(self, status: IngestionStatus, error: Exception | None = None) -> None:
+        """
+        結束工作並呼叫callback們 (callback的例外不會影響其它callback)
+
+        參數:
+            status: 結束的狀態
+            error: 失敗的原因
+        """
+        with self.lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            callbacks, self.callbacks = self.callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass
+
+    def __result__(self) -> Result[str, Exception]:
+        if not self.done(): return Failure(TimeoutError(f"向量化還沒完成 (status={self.status.value})"))
+        if self.status == IngestionStatus.Completed: return Success(self.vector_store_id)
+        return Failure(self.error or RuntimeError(f"向量化失敗 (status={self.status.value})"))
+
+class VectorStoreIngestor:
+    """
+    不卡住呼叫者的VectorStore向量化
+      - submit()馬上回傳IngestionJob，上傳檔案 / 建立file_batch / 輪詢狀態都在背景進行
+      - 輪詢用退避 (initial_delay => 每次乘上multiplier，最多max_delay秒)
+      - 完成 (completed) 後才呼叫onReady (例如: 把VectorStore掛到助手上)，所以之前的VectorStore在這段時間還是可以用
+      - 每個檔案上傳後呼叫onUploaded (例如: 記到快取 + registry)，沒有完成時呼叫onFailed (例如: 刪除VectorStore與檔案們)
+    """
+    def __init__(self, max_workers: int = 4, initial_delay: float = 0.5, multiplier: float = 2.0, max_delay: float = 10.0, timeout: float | None = 3600.0) -> None:
+        """
+        初始化
+
+        參數:
+            max_workers: 最多同時進行的工作數量
+            initial_delay: 第一次輪詢前等待的時間
+            multiplier: 之後每次間隔時間的倍數
+            max_delay: 間隔時間的上限
+            timeout: 每個工作最多等多久 (秒)，超過就取消file_batch (None = 不限制)
+        """
+        self.max_workers = max(1, max_workers)
+        self.waiter = RunWaiter(initial_delay=initial_delay, fast_polls=1, multiplier=multiplier, max_delay=max_delay)
+        self.timeout = timeout
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def submit(self, client: OpenAI, vector_store_id: str, file_paths: dict[str, str], onReady: Callable[[str], Any] | None = None, onUploaded: Callable[[str, Any], Any] | None = None, onFailed: Callable[[IngestionJob], Any] | None = None) -> IngestionJob:
+        """
+        在背景執行緒向量化檔案們
+
+        參數:
+            client: OpenAI
+            vector_store_id: 要加入檔案的VECTOR_STORE_ID
+            file_paths: 檔案名稱 => 檔案路徑
+            onReady: 完成時呼叫 (VECTOR_STORE_ID => Any，例外 = 工作失敗)
+            onUploaded: 每個檔案上傳後呼叫 ((檔案路徑, FileObject) => Any)
+            onFailed: 沒有完成 (失敗 / 取消 / 超時) 時，在結束前呼叫 (IngestionJob => Any，沒有例外 = cleaned_up)
+        回傳:
+            IngestionJob
+        """
+        job = IngestionJob(vector_store_id, file_paths)
+
+        with self.lock:
+            if self.executor is None: self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="VectorStoreIngestor")
+            job.future = self.executor.submit(self.__ingest__, client, job, onReady, onUploaded, onFailed)
+
+        return job
+
+    def submit_async(self, client: AsyncOpenAI, vector_store_id: str, file_paths: dict[str, str], onReady: Callable[[str], Awaitable[Any]] | None = None, onUploaded: Callable[[str, Any], Awaitable[Any]] | None = None, onFailed: Callable[[IngestionJob], Awaitable[Any]] | None = None) -> IngestionJob:
+        """
+        在背景Task向量化檔案們 (非同步版本，要在event loop裡呼叫)
+
+        參數:
+            client: AsyncOpenAI
+            vector_store_id: 要加入檔案的VECTOR_STORE_ID
+            file_paths: 檔案名稱 => 檔案路徑
+            onReady: 完成時呼叫的coroutine函式 (VECTOR_STORE_ID => Any，例外 = 工作失敗)
+            onUploaded: 每個檔案上傳後呼叫的coroutine函式 ((檔案路徑, FileObject) => Any)
+            onFailed: 沒有完成時，在結束前呼叫的coroutine函式 (IngestionJob => Any)
+        回傳:
+            IngestionJob
+        """
+        job = IngestionJob(vector_store_id, file_paths)
+        job.future = asyncio.create_task(self.__ingest_async__(client, job, onReady, onUploaded, onFailed))
+
+        return job
+
+    def close(self) -> None:
+        """
+        等背景的工作都結束，關閉執行緒
+        """
+        with self.lock: executor, self.executor = self.executor, None
+        if executor: executor.shutdown(wait=True)
+
+    def __ingest__(self, client: OpenAI, job: IngestionJob, onReady: Callable[[str], Any] | None, onUploaded: Callable[[str, Any], Any] | None, onFailed: Callable[[IngestionJob], Any] | None) -> None:
+        try:
+            for filename, file_path in job.file_paths.items():
+                with open(file_path, "rb") as file: upload_file = client.files.create(file=file, purpose="assistants")
+                with job.lock: job.file_ids[filename] = upload_file.id
+                if onUploaded: onUploaded(file_path, upload_file)
+
+            batch = client.beta.vector_stores.file_batches.create(vector_store_id=job.vector_store_id, file_ids=list(job.file_ids.values()))
+            job.batch_id = batch.id
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+            for delay in self.waiter.delays():
+                if self.__observe__(job, batch): break
+                if deadline is not None and time.monotonic() >= deadline: batch = client.beta.vector_stores.file_batches.cancel(batch.id, vector_store_id=job.vector_store_id); break
+
+                time.sleep(delay)
+                batch = client.beta.vector_stores.file_batches.retrieve(batch.id, vector_store_id=job.vector_store_id)
+
+            if batch.status != "completed": return self.__fail__(job, onFailed, self.__status__(batch.status), RuntimeError(f"向量化失敗 (status={batch.status})"))
+            if onReady: onReady(job.vector_store_id)
+            job.finish(IngestionStatus.Completed)
+
+        except Exception as error:
+            self.__fail__(job, onFailed, IngestionStatus.Failed, error)
+
+    async def __ingest_async__(self, client: AsyncOpenAI, job: IngestionJob, onReady: Callable[[str], Awaitable[Any]] | None, onUploaded: Callable[[str, Any], Awaitable[Any]] | None, onFailed: Callable[[IngestionJob], Awaitable[Any]] | None) -> None:
+        try:
+            for filename, file_path in job.file_paths.items():
+                with open(file_path, "rb") as file: upload_file = await client.files.create(file=file, purpose="assistants")
+                with job.lock: job.file_ids[filename] = upload_file.id
+                if onUploaded: await onUploaded(file_path, upload_file)
+
+            batch = await client.beta.vector_stores.file_batches.create(vector_store_id=job.vector_store_id, file_ids=list(job.file_ids.values()))
+            job.batch_id = batch.id
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+
+            for delay in self.waiter.delays():
+                if self.__observe__(job, batch): break
+                if deadline is not None and time.monotonic() >= deadline: batch = await client.beta.vector_stores.file_batches.cancel(batch.id, vector_store_id=job.vector_store_id); break
+
+                await asyncio.sleep(delay)
+                batch = await client.beta.vector_stores.file_batches.retrieve(batch.id, vector_store_id=job.vector_store_id)
+
+            if batch.status != "completed": return await self.__fail_async__(job, onFailed, self.__status__(batch.status), RuntimeError(f"向量化失敗 (status={batch.status})"))
+            if onReady: await onReady(job.vector_store_id)
+            job.finish(IngestionStatus.Completed)
+
+        except asyncio.CancelledError:
+            job.finish(IngestionStatus.Cancelled)
+            raise
+        except Exception as error:
+            await self.__fail_async__(job, onFailed, IngestionStatus.Failed, error)
+
+    def __fail__(self, job: IngestionJob, onFailed: Callable[[IngestionJob], Any] | None, status: IngestionStatus, error: Exception) -> None:
+        """
+        沒有完成: 先呼叫onFailed清理 (失敗的話FILE_ID們還是留在progress()裡)，再結束工作
+        """
+        try:
+            if onFailed: onFailed(job); job.cleaned_up = True
+        except Exception:
+            pass
+
+        job.finish(status, error)
+
+    async def __fail_async__(self, job: IngestionJob, onFailed: Callable[[IngestionJob], Awaitable[Any]] | None, status: IngestionStatus, error: Exception) -> None:
+        try:
+            if onFailed: await onFailed(job); job.cleaned_up = True
+        except Exception:
+            pass
+
+        job.finish(status, error)
+
+    def __observe__(self, job: IngestionJob, batch) -> bool:
+        """
+        更新工作的進度
+
+        回傳:
+            bool: file_batch是否已經結束
+        """
+        counts = batch.file_counts
+        job.update(IngestionStatus.InProgress, { "in_progress": counts.in_progress, "completed": counts.completed, "failed": counts.failed, "cancelled": counts.cancelled, "total": counts.total })
+
+        return batch.status != "in_progress"
+
+    def __status__(self, status: str) -> IngestionStatus:
+        return IngestionStatus.Cancelled if status in ("cancelled", "cancelling") else IngestionStatus.Failed
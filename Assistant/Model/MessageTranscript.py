@@ -0,0 +1,160 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+    from openai.types.beta.threads.message import Message
+    from Assistant.Model.RunWaiter import RunTiming
+
+@dataclass
+class ChatReply:
+    """
+    一次對話的回答 (該Run產生的所有訊息)
+
+    參數:
+        text: 所有文字區塊合併後的文字
+        thread_id: ThreadId
+        run_id: RunId (快取的回答 = None)
+        messages: 該Run產生的訊息們 (由舊到新)
+        cached: 是不是快取的回答
+        timing: 這次Run在各個狀態停留的時間 (快取的回答 = None)
+    """
+    text: str
+    thread_id: str | None = None
+    run_id: str | None = None
+    messages: list[Message] = field(default_factory=list)
+    cached: bool = False
+    timing: RunTiming | None = None
+
+    @classmethod
+    def from_messages(cls, thread_id: str, run_id: str | None, messages: list[Message]) -> "ChatReply":
+        reply = cls("", thread_id, run_id, messages)
+        reply.text = "\n".join(block.text.value for block in reply.blocks if block.type == "text" and block.text.value)
+        return reply
+
+    @property
+    def blocks(self) -> list:
+        """
+        所有的內容區塊 (text / image_file / image_url / ...)
+        """
+        return [block for message in self.messages for block in message.content]
+
+    @property
+    def annotations(self) -> list:
+        """
+        文字區塊的註解們 (file_citation / file_path)
+        """
+        return [annotation for block in self.blocks if block.type == "text" for annotation in block.text.annotations]
+
+    @property
+    def image_file_ids(self) -> list[str]:
+        """
+        圖片區塊的FileId們
+        """
+        return [block.image_file.file_id for block in self.blocks if block.type == "image_file"]
+
+class MessageTranscript:
+    """
+    每個Thread本地的對話記錄 (只增不減)
+      - Run結束後只取該Run產生的訊息 (run_id過濾)，沒有RunId時從上次讀到的訊息之後開始 (after)
+      - 不用每次都列出整個Thread
+    """
+    def __init__(self, max_messages: int | None = 1000) -> None:
+        """
+        初始化
+
+        參數:
+            max_messages: 每個Thread最多保留的訊息數量 (None = 不限制)
+        """
+        self.max_messages = max_messages
+        self.threads: dict[str, OrderedDict[str, Message]] = {}
+        self.cursors: dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def append(self, message: Message) -> bool:
+        """
+        加入訊息 (同一個訊息只會加一次)
+
+        參數:
+            message: Message
+        回傳:
+            bool: 是否是新的訊息
+        """
+        with self.lock:
+            messages = self.threads.setdefault(message.thread_id, OrderedDict())
+            if message.id in messages: return False
+
+            messages[message.id] = message
+            self.cursors[message.thread_id] = message.id
+            while self.max_messages is not None and len(messages) > self.max_messages: messages.popitem(last=False)
+
+            return True
+
+    def fetch(self, client: OpenAI, thread_id: str, run_id: str | None = None) -> ChatReply:
+        """
+        取得該Run產生的訊息們
+
+        參數:
+            client: OpenAI
+            thread_id: ThreadId
+            run_id: RunId (None = 上次讀到的訊息之後的所有訊息)
+        回傳:
+            ChatReply
+        """
+        messages = [message for message in client.beta.threads.messages.list(thread_id=thread_id, **self.__query__(thread_id, run_id))]
+        return self.__reply__(thread_id, run_id, messages)
+
+    async def fetch_async(self, client: AsyncOpenAI, thread_id: str, run_id: str | None = None) -> ChatReply:
+        """
+        取得該Run產生的訊息們 (非同步版本)
+
+        參數:
+            client: AsyncOpenAI
+            thread_id: ThreadId
+            run_id: RunId (None = 上次讀到的訊息之後的所有訊息)
+        回傳:
+            ChatReply
+        """
+        messages = [message async for message in client.beta.threads.messages.list(thread_id=thread_id, **self.__query__(thread_id, run_id))]
+        return self.__reply__(thread_id, run_id, messages)
+
+    def messages(self, thread_id: str) -> list[Message]:
+        """
+        該Thread本地的訊息們 (由舊到新)
+
+        參數:
+            thread_id: ThreadId
+        回傳:
+            list[Message]
+        """
+        with self.lock: return list(self.threads.get(thread_id, {}).values())
+
+    def forget(self, thread_id: str | None) -> None:
+        """
+        移除該Thread的記錄 (對話結束 / 被移除時)
+
+        參數:
+            thread_id: ThreadId
+        """
+        with self.lock:
+            self.threads.pop(thread_id, None)
+            self.cursors.pop(thread_id, None)
+
+    def __query__(self, thread_id: str, run_id: str | None) -> dict:
+        """
+        列出訊息的參數 (由舊到新，有RunId用RunId過濾，沒有就從上次讀到的訊息之後開始)
+        """
+        if run_id: return { "order": "asc", "run_id": run_id }
+
+        with self.lock: cursor = self.cursors.get(thread_id)
+        return { "order": "asc", "after": cursor } if cursor else { "order": "asc" }
+
+    def __reply__(self, thread_id: str, run_id: str | None, messages: list[Message]) -> ChatReply:
+        """
+        記錄新的訊息，回傳助手的回答
+        """
+        for message in messages: self.append(message)
+        return ChatReply.from_messages(thread_id, run_id, [message for message in messages if message.role == "assistant"])
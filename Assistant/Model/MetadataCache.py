@@ -0,0 +1,172 @@
+import time
+import threading
+from typing import Any, Iterable
+from Assistant.Model.Constant import MetadataKind
+
+class MetadataIndex:
+    """
+    單一種類遠端物件的索引 (id => 物件 / 名稱 => [id])
+    """
+    def __init__(self) -> None:
+        self.objects: dict[str, Any] = {}
+        self.names: dict[str, list[str]] = {}
+        self.loaded_at: float | None = None
+
+    def find_by_name(self, name: str) -> list[Any]:
+        """
+        用名稱找出物件們
+
+        參數:
+            name: 名稱
+        回傳:
+            list[Any]
+        """
+        return [self.objects[id] for id in self.names.get(name, [])]
+
+class MetadataCache:
+    """
+    遠端物件 (助手 / 上傳檔案 / VectorStore) 的本地快取
+      - 整批載入後建立 名稱 => [id] / id => 物件 的索引
+      - 超過ttl秒後視為過期，需要重新載入
+      - 建立 / 更新 / 刪除時直接寫入 (write-through)
+    """
+    NameFields = {
+        MetadataKind.Assistant: "name",
+        MetadataKind.UploadFile: "filename",
+        MetadataKind.VectorStore: "name",
+    }
+
+    def __init__(self, ttl: float | None = 300.0) -> None:
+        """
+        初始化
+
+        參數:
+            ttl: 快取的有效時間 (秒) (None = 不會過期 / 0 = 不使用快取)
+        """
+        self.ttl = ttl
+        self.indexes = { kind: MetadataIndex() for kind in MetadataKind }
+        self.lock = threading.Lock()
+
+    def is_fresh(self, kind: MetadataKind) -> bool:
+        """
+        該種類的快取是否還有效
+
+        參數:
+            kind: MetadataKind
+        回傳:
+            bool
+        """
+        loaded_at = self.indexes[kind].loaded_at
+
+        if loaded_at is None: return False
+        if self.ttl is None: return True
+        return time.monotonic() - loaded_at < self.ttl
+
+    def load(self, kind: MetadataKind, objects: Iterable[Any]) -> MetadataIndex:
+        """
+        整批載入 (取代原本的索引)
+
+        參數:
+            kind: MetadataKind
+            objects: 遠端列出來的物件們 (照列出來的順序)
+        回傳:
+            MetadataIndex: 新的索引
+        """
+        index = MetadataIndex()
+
+        for object in objects:
+            index.objects[object.id] = object
+            index.names.setdefault(self.__object_name__(kind, object), []).append(object.id)
+
+        index.loaded_at = time.monotonic()
+        with self.lock: self.indexes[kind] = index
+
+        return index
+
+    def get(self, kind: MetadataKind, id: str) -> Any | None:
+        """
+        用id取得物件 (快取過期 => None)
+
+        參數:
+            kind: MetadataKind
+            id: 物件Id
+        回傳:
+            Any | None
+        """
+        if not self.is_fresh(kind): return None
+        with self.lock: return self.indexes[kind].objects.get(id)
+
+    def ids(self, kind: MetadataKind) -> set[str] | None:
+        """
+        該種類所有物件的Id (快取過期 => None)
+
+        參數:
+            kind: MetadataKind
+        回傳:
+            set[str] | None
+        """
+        if not self.is_fresh(kind): return None
+        with self.lock: return set(self.indexes[kind].objects.keys())
+
+    def find_by_name(self, kind: MetadataKind, name: str) -> list[Any] | None:
+        """
+        用名稱找出物件們 (快取過期 => None)
+
+        參數:
+            kind: MetadataKind
+            name: 名稱
+        回傳:
+            list[Any] | None
+        """
+        if not self.is_fresh(kind): return None
+        with self.lock: return self.indexes[kind].find_by_name(name)
+
+    def put(self, kind: MetadataKind, object: Any) -> None:
+        """
+        新增 / 更新物件 (新的排在同名物件的最前面，跟列表的desc順序一致)
+
+        參數:
+            kind: MetadataKind
+            object: 遠端物件
+        """
+        with self.lock:
+            index = self.indexes[kind]
+            if index.loaded_at is None: return
+
+            self.__unlink__(kind, index, object.id)
+            index.objects[object.id] = object
+            index.names.setdefault(self.__object_name__(kind, object), []).insert(0, object.id)
+
+    def remove(self, kind: MetadataKind, id: str) -> None:
+        """
+        移除物件
+
+        參數:
+            kind: MetadataKind
+            id: 物件Id
+        """
+        with self.lock: self.__unlink__(kind, self.indexes[kind], id)
+
+    def invalidate(self, kind: MetadataKind | None = None) -> None:
+        """
+        讓快取失效 (下次查詢時重新載入)
+
+        參數:
+            kind: MetadataKind (None = 全部)
+        """
+        kinds = list(MetadataKind) if kind is None else [kind]
+        with self.lock:
+            for kind in kinds: self.indexes[kind] = MetadataIndex()
+
+    def __object_name__(self, kind: MetadataKind, object: Any) -> str | None:
+        return getattr(object, self.NameFields[kind], None)
+
+    def __unlink__(self, kind: MetadataKind, index: MetadataIndex, id: str) -> None:
+        """
+        從索引中拿掉該Id (呼叫前要先拿到lock)
+        """
+        object = index.objects.pop(id, None)
+        if object is None: return
+
+        ids = index.names.get(self.__object_name__(kind, object), [])
+        if id in ids: ids.remove(id)
@@ -0,0 +1,306 @@
+import re
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+LatencyBuckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RateBuckets = (1.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0, 500.0)
+
+# API路徑裡的Id (assistant / thread / run / message / step / vector_store / file_batch / file)
+IdPattern = re.compile(r"^(asst|thread|run|msg|step|vs|vsfb|file)[_-]")
+
+class Histogram:
+    """
+    固定區間的直方圖 (Prometheus的histogram格式)
+    """
+    def __init__(self, buckets: tuple[float, ...] = LatencyBuckets) -> None:
+        """
+        初始化
+
+        參數:
+            buckets: 各區間的上限 (由小到大)
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """
+        用區間估計分位數 (例如: q = 0.95 => p95)
+
+        參數:
+            q: 0 ~ 1
+        回傳:
+            float | None: 沒有資料 => None
+        """
+        if not self.count: return None
+
+        rank = q * self.count
+        total = 0
+
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank: return self.buckets[index] if index < len(self.buckets) else float("inf")
+
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        cumulative, total = {}, 0
+
+        for bound, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += count
+            cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = total
+
+        return { "count": self.count, "sum": self.sum, "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99), "buckets": cumulative }
+
+class MetricsRegistry:
+    """
+    效能指標 (延遲直方圖 / 請求數 / 錯誤數 / 重試數 / 串流的首字時間與每秒Token數)
+      - enabled = False時，所有記錄都是空操作 (只多一個if判斷)
+      - 可以輸出成JSON或Prometheus的文字格式
+    """
+    Shared = None
+    SharedLock = threading.Lock()
+    MetricBuckets = {
+        "tokens_per_second": RateBuckets,
+    }
+
+    def __init__(self, enabled: bool = False, prefix: str = "assistant") -> None:
+        """
+        初始化
+
+        參數:
+            enabled: 是否記錄
+            prefix: Prometheus指標名稱的前綴
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms: dict[tuple[str, str], Histogram] = {}
+        self.counters: dict[tuple[str, str], float] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "MetricsRegistry":
+        """
+        整個程式共用的指標 (預設是關閉的)
+
+        回傳:
+            MetricsRegistry
+        """
+        with cls.SharedLock:
+            if cls.Shared is None: cls.Shared = cls()
+            return cls.Shared
+
+    def observe(self, metric: str, operation: str, value: float) -> None:
+        """
+        記錄一筆直方圖數值
+
+        參數:
+            metric: 指標名稱 (例如: request_duration_seconds)
+            operation: 操作名稱 (例如: POST /threads/{id}/runs)
+            value: 數值
+        """
+        if not self.enabled: return
+
+        with self.lock:
+            histogram = self.histograms.get((metric, operation))
+            if histogram is None: histogram = self.histograms[(metric, operation)] = Histogram(self.MetricBuckets.get(metric, LatencyBuckets))
+            histogram.observe(value)
+
+    def increment(self, metric: str, operation: str, value: float = 1.0) -> None:
+        """
+        累加計數器
+
+        參數:
+            metric: 指標名稱 (例如: requests_total)
+            operation: 操作名稱
+            value: 要加的數量
+        """
+        if not self.enabled: return
+        with self.lock: self.counters[(metric, operation)] = self.counters.get((metric, operation), 0.0) + value
+
+    def record(self, operation: str, seconds: float, error: bool = False, metric: str = "duration_seconds") -> None:
+        """
+        記錄一次操作 (時間 + 次數 + 錯誤次數)
+
+        參數:
+            operation: 操作名稱 (例如: chat)
+            seconds: 花費的時間
+            error: 是否失敗
+            metric: 時間的指標名稱
+        """
+        if not self.enabled: return
+
+        self.observe(metric, operation, seconds)
+        self.increment("calls_total", operation)
+        if error: self.increment("errors_total", operation)
+
+    def stream(self, operation: str) -> "StreamMeter":
+        """
+        串流的計量器 (首字時間 / 每秒Token數)
+
+        參數:
+            operation: 操作名稱 (例如: chatting)
+        回傳:
+            StreamMeter: 關閉時是不做事的NullStreamMeter
+        """
+        if not self.enabled: return NullStreamMeter
+        return StreamMeter(self, operation)
+
+    def timer(self, operation: str, metric: str = "duration_seconds"):
+        """
+        計時 (with區塊的時間 + 次數 + 例外次數)
+
+        參數:
+            operation: 操作名稱 (例如: chat)
+            metric: 指標名稱
+        """
+        if not self.enabled: return nullcontext()
+        return self.__timer__(operation, metric)
+
+    def snapshot(self) -> dict:
+        """
+        目前所有指標的快照
+
+        回傳:
+            dict: { histograms: { 指標: { 操作: {...} } }, counters: { 指標: { 操作: 數量 } } }
+        """
+        snapshot = { "histograms": {}, "counters": {} }
+
+        with self.lock:
+            for (metric, operation), histogram in sorted(self.histograms.items()): snapshot["histograms"].setdefault(metric, {})[operation] = histogram.snapshot()
+            for (metric, operation), value in sorted(self.counters.items()): snapshot["counters"].setdefault(metric, {})[operation] = value
+
+        return snapshot
+
+    def to_json(self) -> str:
+        """
+        輸出成JSON
+
+        回傳:
+            str
+        """
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        輸出成Prometheus的文字格式
+
+        回傳:
+            str
+        """
+        lines: list[str] = []
+        snapshot = self.snapshot()
+
+        for metric, operations in snapshot["histograms"].items():
+            name = self.__metric_name__(metric)
+            lines.append(f"# TYPE {name} histogram")
+
+            for operation, histogram in operations.items():
+                label = self.__label__(operation)
+                for bound, count in histogram["buckets"].items(): lines.append(f'{name}_bucket{{operation="{label}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{operation="{label}"}} {histogram["sum"]}')
+                lines.append(f'{name}_count{{operation="{label}"}} {histogram["count"]}')
+
+        for metric, operations in snapshot["counters"].items():
+            name = self.__metric_name__(metric)
+            lines.append(f"# TYPE {name} counter")
+            for operation, value in operations.items(): lines.append(f'{name}{{operation="{self.__label__(operation)}"}} {value:g}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """
+        清空所有指標
+        """
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    @contextmanager
+    def __timer__(self, operation: str, metric: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(operation, time.perf_counter() - started_at, error=error, metric=metric)
+
+    def __metric_name__(self, metric: str) -> str:
+        return re.sub(r"[^a-zA-Z0-9_:]", "_", f"{self.prefix}_{metric}")
+
+    def __label__(self, value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class StreamMeter:
+    """
+    記錄串流的首字時間 (time_to_first_token_seconds) 與每秒Token數 (tokens_per_second)
+      - 一個文字delta約等於一個Token
+    """
+    def __init__(self, registry: MetricsRegistry | None, operation: str) -> None:
+        """
+        初始化 (開始計時)
+
+        參數:
+            registry: MetricsRegistry (None = 不記錄)
+            operation: 操作名稱
+        """
+        self.registry = registry
+        self.operation = operation
+        self.started_at = time.perf_counter()
+        self.first_at = None
+        self.deltas = 0
+        self.error = False
+
+    def delta(self) -> None:
+        """
+        收到一個文字delta
+        """
+        if self.registry is None: return
+
+        self.deltas += 1
+        if self.first_at is None:
+            self.first_at = time.perf_counter()
+            self.registry.observe("time_to_first_token_seconds", self.operation, self.first_at - self.started_at)
+
+    def fail(self) -> None:
+        if self.registry is not None: self.error = True
+
+    def finish(self) -> None:
+        """
+        串流結束 (記錄總時間與生成速度)
+        """
+        if self.registry is None: return
+
+        finished_at = time.perf_counter()
+        self.registry.record(self.operation, finished_at - self.started_at, error=self.error)
+        if self.first_at is not None and finished_at > self.first_at and self.deltas > 1: self.registry.observe("tokens_per_second", self.operation, (self.deltas - 1) / (finished_at - self.first_at))
+
+NullStreamMeter = StreamMeter(None, "")
+
+def operation_name(method: str, path: str) -> str:
+    """
+    把API路徑的Id換成{id} (例如: POST /v1/threads/thread_abc/runs => POST /threads/{id}/runs)
+
+    參數:
+        method: HTTP方法
+        path: API路徑
+    回傳:
+        str
+    """
+    segments = [segment for segment in path.split("/") if segment and segment != "v1"]
+    segments = ["{id}" if IdPattern.match(segment) else segment for segment in segments]
+
+    return f"{method} /{'/'.join(segments)}"
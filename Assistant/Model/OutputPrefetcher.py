@@ -0,0 +1,307 @@
+from __future__ import annotations
+import os
+import codecs
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable
+from returns.result import Result, Success, Failure
+from Assistant.Model.FileDownloader import FileDownloader
+from Assistant.Model.FileManifest import file_sha256
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+# 檔頭 => 副檔名 (code interpreter常見的輸出)
+FileSignatures = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"),
+    (b"PK\x03\x04", "zip"),
+)
+
+def detect_extension(head: bytes, filename: str | None = None) -> str | None:
+    """
+    從檔名 / 檔頭判斷副檔名
+
+    參數:
+        head: 檔案開頭的內容 (至少16 bytes)
+        filename: 檔名 / 路徑 (例如: sandbox:/mnt/data/chart.csv，有副檔名就優先使用)
+    回傳:
+        str | None: 副檔名 (不含「.」，判斷不出來 = None)
+    """
+    extension = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if extension: return extension
+
+    if head[8:12] == b"WEBP" and head.startswith(b"RIFF"): return "webp"
+
+    for signature, extension in FileSignatures:
+        if head.startswith(signature): return extension
+
+    return None
+
+class OutputPrefetcher:
+    """
+    在背景下載助手產生的檔案 (code interpreter的圖片 / file_path註解的檔案)
+      - 串流中一看到FileId就開始下載，文字串流結束時檔案通常已經在download_folder_path裡了
+      - 同一個FileId只會下載一次，之後拿到的是同一個Future / Task
+      - save() / save_async() 也登錄在同一個下載中的記錄裡，正在背景下載的話等它完成再用，不會兩個一起寫同一個暫存檔
+      - 副檔名自動判斷: 註解的檔名 => 檔頭 => files.retrieve()的檔名 => txt / bin
+    """
+    def __init__(self, downloader: FileDownloader, download_folder_path: str, max_workers: int = 4, max_entries: int = 1000) -> None:
+        """
+        初始化
+
+        參數:
+            downloader: FileDownloader
+            download_folder_path: 要下載檔案的資料夾路徑
+            max_workers: 最多同時下載的檔案數量
+            max_entries: 最多保留的下載記錄 (只會移除已經下載完的)
+        """
+        self.downloader = downloader
+        self.download_folder_path = download_folder_path
+        self.max_workers = max(1, max_workers)
+        self.max_entries = max_entries
+        self.executor = None
+        self.outputs: OrderedDict[str, Future | asyncio.Task] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def prefetch(self, client: OpenAI, file_id: str, filename: str | None = None, onSaved: Callable[[str, Result[str, Exception]], None] | None = None) -> Future:
+        """
+        在背景執行緒下載檔案
+
+        參數:
+            client: OpenAI
+            file_id: FILE_ID
+            filename: 註解裡的檔名 (用來判斷副檔名，None = 自動判斷)
+            onSaved: 下載完成時的callback ((FILE_ID, Result[<檔案存檔路徑>, Exception]) => None)
+        回傳:
+            Future[Result[<檔案存檔路徑>, Exception]]
+        """
+        with self.lock:
+            future = self.outputs.get(file_id)
+
+            if future is None:
+                if self.executor is None: self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="OutputPrefetcher")
+                future = self.outputs[file_id] = self.executor.submit(self.__download__, client, file_id, filename)
+                self.__trim__()
+
+        if onSaved: future.add_done_callback(lambda future: onSaved(file_id, future.result()))
+        return future
+
+    async def prefetch_async(self, client: AsyncOpenAI, file_id: str, filename: str | None = None, onSaved: Callable[[str, Result[str, Exception]], None] | None = None) -> asyncio.Task:
+        """
+        在背景Task下載檔案 (非同步版本，不會等下載完成)
+
+        參數:
+            client: AsyncOpenAI
+            file_id: FILE_ID
+            filename: 註解裡的檔名 (用來判斷副檔名，None = 自動判斷)
+            onSaved: 下載完成時的callback ((FILE_ID, Result[<檔案存檔路徑>, Exception]) => None)
+        回傳:
+            asyncio.Task[Result[<檔案存檔路徑>, Exception]]
+        """
+        with self.lock:
+            task = self.outputs.get(file_id)
+
+            if task is None:
+                task = self.outputs[file_id] = asyncio.create_task(self.__download_async__(client, file_id, filename))
+                self.__trim__()
+
+        if onSaved: task.add_done_callback(lambda task: None if task.cancelled() else onSaved(file_id, task.result()))
+        return task
+
+    def output(self, file_id: str) -> Future | asyncio.Task | None:
+        """
+        該FileId的下載 (None = 沒有在背景下載過)
+
+        參數:
+            file_id: FILE_ID
+        回傳:
+            Future | asyncio.Task | None
+        """
+        with self.lock: return self.outputs.get(file_id)
+
+    def save(self, client: OpenAI, file_id: str, filename: str | None = None, extension: str | None = None, sha256: str | None = None) -> Result[str, Exception]:
+        """
+        下載檔案 (副檔名沒給的話自動判斷)
+          - 同一個FileId正在背景下載的話，等它下載完；結果符合要求 (副檔名 / SHA-256) 就直接用，不符合才重新下載
+
+        參數:
+            client: OpenAI
+            file_id: FILE_ID
+            filename: 註解裡的檔名 (用來判斷副檔名)
+            extension: 要存的檔案副檔名 (None = 自動判斷)
+            sha256: 預期的SHA-256 (None = 不驗證)
+        回傳:
+            Result[<檔案存檔路徑>, Exception]
+        """
+        while True:
+            with self.lock:
+                output = self.outputs.get(file_id)
+
+                if output is None:
+                    future = self.outputs[file_id] = Future()
+                    self.__trim__()
+                    break
+
+            wait([output])
+            result = self.__settled__(output)
+            if self.__reusable__(result, extension, sha256): return result
+            self.__discard__(file_id, output)
+
+        result = Failure(RuntimeError(f"下載中斷: {file_id}"))
+        try:
+            result = self.__download__(client, file_id, filename, extension, sha256)
+            return result
+        finally:
+            future.set_result(result)
+
+    async def save_async(self, client: AsyncOpenAI, file_id: str, filename: str | None = None, extension: str | None = None, sha256: str | None = None) -> Result[str, Exception]:
+        """
+        下載檔案 (非同步版本)
+
+        參數:
+            client: AsyncOpenAI
+            file_id: FILE_ID
+            filename: 註解裡的檔名 (用來判斷副檔名)
+            extension: 要存的檔案副檔名 (None = 自動判斷)
+            sha256: 預期的SHA-256 (None = 不驗證)
+        回傳:
+            Result[<檔案存檔路徑>, Exception]
+        """
+        while True:
+            with self.lock:
+                output = self.outputs.get(file_id)
+
+                if output is None:
+                    future = self.outputs[file_id] = asyncio.get_running_loop().create_future()
+                    self.__trim__()
+                    break
+
+            await asyncio.wait([asyncio.wrap_future(output)])
+            result = self.__settled__(output)
+            if await asyncio.to_thread(self.__reusable__, result, extension, sha256): return result
+            self.__discard__(file_id, output)
+
+        result = Failure(RuntimeError(f"下載中斷: {file_id}"))
+        try:
+            result = await self.__download_async__(client, file_id, filename, extension, sha256)
+            return result
+        finally:
+            future.set_result(result)
+
+    def __download__(self, client: OpenAI, file_id: str, filename: str | None = None, extension: str | None = None, sha256: str | None = None) -> Result[str, Exception]:
+        """
+        下載檔案 (副檔名沒給的話自動判斷)
+        """
+        extension = extension or detect_extension(b"", filename)
+        result = self.downloader.download(client, file_id, self.__file_path__(file_id, extension), sha256=sha256)
+        if extension: return result
+
+        match result:
+            case Failure(_): return result
+            case Success(file_path):
+                head = self.__head__(file_path)
+                extension = detect_extension(head) or self.__remote_extension__(lambda: client.files.retrieve(file_id)) or self.__text_extension__(head)
+                return self.__rename__(file_path, extension)
+
+    async def __download_async__(self, client: AsyncOpenAI, file_id: str, filename: str | None = None, extension: str | None = None, sha256: str | None = None) -> Result[str, Exception]:
+        """
+        下載檔案 (非同步版本)
+        """
+        extension = extension or detect_extension(b"", filename)
+        result = await self.downloader.download_async(client, file_id, self.__file_path__(file_id, extension), sha256=sha256)
+        if extension: return result
+
+        match result:
+            case Failure(_): return result
+            case Success(file_path):
+                head = self.__head__(file_path)
+                extension = detect_extension(head)
+
+                if extension is None:
+                    try:
+                        extension = detect_extension(b"", (await client.files.retrieve(file_id)).filename)
+                    except Exception:
+                        extension = None
+
+                return self.__rename__(file_path, extension or self.__text_extension__(head))
+
+    def close(self) -> None:
+        """
+        等背景的下載都結束，關閉執行緒
+        """
+        with self.lock: executor, self.executor = self.executor, None
+        if executor: executor.shutdown(wait=True)
+
+    def __file_path__(self, file_id: str, extension: str | None) -> str:
+        return f"{self.download_folder_path}{file_id}.{extension}" if extension else f"{self.download_folder_path}{file_id}"
+
+    def __head__(self, file_path: str) -> bytes:
+        with open(file_path, "rb") as file: return file.read(512)
+
+    def __remote_extension__(self, retrieve: Callable) -> str | None:
+        """
+        用files.retrieve()的檔名判斷副檔名 (code interpreter的輸出通常是/mnt/data/xxx.csv)
+        """
+        try:
+            return detect_extension(b"", retrieve().filename)
+        except Exception:
+            return None
+
+    def __text_extension__(self, head: bytes) -> str:
+        """
+        判斷不出來時: 看起來是文字 = txt，其它 = bin
+        """
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+            return "bin" if b"\x00" in head else "txt"
+        except UnicodeDecodeError:
+            return "bin"
+
+    def __rename__(self, file_path: str, extension: str) -> Result[str, Exception]:
+        try:
+            new_file_path = f"{file_path}.{extension}"
+            os.replace(file_path, new_file_path)
+            return Success(new_file_path)
+        except OSError as error:
+            return Failure(error)
+
+    def __settled__(self, output: Future | asyncio.Future) -> Result[str, Exception] | None:
+        """
+        已經結束的下載結果 (被取消 / 丟出例外 = None)
+        """
+        if output.cancelled() or output.exception() is not None: return None
+        return output.result()
+
+    def __reusable__(self, result: Result[str, Exception] | None, extension: str | None, sha256: str | None) -> bool:
+        """
+        別人下載好的檔案是否符合這次的要求 (存在 + 副檔名一樣 + SHA-256一樣)
+        """
+        match result:
+            case Success(file_path):
+                if not os.path.exists(file_path): return False
+                if extension and not file_path.endswith(f".{extension}"): return False
+                return sha256 is None or file_sha256(file_path) == sha256
+            case _:
+                return False
+
+    def __discard__(self, file_id: str, output: Future | asyncio.Future) -> None:
+        """
+        移除不能用的下載記錄 (還是同一個記錄時才移除，之後由呼叫的人重新下載)
+        """
+        with self.lock:
+            if self.outputs.get(file_id) is output: del self.outputs[file_id]
+
+    def __trim__(self) -> None:
+        """
+        移除最舊的已經下載完的記錄 (呼叫前要先拿到lock)
+        """
+        while len(self.outputs) > self.max_entries:
+            file_id = next((file_id for file_id, output in self.outputs.items() if output.done()), None)
+            if file_id is None: return
+            del self.outputs[file_id]
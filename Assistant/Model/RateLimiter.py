@@ -0,0 +1,70 @@
+import time
+import asyncio
+import threading
+
+class RateLimiter:
+    """
+    Token Bucket限流器 (每秒最多rate個請求，最多可以瞬間爆發burst個)
+      - 同一個實體可以被多個執行緒 / coroutine共用
+    """
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        """
+        初始化
+
+        參數:
+            rate: 每秒補充的token數量 (<= 0 = 不限流)
+            burst: 桶子的容量 (None = 跟rate一樣，至少1)
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        取得token (不夠時會卡住等待)
+
+        參數:
+            tokens: 要取得的token數量
+        回傳:
+            float: 等待的時間 (秒)
+        """
+        delay = self.reserve(tokens)
+        if delay > 0: time.sleep(delay)
+
+        return delay
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """
+        取得token (非同步版本，不會卡住event loop)
+
+        參數:
+            tokens: 要取得的token數量
+        回傳:
+            float: 等待的時間 (秒)
+        """
+        delay = self.reserve(tokens)
+        if delay > 0: await asyncio.sleep(delay)
+
+        return delay
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        先預約token，回傳還要等多久才輪到 (token可以預借成負數，後面的人就要等更久)
+
+        參數:
+            tokens: 要取得的token數量
+        回傳:
+            float: 要等待的時間 (秒)
+        """
+        if self.rate <= 0: return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= tokens
+
+            if self.tokens >= 0: return 0.0
+            return -self.tokens / self.rate
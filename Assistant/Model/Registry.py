@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from dataclasses import dataclass
+from Assistant.Model.Constant import RegistryKind
+
+# 預設Thread (沒有session_key) 在登錄裡的Key
+DefaultSessionKey = ""
+
+@dataclass
+class RegistryRecord:
+    """
+    登錄的一筆遠端物件
+
+    參數:
+        kind: RegistryKind
+        id: 遠端的Id
+        name: 名稱 (助手 / VectorStore = name，檔案 = filename)
+        sha256: 檔案內容的SHA-256
+        assistant_id: 所屬的助手Id
+        session_key: 對話的Key (Thread才有，"" = 預設的Thread，None = 對話已結束)
+        data: 遠端物件的內容 (to_dict())
+        created_at: 第一次登錄的時間 (time.time)
+        updated_at: 最後一次更新的時間 (time.time)
+    """
+    kind: RegistryKind
+    id: str
+    name: str | None
+    sha256: str | None
+    assistant_id: str | None
+    session_key: str | None
+    data: dict | None
+    created_at: float
+    updated_at: float
+
+class Registry:
+    """
+    本地的遠端物件登錄 (SQLite，重開程式後還在)
+      - 記錄建立過的助手 / Thread / 上傳檔案 / VectorStore (Id / 名稱 / 雜湊 / 所屬助手 / 時間)
+      - 用名稱 / 雜湊找物件是有索引的查詢，不用列出遠端全部的物件
+      - 重開程式後可以接回之前的Thread (助手Id + session_key)
+      - WAL + busy_timeout，每次寫入都是單一的UPSERT，多個程式可以共用同一個檔案
+    """
+    Columns = "kind, id, name, sha256, assistant_id, session_key, data, created_at, updated_at"
+
+    def __init__(self, file_path: str = "~/.assistant/registry.db") -> None:
+        """
+        初始化
+
+        參數:
+            file_path: SQLite檔案的路徑 (":memory:" = 只放在記憶體)
+        """
+        self.file_path = file_path if file_path == ":memory:" else os.path.expanduser(file_path)
+        self.lock = threading.Lock()
+        self.connection = self.__connect__(self.file_path)
+
+    def put(self, kind: RegistryKind, id: str, name: str | None = None, sha256: str | None = None, assistant_id: str | None = None, session_key: str | None = None, data: dict | None = None) -> None:
+        """
+        登錄 / 更新遠端物件 (None的欄位保留原本的值)
+
+        參數:
+            kind: RegistryKind
+            id: 遠端的Id
+            name: 名稱
+            sha256: 檔案內容的SHA-256
+            assistant_id: 所屬的助手Id
+            session_key: 對話的Key (Thread才有)
+            data: 遠端物件的內容
+        """
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                f"INSERT INTO objects ({self.Columns}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, id) DO UPDATE SET name = COALESCE(excluded.name, name), sha256 = COALESCE(excluded.sha256, sha256), assistant_id = COALESCE(excluded.assistant_id, assistant_id), "
+                "session_key = COALESCE(excluded.session_key, session_key), data = COALESCE(excluded.data, data), updated_at = excluded.updated_at",
+                (kind.value, id, name, sha256, assistant_id, session_key, json.dumps(data, ensure_ascii=False) if data is not None else None, now, now),
+            )
+
+    def remove(self, kind: RegistryKind, id: str) -> bool:
+        """
+        移除遠端物件 (遠端已經刪除時)
+
+        參數:
+            kind: RegistryKind
+            id: 遠端的Id
+        回傳:
+            bool: 是否有這筆記錄
+        """
+        with self.lock: return self.connection.execute("DELETE FROM objects WHERE kind = ? AND id = ?", (kind.value, id)).rowcount > 0
+
+    def get(self, kind: RegistryKind, id: str) -> RegistryRecord | None:
+        """
+        用Id找記錄
+
+        參數:
+            kind: RegistryKind
+            id: 遠端的Id
+        回傳:
+            RegistryRecord | None
+        """
+        records = self.__select__("kind = ? AND id = ?", (kind.value, id))
+        return records[0] if records else None
+
+    def find_by_name(self, kind: RegistryKind, name: str) -> list[RegistryRecord]:
+        """
+        用名稱找記錄 (由舊到新)
+
+        參數:
+            kind: RegistryKind
+            name: 名稱
+        回傳:
+            list[RegistryRecord]
+        """
+        return self.__select__("kind = ? AND name = ?", (kind.value, name))
+
+    def find_by_sha256(self, kind: RegistryKind, sha256: str) -> list[RegistryRecord]:
+        """
+        用檔案內容的SHA-256找記錄 (由舊到新)
+
+        參數:
+            kind: RegistryKind
+            sha256: SHA-256
+        回傳:
+            list[RegistryRecord]
+        """
+        return self.__select__("kind = ? AND sha256 = ?", (kind.value, sha256.lower()))
+
+    def records(self, kind: RegistryKind, assistant_id: str | None = None) -> list[RegistryRecord]:
+        """
+        該種類的所有記錄 (由舊到新)
+
+        參數:
+            kind: RegistryKind
+            assistant_id: 只列出屬於該助手的 (None = 全部)
+        回傳:
+            list[RegistryRecord]
+        """
+        if assistant_id is None: return self.__select__("kind = ?", (kind.value,))
+        return self.__select__("kind = ? AND assistant_id = ?", (kind.value, assistant_id))
+
+    def thread_id(self, assistant_id: str, session_key: str | None = None) -> str | None:
+        """
+        該助手 + 對話的Key最後使用的ThreadId (重開程式後接回之前的對話)
+
+        參數:
+            assistant_id: 助手Id
+            session_key: 對話的Key (None = 預設的Thread)
+        回傳:
+            str | None
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id FROM objects WHERE kind = ? AND assistant_id = ? AND session_key = ? ORDER BY updated_at DESC LIMIT 1",
+                (RegistryKind.Thread.value, assistant_id, DefaultSessionKey if session_key is None else session_key),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def detach_session(self, assistant_id: str, session_key: str) -> int:
+        """
+        結束對話 (Thread的記錄還在，只是不會再被接回)
+
+        參數:
+            assistant_id: 助手Id
+            session_key: 對話的Key
+        回傳:
+            int: 受影響的Thread數量
+        """
+        with self.lock:
+            return self.connection.execute(
+                "UPDATE objects SET session_key = NULL, updated_at = ? WHERE kind = ? AND assistant_id = ? AND session_key = ?",
+                (time.time(), RegistryKind.Thread.value, assistant_id, session_key),
+            ).rowcount
+
+    async def put_async(self, kind: RegistryKind, id: str, name: str | None = None, sha256: str | None = None, assistant_id: str | None = None, session_key: str | None = None, data: dict | None = None) -> None:
+        """
+        登錄 / 更新遠端物件 (非同步版本，寫磁碟時不會卡住event loop)
+        """
+        await asyncio.to_thread(self.put, kind, id, name, sha256, assistant_id, session_key, data)
+
+    async def remove_async(self, kind: RegistryKind, id: str) -> bool:
+        return await asyncio.to_thread(self.remove, kind, id)
+
+    async def find_by_name_async(self, kind: RegistryKind, name: str) -> list[RegistryRecord]:
+        return await asyncio.to_thread(self.find_by_name, kind, name)
+
+    async def find_by_sha256_async(self, kind: RegistryKind, sha256: str) -> list[RegistryRecord]:
+        return await asyncio.to_thread(self.find_by_sha256, kind, sha256)
+
+    async def thread_id_async(self, assistant_id: str, session_key: str | None = None) -> str | None:
+        return await asyncio.to_thread(self.thread_id, assistant_id, session_key)
+
+    async def detach_session_async(self, assistant_id: str, session_key: str) -> int:
+        return await asyncio.to_thread(self.detach_session, assistant_id, session_key)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection: self.connection.close()
+            self.connection = None
+
+    def __len__(self) -> int:
+        with self.lock: return self.connection.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def __connect__(self, file_path: str) -> sqlite3.Connection:
+        """
+        開啟SQLite (WAL + busy_timeout，多個程式可以共用同一個檔案)
+        """
+        folder_path = os.path.dirname(file_path)
+        if folder_path: os.makedirs(folder_path, exist_ok=True)
+
+        connection = sqlite3.connect(file_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS objects (kind TEXT NOT NULL, id TEXT NOT NULL, name TEXT, sha256 TEXT, assistant_id TEXT, session_key TEXT, data TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (kind, id))")
+        connection.execute("CREATE INDEX IF NOT EXISTS objects_name ON objects (kind, name)")
+        connection.execute("CREATE INDEX IF NOT EXISTS objects_sha256 ON objects (kind, sha256)")
+        connection.execute("CREATE INDEX IF NOT EXISTS objects_session ON objects (kind, assistant_id, session_key, updated_at)")
+
+        return connection
+
+    def __select__(self, condition: str, parameters: tuple) -> list[RegistryRecord]:
+        with self.lock: rows = self.connection.execute(f"SELECT {self.Columns} FROM objects WHERE {condition} ORDER BY created_at", parameters).fetchall()
+        return [RegistryRecord(RegistryKind(row[0]), *row[1:6], json.loads(row[6]) if row[6] else None, *row[7:]) for row in rows]
@@ -0,0 +1,237 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Future
+import httpx
+from Assistant.Model.Metrics import MetricsRegistry, IdPattern, operation_name
+
+# 會影響回應內容的標頭 (其它的標頭不同也視為同一個請求)
+KeyHeaders = ("authorization", "openai-beta", "openai-organization", "openai-project", "accept")
+
+@dataclass
+class CoalescedResponse:
+    """
+    上游回應的內容 (整個讀完，每個等待者各自拿到一份新的httpx.Response)
+
+    參數:
+        status_code: HTTP狀態碼
+        headers: 回應標頭
+        content: 回應的原始內容 (還沒解壓縮)
+        extensions: httpx的extensions (http_version / reason_phrase)
+    """
+    status_code: int
+    headers: httpx.Headers
+    content: bytes
+    extensions: dict
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(self.status_code, headers=self.headers, stream=httpx.ByteStream(self.content), extensions=dict(self.extensions), request=request)
+
+class RequestCoalescer:
+    """
+    合併同時進行中的相同讀取請求 (single-flight)
+      - 只合併GET (method + 網址 + query + 驗證標頭都一樣)，下載檔案內容 (/content、Range) 不合併
+      - 第一個請求 (leader) 真的送出，其它同時到的請求等它的結果，各自拿到一份回應 / 例外
+      - 不是快取: leader完成後就移除，之後的請求會重新送出
+      - 有寫入 (POST / DELETE) 完成時，同一個資源 (例如: /threads/{id}、/vector_stores/{id}) 底下與它的列表的進行中讀取，不再讓新的請求加入 (避免讀到寫入前的內容)，其它資源的讀取不受影響
+    """
+    def __init__(self, enabled: bool = True) -> None:
+        """
+        初始化
+
+        參數:
+            enabled: 是否合併
+        """
+        self.enabled = enabled
+        self.flights: dict[tuple, tuple[str, Future | asyncio.Task]] = {}
+        self.counts: dict[str, list[int]] = {}
+        self.lock = threading.Lock()
+
+    def key(self, request: httpx.Request) -> tuple | None:
+        """
+        請求的合併Key (None = 不合併)
+
+        參數:
+            request: httpx.Request
+        回傳:
+            tuple | None
+        """
+        if not self.enabled or request.method != "GET": return None
+        if request.url.path.endswith("/content") or "range" in request.headers: return None
+
+        return (str(request.url),) + tuple(request.headers.get(name) for name in KeyHeaders)
+
+    def join(self, key: tuple, path: str, create) -> tuple[Future | asyncio.Task, bool]:
+        """
+        加入進行中的請求 (沒有的話用create()建立一個)
+
+        參數:
+            key: 合併Key
+            path: 請求的路徑 (detach()用來判斷是不是同一個資源)
+            create: 建立Future / Task的函式
+        回傳:
+            tuple[Future | asyncio.Task, bool]: (進行中的請求, 是否是leader)
+        """
+        with self.lock:
+            entry = self.flights.get(key)
+            if entry is not None: return entry[1], False
+
+            flight = create()
+            self.flights[key] = (path, flight)
+            return flight, True
+
+    def land(self, key: tuple, flight: Future | asyncio.Task) -> None:
+        """
+        請求完成，移除進行中的記錄 (已經被detach()移除的就不動)
+        """
+        with self.lock:
+            entry = self.flights.get(key)
+            if entry is not None and entry[1] is flight: del self.flights[key]
+
+    def detach(self, path: str) -> None:
+        """
+        有寫入完成時呼叫: 同一個資源底下 + 它的列表的進行中讀取還是會回給已經在等的請求，但新的請求會重新送出
+
+        參數:
+            path: 寫入的路徑 (例如: POST /v1/threads/thread_abc/runs => 資源 = /v1/threads/thread_abc，列表 = /v1/threads)
+        """
+        scope, collection = self.scope(path)
+
+        with self.lock:
+            for key in [key for key, (flight_path, _) in self.flights.items() if flight_path in (scope, collection) or flight_path.startswith(f"{scope}/")]: del self.flights[key]
+
+    def scope(self, path: str) -> tuple[str, str]:
+        """
+        寫入影響的範圍 (到第一個Id為止的路徑 = 資源，Id之前 = 列表；沒有Id = 整個列表)
+
+        參數:
+            path: 寫入的路徑
+        回傳:
+            tuple[str, str]: (資源, 列表)
+        """
+        segments = path.rstrip("/").split("/")
+        index = next((index for index, segment in enumerate(segments) if IdPattern.match(segment)), None)
+        if index is None: return "/".join(segments), "/".join(segments)
+
+        return "/".join(segments[:index + 1]), "/".join(segments[:index])
+
+    def count(self, operation: str, collapsed: bool) -> None:
+        with self.lock:
+            counts = self.counts.setdefault(operation, [0, 0])
+            counts[0] += 1
+            if collapsed: counts[1] += 1
+
+    def stats(self) -> dict[str, dict]:
+        """
+        每個API的合併統計
+
+        回傳:
+            dict[str, dict]: { 操作: { calls, upstream, collapsed } } (upstream = 真的送出的請求數)
+        """
+        with self.lock: return { operation: { "calls": calls, "upstream": calls - collapsed, "collapsed": collapsed } for operation, (calls, collapsed) in sorted(self.counts.items()) }
+
+    def reset(self) -> None:
+        with self.lock: self.counts.clear()
+
+class CoalescingTransport(httpx.BaseTransport):
+    """
+    合併相同讀取請求的HTTP transport (放在SchedulingTransport外面，合併掉的請求不會佔用限流額度)
+    """
+    def __init__(self, coalescer: RequestCoalescer, transport: httpx.BaseTransport, metrics: MetricsRegistry | None = None) -> None:
+        self.coalescer = coalescer
+        self.transport = transport
+        self.metrics = metrics or MetricsRegistry()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = self.coalescer.key(request)
+
+        if key is None:
+            response = self.transport.handle_request(request)
+            if request.method != "GET": self.coalescer.detach(request.url.path)
+            return response
+
+        flight, leader = self.coalescer.join(key, request.url.path, Future)
+        self.__count__(request, not leader)
+
+        if leader:
+            try:
+                flight.set_result(self.__fetch__(request))
+            except BaseException as error:
+                flight.set_exception(error)
+            finally:
+                self.coalescer.land(key, flight)
+
+        return flight.result().response(request)
+
+    def __fetch__(self, request: httpx.Request) -> CoalescedResponse:
+        response = self.transport.handle_request(request)
+
+        try:
+            content = b"".join(response.stream)
+        finally:
+            response.close()
+
+        return CoalescedResponse(response.status_code, response.headers, content, self.__extensions__(response))
+
+    def __extensions__(self, response: httpx.Response) -> dict:
+        return { name: value for name, value in response.extensions.items() if name in ("http_version", "reason_phrase") }
+
+    def __count__(self, request: httpx.Request, collapsed: bool) -> None:
+        operation = operation_name(request.method, request.url.path)
+        self.coalescer.count(operation, collapsed)
+        if collapsed: self.metrics.increment("requests_coalesced_total", operation)
+
+    def close(self) -> None:
+        self.transport.close()
+
+class AsyncCoalescingTransport(httpx.AsyncBaseTransport):
+    """
+    合併相同讀取請求的HTTP transport (非同步版本，上游請求是獨立的Task，leader被取消時其它等待者不受影響)
+    """
+    def __init__(self, coalescer: RequestCoalescer, transport: httpx.AsyncBaseTransport, metrics: MetricsRegistry | None = None) -> None:
+        self.coalescer = coalescer
+        self.transport = transport
+        self.metrics = metrics or MetricsRegistry()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = self.coalescer.key(request)
+
+        if key is None:
+            response = await self.transport.handle_async_request(request)
+            if request.method != "GET": self.coalescer.detach(request.url.path)
+            return response
+
+        key = (asyncio.get_running_loop(),) + key
+        task, leader = self.coalescer.join(key, request.url.path, lambda: asyncio.create_task(self.__fetch__(request)))
+        self.__count__(request, not leader)
+        if leader: task.add_done_callback(lambda task: self.__land__(key, task))
+
+        return (await asyncio.shield(task)).response(request)
+
+    def __land__(self, key: tuple, task: asyncio.Task) -> None:
+        """
+        上游請求完成 (等待者都被取消時，也要讀取例外，避免「Task exception was never retrieved」)
+        """
+        self.coalescer.land(key, task)
+        if not task.cancelled(): task.exception()
+
+    async def __fetch__(self, request: httpx.Request) -> CoalescedResponse:
+        response = await self.transport.handle_async_request(request)
+
+        try:
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+
+        return CoalescedResponse(response.status_code, response.headers, content, self.__extensions__(response))
+
+    def __extensions__(self, response: httpx.Response) -> dict:
+        return { name: value for name, value in response.extensions.items() if name in ("http_version", "reason_phrase") }
+
+    def __count__(self, request: httpx.Request, collapsed: bool) -> None:
+        operation = operation_name(request.method, request.url.path)
+        self.coalescer.count(operation, collapsed)
+        if collapsed: self.metrics.increment("requests_coalesced_total", operation)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
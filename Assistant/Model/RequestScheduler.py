@@ -0,0 +1,416 @@
+import re
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator
+import httpx
+from Assistant.Model.Constant import RequestPriority
+from Assistant.Model.Metrics import MetricsRegistry, operation_name
+
+ConnectionLimits = httpx.Limits(max_connections=1000, max_keepalive_connections=100, keepalive_expiry=5.0)
+
+class TokenBucket:
+    """
+    每分鐘額度的Token Bucket (會被x-ratelimit-*標頭校正成伺服器看到的剩餘量)
+    """
+    def __init__(self, per_minute: float | None) -> None:
+        """
+        初始化
+
+        參數:
+            per_minute: 每分鐘的額度 (None / 0 = 不限制)
+        """
+        self.capacity = float(per_minute or 0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        還要等多久才有足夠的額度
+
+        參數:
+            amount: 需要的額度
+            now: 現在時間
+        回傳:
+            float: 秒數 (0 = 現在就可以)
+        """
+        if self.capacity <= 0: return 0.0
+
+        self.__refill__(now)
+        amount = min(amount, self.capacity)
+
+        if self.tokens >= amount: return 0.0
+        return (amount - self.tokens) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity > 0: self.tokens -= amount
+
+    def update(self, limit: float | None, remaining: float | None, now: float) -> None:
+        """
+        用伺服器回傳的額度校正
+
+        參數:
+            limit: 每分鐘的額度
+            remaining: 剩餘的額度
+            now: 現在時間
+        """
+        self.__refill__(now)
+
+        if limit: self.capacity = limit
+        if remaining is not None: self.tokens = min(self.capacity, remaining)
+
+    def __refill__(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60.0)
+        self.updated_at = now
+
+class RequestScheduler:
+    """
+    所有API請求共用的排程器 (掛在HTTP transport上，所以每個請求都會經過)
+      - 請求數 / Token數 兩個每分鐘的Token Bucket，用x-ratelimit-*標頭校正 (沒給上限的話，收到標頭之前不限流)
+      - 優先權: Interactive (對話) 先於 Background (上傳 / 刪除 / 下載)，Background最多讓max_priority_wait秒，之後一起搶額度 (不會餓死)
+      - 429 / 5xx / 連線錯誤的重試與retry-after都在這裡處理
+    """
+    Priority = contextvars.ContextVar("RequestPriority", default=None)
+    RetryStatusCodes = { 429, 500, 502, 503, 504 }
+    Shared = None
+    SharedLock = threading.Lock()
+
+    def __init__(self, requests_per_minute: float | None = None, tokens_per_minute: float | None = None, max_retries: int = 3, backoff: float = 0.5, max_priority_wait: float = 1.0) -> None:
+        """
+        初始化
+
+        參數:
+            requests_per_minute: 每分鐘的請求數上限 (會被x-ratelimit-limit-requests校正，None = 收到標頭之前不限制)
+            tokens_per_minute: 每分鐘的Token數上限 (會被x-ratelimit-limit-tokens校正，None = 收到標頭之前不限制)
+            max_retries: 429 / 5xx / 連線錯誤的重試次數
+            backoff: 沒有retry-after時，第一次重試前等待的時間 (之後每次加倍)
+            max_priority_wait: 有更高優先權的請求在等時，最多讓幾秒 (超過就不再讓，避免一直有對話時上傳 / 刪除永遠發不出去)
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_priority_wait = max_priority_wait
+        self.paused_until = 0.0
+        self.waiting = { priority: 0 for priority in RequestPriority }
+        self.condition = threading.Condition()
+
+    @classmethod
+    def default(cls) -> "RequestScheduler":
+        """
+        整個程式共用的排程器
+
+        回傳:
+            RequestScheduler
+        """
+        with cls.SharedLock:
+            if cls.Shared is None: cls.Shared = cls()
+            return cls.Shared
+
+    @contextmanager
+    def priority(self, priority: RequestPriority) -> Iterator[None]:
+        """
+        指定這段程式裡發出的請求的優先權 (沒指定的話依請求的路徑判斷)
+
+        參數:
+            priority: RequestPriority
+        """
+        token = self.Priority.set(priority)
+        try:
+            yield
+        finally:
+            self.Priority.reset(token)
+
+    def priority_of(self, request: httpx.Request) -> RequestPriority:
+        """
+        判斷請求的優先權: 刪除 / 檔案 / VectorStore => Background，其它 (助手 / 對話) => Interactive
+
+        參數:
+            request: httpx.Request
+        回傳:
+            RequestPriority
+        """
+        priority = self.Priority.get()
+        if priority is not None: return priority
+
+        path = request.url.path
+        if request.method == "DELETE" or "/files" in path or "/vector_stores" in path: return RequestPriority.Background
+        return RequestPriority.Interactive
+
+    def estimate_tokens(self, request: httpx.Request) -> int:
+        """
+        估計請求會用掉的Token數 (只估計對話的訊息 / Run，約4個字元 = 1個Token)
+
+        參數:
+            request: httpx.Request
+        回傳:
+            int
+        """
+        if request.method != "POST" or "/threads" not in request.url.path: return 0
+
+        try:
+            return len(request.content) // 4
+        except httpx.RequestNotRead:
+            return 0
+
+    def acquire(self, priority: RequestPriority, tokens: int = 0) -> float:
+        """
+        取得發出請求的額度 (不夠 / 有更高優先權的請求在等時會卡住)
+
+        參數:
+            priority: RequestPriority
+            tokens: 預估的Token數
+        回傳:
+            float: 等待的時間 (秒)
+        """
+        started_at = time.monotonic()
+
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    delay = self.__try_acquire__(priority, tokens, started_at)
+                    if delay == 0: break
+                    self.condition.wait(timeout=delay)
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+        return time.monotonic() - started_at
+
+    async def acquire_async(self, priority: RequestPriority, tokens: int = 0) -> float:
+        """
+        取得發出請求的額度 (非同步版本)
+
+        參數:
+            priority: RequestPriority
+            tokens: 預估的Token數
+        回傳:
+            float: 等待的時間 (秒)
+        """
+        started_at = time.monotonic()
+
+        with self.condition: self.waiting[priority] += 1
+        try:
+            while True:
+                with self.condition: delay = self.__try_acquire__(priority, tokens, started_at)
+                if delay == 0: break
+                await asyncio.sleep(delay)
+        finally:
+            with self.condition:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+        return time.monotonic() - started_at
+
+    def observe(self, headers: httpx.Headers) -> None:
+        """
+        用回應的x-ratelimit-*標頭校正額度
+
+        參數:
+            headers: 回應標頭
+        """
+        now = time.monotonic()
+
+        with self.condition:
+            self.requests.update(self.__number__(headers.get("x-ratelimit-limit-requests")), self.__number__(headers.get("x-ratelimit-remaining-requests")), now)
+            self.tokens.update(self.__number__(headers.get("x-ratelimit-limit-tokens")), self.__number__(headers.get("x-ratelimit-remaining-tokens")), now)
+            self.condition.notify_all()
+
+    def retry_delay(self, response: httpx.Response | None, attempt: int) -> float:
+        """
+        重試前要等待的時間 (有retry-after-ms / retry-after的話就照伺服器說的)
+
+        參數:
+            response: 回應 (None = 連線錯誤)
+            attempt: 第幾次嘗試 (從0開始)
+        回傳:
+            float: 秒數
+        """
+        headers = response.headers if response is not None else {}
+        retry_after_ms = self.__number__(headers.get("retry-after-ms"))
+        retry_after = self.__number__(headers.get("retry-after"))
+
+        if retry_after_ms is not None: return retry_after_ms / 1000.0
+        if retry_after is not None: return retry_after
+        return self.backoff * (2 ** attempt)
+
+    def pause(self, seconds: float) -> None:
+        """
+        被限流 (429) 時，所有請求一起暫停一段時間
+
+        參數:
+            seconds: 秒數
+        """
+        with self.condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.condition.notify_all()
+
+    def __try_acquire__(self, priority: RequestPriority, tokens: int, started_at: float) -> float:
+        """
+        試著取得額度 (呼叫前要先拿到lock)
+
+        參數:
+            priority: RequestPriority
+            tokens: 預估的Token數
+            started_at: 開始等待的時間 (讓更高優先權的請求超過max_priority_wait秒就不再讓)
+        回傳:
+            float: 0 = 取得成功 / 其它 = 還要等多久
+        """
+        now = time.monotonic()
+        if now < self.paused_until: return self.paused_until - now
+
+        yielded = now - started_at
+        if yielded < self.max_priority_wait and any(count for other, count in self.waiting.items() if other.value < priority.value): return min(0.05, self.max_priority_wait - yielded)
+
+        delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+        if delay > 0: return delay
+
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        return 0.0
+
+    def __number__(self, value: str | None) -> float | None:
+        """
+        解析標頭的數字 / 時間長度 (例如: 100 / 1.5 / 6m0s / 20ms)
+        """
+        if not value: return None
+
+        try:
+            return float(value)
+        except ValueError:
+            pass
+
+        units = { "h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001 }
+        parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+
+        return sum(float(number) * units[unit] for number, unit in parts) if parts else None
+
+def record_request(metrics: MetricsRegistry, operation: str, started_at: float, response: httpx.Response | None) -> None:
+    """
+    記錄一個API請求 (含排隊與重試的總時間，串流的回應只算到收到標頭為止)
+
+    參數:
+        metrics: MetricsRegistry
+        operation: 操作名稱 (例如: POST /threads/{id}/runs)
+        started_at: 開始時間 (time.perf_counter)
+        response: 回應 (None = 連線錯誤)
+    """
+    error = response is None or response.status_code >= 400
+
+    metrics.observe("request_duration_seconds", operation, time.perf_counter() - started_at)
+    metrics.increment("requests_total", operation)
+    if error: metrics.increment("request_errors_total", operation)
+
+class SchedulingTransport(httpx.BaseTransport):
+    """
+    經過RequestScheduler的HTTP transport (OpenAI的client自己不重試，max_retries = 0)
+      - 有開啟的MetricsRegistry時，記錄每個API的延遲 / 請求數 / 錯誤數 / 重試數
+    """
+    def __init__(self, scheduler: RequestScheduler, transport: httpx.BaseTransport | None = None, metrics: MetricsRegistry | None = None) -> None:
+        self.scheduler = scheduler
+        self.transport = transport or httpx.HTTPTransport(limits=ConnectionLimits)
+        self.metrics = metrics or MetricsRegistry()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.metrics.enabled: return self.__send__(request, None)
+
+        operation = operation_name(request.method, request.url.path)
+        started_at = time.perf_counter()
+        response = None
+
+        try:
+            response = self.__send__(request, operation)
+            return response
+        finally:
+            record_request(self.metrics, operation, started_at, response)
+
+    def __send__(self, request: httpx.Request, operation: str | None) -> httpx.Response:
+        priority = self.scheduler.priority_of(request)
+        tokens = self.scheduler.estimate_tokens(request)
+
+        for attempt in range(self.scheduler.max_retries + 1):
+            waited = self.scheduler.acquire(priority, tokens)
+            if operation: self.__observe_attempt__(operation, attempt, waited)
+
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError:
+                if attempt >= self.scheduler.max_retries: raise
+                time.sleep(self.scheduler.retry_delay(None, attempt))
+                continue
+
+            self.scheduler.observe(response.headers)
+            if response.status_code not in self.scheduler.RetryStatusCodes or attempt >= self.scheduler.max_retries: return response
+
+            delay = self.scheduler.retry_delay(response, attempt)
+            response.close()
+
+            if response.status_code == 429: self.scheduler.pause(delay)
+            else: time.sleep(delay)
+
+        return response
+
+    def __observe_attempt__(self, operation: str, attempt: int, waited: float) -> None:
+        self.metrics.observe("scheduler_wait_seconds", operation, waited)
+        if attempt: self.metrics.increment("retries_total", operation)
+
+    def close(self) -> None:
+        self.transport.close()
+
+class AsyncSchedulingTransport(httpx.AsyncBaseTransport):
+    """
+    經過RequestScheduler的HTTP transport (非同步版本)
+    """
+    def __init__(self, scheduler: RequestScheduler, transport: httpx.AsyncBaseTransport | None = None, metrics: MetricsRegistry | None = None) -> None:
+        self.scheduler = scheduler
+        self.transport = transport or httpx.AsyncHTTPTransport(limits=ConnectionLimits)
+        self.metrics = metrics or MetricsRegistry()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.metrics.enabled: return await self.__send__(request, None)
+
+        operation = operation_name(request.method, request.url.path)
+        started_at = time.perf_counter()
+        response = None
+
+        try:
+            response = await self.__send__(request, operation)
+            return response
+        finally:
+            record_request(self.metrics, operation, started_at, response)
+
+    async def __send__(self, request: httpx.Request, operation: str | None) -> httpx.Response:
+        priority = self.scheduler.priority_of(request)
+        tokens = self.scheduler.estimate_tokens(request)
+
+        for attempt in range(self.scheduler.max_retries + 1):
+            waited = await self.scheduler.acquire_async(priority, tokens)
+            if operation: self.__observe_attempt__(operation, attempt, waited)
+
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                if attempt >= self.scheduler.max_retries: raise
+                await asyncio.sleep(self.scheduler.retry_delay(None, attempt))
+                continue
+
+            self.scheduler.observe(response.headers)
+            if response.status_code not in self.scheduler.RetryStatusCodes or attempt >= self.scheduler.max_retries: return response
+
+            delay = self.scheduler.retry_delay(response, attempt)
+            await response.aclose()
+
+            if response.status_code == 429: self.scheduler.pause(delay)
+            else: await asyncio.sleep(delay)
+
+        return response
+
+    def __observe_attempt__(self, operation: str, attempt: int, waited: float) -> None:
+        self.metrics.observe("scheduler_wait_seconds", operation, waited)
+        if attempt: self.metrics.increment("retries_total", operation)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from openai.types.beta import Assistant
+
+class ResponseCache:
+    """
+    chat()回答的快取 (記憶體LRU + 磁碟SQLite，重開程式後還在)
+      - Key = 助手Id + 助手版本 (instructions / model / tools / tool_resources) + 正規化後的問題
+      - 超過ttl的回答不再使用，超過數量時移除最久沒用的
+      - 助手更新後，該助手的回答全部作廢 (invalidate)
+    """
+    def __init__(self, file_path: str | None = None, max_entries: int = 1000, max_disk_entries: int = 100000, ttl: float | None = 86400.0) -> None:
+        """
+        初始化
+
+        參數:
+            file_path: SQLite檔案的路徑 (None = 只放在記憶體)
+            max_entries: 記憶體最多保留的回答數量
+            max_disk_entries: 磁碟最多保留的回答數量
+            ttl: 回答的有效時間 (秒，None = 不會過期)
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.lock = threading.Lock()
+        self.connection = self.__connect__(os.path.expanduser(file_path)) if file_path else None
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        """
+        正規化問題 (全形半形 / 大小寫 / 多餘的空白都視為一樣)
+
+        參數:
+            prompt: 問題
+        回傳:
+            str
+        """
+        return " ".join(unicodedata.normalize("NFKC", prompt).split()).casefold()
+
+    @staticmethod
+    def version(assistant: Assistant) -> str:
+        """
+        助手的版本 (instructions / model / tools / tool_resources有變，版本就不一樣)
+
+        參數:
+            assistant: Assistant
+        回傳:
+            str
+        """
+        tool_resources = assistant.tool_resources.to_dict() if assistant.tool_resources else None
+        payload = json.dumps([assistant.instructions, assistant.model, [tool.type for tool in assistant.tools or []], tool_resources], sort_keys=True, ensure_ascii=False)
+
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def key(self, assistant_id: str, version: str, prompt: str) -> str:
+        return hashlib.sha256(f"{assistant_id}\0{version}\0{self.normalize(prompt)}".encode()).hexdigest()
+
+    def get(self, assistant_id: str, version: str, prompt: str) -> str | None:
+        """
+        取得快取的回答
+
+        參數:
+            assistant_id: 助手Id
+            version: 助手版本 (ResponseCache.version)
+            prompt: 問題
+        回傳:
+            str | None: 沒有 / 過期 => None
+        """
+        key = self.key(assistant_id, version, prompt)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry and self.__is_expired__(entry[2], now):
+                self.entries.pop(key)
+                entry = None
+
+            if entry is None and self.connection:
+                row = self.connection.execute("SELECT assistant_id, response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+                if row and self.__is_expired__(row[2], now):
+                    self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                elif row:
+                    entry = self.entries[key] = tuple(row)
+                    self.connection.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+                    self.__evict__()
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, assistant_id: str, version: str, prompt: str, response: str) -> None:
+        """
+        記錄回答
+
+        參數:
+            assistant_id: 助手Id
+            version: 助手版本 (ResponseCache.version)
+            prompt: 問題
+            response: 回答
+        """
+        key = self.key(assistant_id, version, prompt)
+        now = time.time()
+
+        with self.lock:
+            self.entries[key] = (assistant_id, response, now)
+            self.entries.move_to_end(key)
+            self.__evict__()
+
+            if not self.connection: return
+
+            self.connection.execute("INSERT OR REPLACE INTO responses (key, assistant_id, response, created_at, used_at) VALUES (?, ?, ?, ?, ?)", (key, assistant_id, response, now, now))
+            self.puts += 1
+            if self.puts % 100 == 0: self.__prune__(now)
+
+    async def get_async(self, assistant_id: str, version: str, prompt: str) -> str | None:
+        """
+        取得快取的回答 (非同步版本，讀磁碟時不會卡住event loop)
+        """
+        return await asyncio.to_thread(self.get, assistant_id, version, prompt)
+
+    async def put_async(self, assistant_id: str, version: str, prompt: str, response: str) -> None:
+        """
+        記錄回答 (非同步版本，寫磁碟時不會卡住event loop)
+        """
+        await asyncio.to_thread(self.put, assistant_id, version, prompt, response)
+
+    def invalidate(self, assistant_id: str) -> int:
+        """
+        移除該助手所有的回答 (助手更新後)
+
+        參數:
+            assistant_id: 助手Id
+        回傳:
+            int: 移除的數量 (記憶體 + 磁碟)
+        """
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if entry[0] == assistant_id]
+            for key in keys: self.entries.pop(key)
+
+            if not self.connection: return len(keys)
+            return len(keys) + self.connection.execute("DELETE FROM responses WHERE assistant_id = ?", (assistant_id,)).rowcount
+
+    async def invalidate_async(self, assistant_id: str) -> int:
+        """
+        移除該助手所有的回答 (非同步版本，寫磁碟時不會卡住event loop)
+        """
+        return await asyncio.to_thread(self.invalidate, assistant_id)
+
+    def clear(self) -> None:
+        """
+        清空全部
+        """
+        with self.lock:
+            self.entries.clear()
+            if self.connection: self.connection.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self.lock:
+            if self.connection: self.connection.close()
+            self.connection = None
+
+    def __len__(self) -> int:
+        with self.lock: return len(self.entries)
+
+    def __connect__(self, file_path: str) -> sqlite3.Connection:
+        """
+        開啟SQLite (WAL + busy_timeout，多個程式可以共用同一個檔案)
+        """
+        folder_path = os.path.dirname(file_path)
+        if folder_path: os.makedirs(folder_path, exist_ok=True)
+
+        connection = sqlite3.connect(file_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, assistant_id TEXT NOT NULL, response TEXT NOT NULL, created_at REAL NOT NULL, used_at REAL NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS responses_assistant_id ON responses (assistant_id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+
+        return connection
+
+    def __is_expired__(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def __evict__(self) -> None:
+        while len(self.entries) > self.max_entries: self.entries.popitem(last=False)
+
+    def __prune__(self, now: float) -> None:
+        """
+        移除磁碟裡過期 + 超過數量的回答 (呼叫前要先拿到lock)
+        """
+        if self.ttl is not None: self.connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+        count = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_disk_entries: self.connection.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used_at LIMIT ?)", (count - self.max_disk_entries,))
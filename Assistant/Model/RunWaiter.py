@@ -0,0 +1,384 @@
+from __future__ import annotations
+import time
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterator
+
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+    from openai.types.beta.threads.run import Run
+
+# Run不會再自己改變的狀態 (requires_action: 這裡沒有處理工具呼叫的輸出，只能等它過期，直接取消)
+TerminalRunStatuses = frozenset({ "completed", "failed", "cancelled", "expired", "incomplete", "requires_action" })
+
+@dataclass
+class RunTiming:
+    """
+    Run在各個狀態停留的時間 (秒)
+
+    參數:
+        queued_time: 排隊 (queued) 的時間
+        in_progress_time: 執行中 (in_progress) 的時間
+        total_time: 從開始等待到結束的總時間
+        poll_count: 呼叫runs.retrieve的次數 (串流模式 = 0)
+        statuses: 依序觀察到的狀態
+        timed_out: 是否超過期限 (已送出取消)
+        hedged: 是否有送出對沖的第二個Run
+    """
+    queued_time: float = 0.0
+    in_progress_time: float = 0.0
+    total_time: float = 0.0
+    poll_count: int = 0
+    statuses: list[str] = field(default_factory=list)
+    timed_out: bool = False
+    hedged: bool = False
+
+class RunTimer:
+    """
+    記錄Run的狀態切換時間點，算出每個狀態停留多久
+    """
+    def __init__(self) -> None:
+        self.timing = RunTiming()
+        self.started_at = time.monotonic()
+        self.status = None
+        self.status_at = self.started_at
+
+    def observe(self, status: str) -> None:
+        """
+        觀察到Run的最新狀態
+
+        參數:
+            status: Run的狀態 (queued / in_progress / completed / ...)
+        """
+        now = time.monotonic()
+        if status == self.status: return
+
+        self.__accumulate__(now)
+        self.status = status
+        self.status_at = now
+        self.timing.statuses.append(status)
+
+    def finish(self) -> RunTiming:
+        """
+        結束計時
+
+        回傳:
+            RunTiming
+        """
+        now = time.monotonic()
+        self.__accumulate__(now)
+        self.status_at = now
+        self.timing.total_time = now - self.started_at
+        return self.timing
+
+    def __accumulate__(self, now: float) -> None:
+        elapsed = now - self.status_at
+        if self.status == "queued": self.timing.queued_time += elapsed
+        if self.status == "in_progress": self.timing.in_progress_time += elapsed
+
+class RunWaiter:
+    """
+    等待Run完成的引擎
+      - Polling: 前幾次快速輪詢，之後指數退避 (有上限)
+      - Streaming: 直接吃Run的串流事件，完全不輪詢
+      - 任何結束狀態 (TerminalRunStatuses) 都會停止等待，超過期限 (timeout) 的Run會被取消
+      - 對沖 (hedge): 主要的Run排隊超過hedge_after秒，就再送出第二個Run，先完成的勝出，另一個取消
+    """
+    def __init__(self, initial_delay: float = 0.1, fast_polls: int = 3, multiplier: float = 2.0, max_delay: float = 1.0) -> None:
+        """
+        初始化
+
+        參數:
+            initial_delay: 前幾次快速輪詢的間隔時間
+            fast_polls: 快速輪詢的次數
+            multiplier: 之後每次間隔時間的倍數
+            max_delay: 間隔時間的上限
+        """
+        self.initial_delay = initial_delay
+        self.fast_polls = fast_polls
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+
+    def delays(self, max_delay: float | None = None) -> Iterator[float]:
+        """
+        產生每次輪詢前要等待的時間
+
+        參數:
+            max_delay: 間隔時間的上限 (None = 使用預設值)
+        回傳:
+            Iterator[float]
+        """
+        max_delay = self.max_delay if max_delay is None else max_delay
+        delay = min(self.initial_delay, max_delay)
+
+        for _ in range(self.fast_polls): yield delay
+
+        while True:
+            delay = min(delay * self.multiplier, max_delay)
+            yield delay
+
+    def wait(self, client: OpenAI, thread_id: str, run: Run, max_delay: float | None = None, timeout: float | None = None, hedge: Callable[[], Run] | None = None, hedge_after: float | None = None) -> tuple[Run, RunTiming]:
+        """
+        用輪詢 + 退避的方式等待Run結束
+
+        參數:
+            client: OpenAI
+            thread_id: ThreadId
+            run: 剛建立好的Run
+            max_delay: 間隔時間的上限
+            timeout: 最多等多久 (秒)，超過就取消Run (None = 不限制)
+            hedge: 建立對沖Run的函式 (通常是用新的Thread，None = 不對沖)
+            hedge_after: 主要的Run排隊 (queued) 超過幾秒才對沖
+        回傳:
+            tuple[<結束的Run (有完成的Run就是它)>, RunTiming]
+        """
+        timer = RunTimer()
+        timer.observe(run.status)
+        delays = self.delays(max_delay)
+        runs = [run]
+
+        while (winner := self.__winner__(runs)) is None:
+            elapsed = time.monotonic() - timer.started_at
+
+            if timeout is not None and elapsed >= timeout:
+                timer.timing.timed_out = True
+                winner = runs[0]
+                break
+
+            if self.__should_hedge__(runs, hedge, hedge_after, elapsed):
+                runs.append(hedge())
+                timer.timing.hedged = True
+                continue
+
+            time.sleep(self.__delay__(next(delays), elapsed, timeout, hedge_after if hedge and len(runs) == 1 else None))
+            runs = [run if run.status in TerminalRunStatuses else self.__retrieve__(client, run, timer) for run in runs]
+            timer.observe(self.__leader__(runs).status)
+
+        for loser in runs:
+            if loser is not winner: self.__cancel__(client, loser)
+
+        if timer.timing.timed_out or winner.status == "requires_action": winner = self.__cancel__(client, winner)
+        return winner, timer.finish()
+
+    def stream(self, client: OpenAI, thread_id: str, assistant_id: str, timeout: float | None = None) -> tuple[Run, RunTiming]:
+        """
+        建立Run，並用串流事件等待它結束 (不輪詢)
+          - 超過期限時由背景的計時器取消Run (還沒收到Run的事件時用列表找出來) 並關閉串流，伺服器完全沒送事件也不會卡住
+
+        參數:
+            client: OpenAI
+            thread_id: ThreadId
+            assistant_id: 助手Id
+            timeout: 最多等多久 (秒)，超過就取消Run (None = 不限制)
+        回傳:
+            tuple[<結束的Run (還沒收到Run的事件就超過期限 = 該Thread還沒結束的Run / None)>, RunTiming]
+        """
+        timer = RunTimer()
+        run = None
+        streams = []
+        lock = threading.Lock()
+
+        def expire() -> None:
+            nonlocal run
+            with lock: timer.timing.timed_out = True
+
+            # 先取消Run (伺服器送出cancelled後串流就會結束)，還沒收到Run的事件時用列表找出來；再關閉串流
+            target = run if run is not None else self.__latest_run__(client, thread_id)
+            if target is not None: target = self.__cancel__(client, target)
+
+            with lock:
+                if run is None: run = target
+                for stream in streams: stream.close()
+
+        watchdog = self.__watchdog__(timeout, expire)
+
+        try:
+            with client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id) as stream:
+                with lock:
+                    streams.append(stream)
+                    if timer.timing.timed_out: stream.close()
+
+                for stream_event in stream:
+                    if not self.__is_run_event__(stream_event.event): continue
+                    run = stream_event.data
+                    timer.observe(run.status)
+
+        except Exception:
+            if not timer.timing.timed_out: raise
+
+        finally:
+            if watchdog: watchdog.cancel()
+
+        if timer.timing.timed_out: watchdog.join()      # 等計時器取消完Run
+        if timer.timing.timed_out and run is None: run = self.__latest_run__(client, thread_id)
+        if run is not None and (timer.timing.timed_out or run.status == "requires_action"): run = self.__cancel__(client, run)
+        return run, timer.finish()
+
+    async def wait_async(self, client: AsyncOpenAI, thread_id: str, run: Run, max_delay: float | None = None, timeout: float | None = None, hedge: Callable[[], Awaitable[Run]] | None = None, hedge_after: float | None = None) -> tuple[Run, RunTiming]:
+        """
+        用輪詢 + 退避的方式等待Run結束 (非同步版本，對沖時兩個Run同時查詢)
+
+        參數:
+            client: AsyncOpenAI
+            thread_id: ThreadId
+            run: 剛建立好的Run
+            max_delay: 間隔時間的上限
+            timeout: 最多等多久 (秒)，超過就取消Run (None = 不限制)
+            hedge: 建立對沖Run的coroutine函式 (None = 不對沖)
+            hedge_after: 主要的Run排隊 (queued) 超過幾秒才對沖
+        回傳:
+            tuple[<結束的Run (有完成的Run就是它)>, RunTiming]
+        """
+        timer = RunTimer()
+        timer.observe(run.status)
+        delays = self.delays(max_delay)
+        runs = [run]
+
+        while (winner := self.__winner__(runs)) is None:
+            elapsed = time.monotonic() - timer.started_at
+
+            if timeout is not None and elapsed >= timeout:
+                timer.timing.timed_out = True
+                winner = runs[0]
+                break
+
+            if self.__should_hedge__(runs, hedge, hedge_after, elapsed):
+                runs.append(await hedge())
+                timer.timing.hedged = True
+                continue
+
+            await asyncio.sleep(self.__delay__(next(delays), elapsed, timeout, hedge_after if hedge and len(runs) == 1 else None))
+            runs = list(await asyncio.gather(*(self.__retrieve_async__(client, run, timer) for run in runs)))
+            timer.observe(self.__leader__(runs).status)
+
+        await asyncio.gather(*(self.__cancel_async__(client, loser) for loser in runs if loser is not winner))
+
+        if timer.timing.timed_out or winner.status == "requires_action": winner = await self.__cancel_async__(client, winner)
+        return winner, timer.finish()
+
+    async def stream_async(self, client: AsyncOpenAI, thread_id: str, assistant_id: str, timeout: float | None = None) -> tuple[Run, RunTiming]:
+        """
+        建立Run，並用串流事件等待它結束 (非同步版本，超過期限時直接中斷串流再取消Run)
+
+        參數:
+            client: AsyncOpenAI
+            thread_id: ThreadId
+            assistant_id: 助手Id
+            timeout: 最多等多久 (秒)，超過就取消Run (None = 不限制)
+        回傳:
+            tuple[<結束的Run (還沒收到Run的事件就超過期限 = 該Thread還沒結束的Run / None)>, RunTiming]
+        """
+        timer = RunTimer()
+        run = None
+
+        async def consume() -> None:
+            nonlocal run
+
+            async with client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id) as stream:
+                async for stream_event in stream:
+                    if not self.__is_run_event__(stream_event.event): continue
+                    run = stream_event.data
+                    timer.observe(run.status)
+
+        try:
+            await asyncio.wait_for(consume(), timeout)
+        except asyncio.TimeoutError:
+            timer.timing.timed_out = True
+            if run is None: run = await self.__latest_run_async__(client, thread_id)
+
+        if run is not None and (timer.timing.timed_out or run.status == "requires_action"): run = await self.__cancel_async__(client, run)
+        return run, timer.finish()
+
+    def __latest_run__(self, client: OpenAI, thread_id: str) -> Run | None:
+        """
+        該Thread最新還沒結束的Run (串流中斷時還沒收到Run的事件，改用列表找出要取消的Run)
+        """
+        try:
+            run = next(iter(client.beta.threads.runs.list(thread_id=thread_id, limit=1).data), None)
+        except Exception:
+            return None
+
+        return run if run is not None and run.status not in TerminalRunStatuses else None
+
+    async def __latest_run_async__(self, client: AsyncOpenAI, thread_id: str) -> Run | None:
+        """
+        該Thread最新還沒結束的Run (串流中斷時還沒收到Run的事件，改用列表找出要取消的Run)
+        """
+        try:
+            run = next(iter((await client.beta.threads.runs.list(thread_id=thread_id, limit=1)).data), None)
+        except Exception:
+            return None
+
+        return run if run is not None and run.status not in TerminalRunStatuses else None
+
+    def __winner__(self, runs: list[Run]) -> Run | None:
+        """
+        先完成的Run勝出，全部都結束 (沒有完成的) 時回傳主要的Run，還有Run沒結束就回傳None
+        """
+        completed = next((run for run in runs if run.status == "completed"), None)
+        if completed is not None: return completed
+        if all(run.status in TerminalRunStatuses for run in runs): return runs[0]
+        return None
+
+    def __leader__(self, runs: list[Run]) -> Run:
+        """
+        進度最快的Run (計時用)
+        """
+        rank = { "completed": 2, "in_progress": 1 }
+        return max(runs, key=lambda run: rank.get(run.status, 0))
+
+    def __should_hedge__(self, runs: list, hedge: Callable | None, hedge_after: float | None, elapsed: float) -> bool:
+        return hedge is not None and hedge_after is not None and len(runs) == 1 and runs[0].status == "queued" and elapsed >= hedge_after
+
+    def __delay__(self, delay: float, elapsed: float, *deadlines: float | None) -> float:
+        """
+        下次輪詢前要等多久 (不超過期限 / 對沖的時間點)
+        """
+        return max(0.0, min([delay] + [deadline - elapsed for deadline in deadlines if deadline is not None]))
+
+    def __watchdog__(self, timeout: float | None, action: Callable[[], None]) -> threading.Timer | None:
+        if timeout is None: return None
+
+        watchdog = threading.Timer(timeout, action)
+        watchdog.daemon = True
+        watchdog.start()
+        return watchdog
+
+    def __retrieve__(self, client: OpenAI, run: Run, timer: RunTimer) -> Run:
+        timer.timing.poll_count += 1
+        return client.beta.threads.runs.retrieve(thread_id=run.thread_id, run_id=run.id)
+
+    async def __retrieve_async__(self, client: AsyncOpenAI, run: Run, timer: RunTimer) -> Run:
+        if run.status in TerminalRunStatuses: return run
+
+        timer.timing.poll_count += 1
+        return await client.beta.threads.runs.retrieve(thread_id=run.thread_id, run_id=run.id)
+
+    def __cancel__(self, client: OpenAI, run: Run) -> Run:
+        """
+        取消還沒結束的Run (取消失敗 = 可能剛好結束了，回傳原本的Run)
+        """
+        if run.status in TerminalRunStatuses and run.status != "requires_action": return run
+
+        try:
+            return client.beta.threads.runs.cancel(thread_id=run.thread_id, run_id=run.id)
+        except Exception:
+            return run
+
+    async def __cancel_async__(self, client: AsyncOpenAI, run: Run) -> Run:
+        if run.status in TerminalRunStatuses and run.status != "requires_action": return run
+
+        try:
+            return await client.beta.threads.runs.cancel(thread_id=run.thread_id, run_id=run.id)
+        except Exception:
+            return run
+
+    def __is_run_event__(self, event: str) -> bool:
+        """
+        是不是Run本身的狀態事件 (thread.run.xxx，但不包含thread.run.step.xxx)
+
+        參數:
+            event: 事件名稱
+        """
+        return event.startswith("thread.run.") and not event.startswith("thread.run.step.")
@@ -0,0 +1,165 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+@dataclass
+class Session:
+    """
+    一個對話 (對應到一個Thread)
+
+    參數:
+        key: 對話的Key (使用者Id / 對話Id)
+        thread_id: ThreadId (None = 還沒建立，例如: 只有用到快取的回答)
+        created_at: 建立的時間 (time.monotonic)
+        last_used_at: 最後一次使用的時間 (time.monotonic)
+        history: 本地的對話記錄 ({ role, content, cached })
+    """
+    key: str
+    thread_id: str | None
+    created_at: float
+    last_used_at: float
+    history: deque = field(default_factory=deque)
+
+class SessionManager:
+    """
+    管理多個對話 (Key => Thread)
+      - LRU: 超過max_sessions時，移除最久沒用的對話
+      - TTL: 超過idle_timeout沒用的對話會被移除
+    """
+    def __init__(self, max_sessions: int = 1000, idle_timeout: float | None = 1800.0, onEvicted: Callable[[Session], None] | None = None, max_history: int = 100) -> None:
+        """
+        初始化
+
+        參數:
+            max_sessions: 最多保留的對話數量
+            idle_timeout: 對話閒置多久 (秒) 後移除 (None = 不會過期)
+            onEvicted: 對話被移除時的callback (例如: 順便刪除遠端的Thread)
+            max_history: 每個對話最多保留的本地對話記錄數量
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_history = max_history
+        self.onEvicted = onEvicted
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Session | None:
+        """
+        取得對話 (會更新最後使用時間)
+
+        參數:
+            key: 對話的Key
+        回傳:
+            Session | None: 不存在或已過期 => None
+        """
+        now = time.monotonic()
+        evicted: list[Session] = []
+
+        with self.lock:
+            session = self.sessions.get(key)
+
+            if session and self.__is_expired__(session, now):
+                evicted.append(self.sessions.pop(key))
+                session = None
+
+            if session:
+                session.last_used_at = now
+                self.sessions.move_to_end(key)
+
+        self.__evicted__(evicted)
+        return session
+
+    def put(self, key: str, thread_id: str | None) -> Session:
+        """
+        加入對話 (如果同一個Key已經被別人先加入了，就回傳已經存在的那一個)
+
+        參數:
+            key: 對話的Key
+            thread_id: ThreadId (None = 之後才建立)
+        回傳:
+            Session
+        """
+        now = time.monotonic()
+        evicted: list[Session] = []
+
+        with self.lock:
+            session = self.sessions.get(key)
+
+            if session is None or self.__is_expired__(session, now):
+                if session: evicted.append(session)
+                session = Session(key=key, thread_id=thread_id, created_at=now, last_used_at=now, history=deque(maxlen=self.max_history))
+                self.sessions[key] = session
+
+            if session.thread_id is None: session.thread_id = thread_id
+            session.last_used_at = now
+            self.sessions.move_to_end(key)
+            evicted.extend(self.__evict__(now))
+
+        self.__evicted__(evicted)
+        return session
+
+    def remove(self, key: str) -> Session | None:
+        """
+        移除對話
+
+        參數:
+            key: 對話的Key
+        回傳:
+            Session | None: 被移除的對話
+        """
+        with self.lock: session = self.sessions.pop(key, None)
+        if session: self.__evicted__([session])
+
+        return session
+
+    def evict_expired(self) -> list[Session]:
+        """
+        移除所有過期的對話
+
+        回傳:
+            list[Session]: 被移除的對話們
+        """
+        with self.lock: evicted = self.__evict__(time.monotonic())
+
+        self.__evicted__(evicted)
+        return evicted
+
+    def keys(self) -> list[str]:
+        """
+        目前所有對話的Key (由舊到新)
+
+        回傳:
+            list[str]
+        """
+        with self.lock: return list(self.sessions.keys())
+
+    def __len__(self) -> int:
+        with self.lock: return len(self.sessions)
+
+    def __is_expired__(self, session: Session, now: float) -> bool:
+        if self.idle_timeout is None: return False
+        return now - session.last_used_at > self.idle_timeout
+
+    def __evict__(self, now: float) -> list[Session]:
+        """
+        移除過期 + 超過數量的對話 (呼叫前要先拿到lock)
+
+        參數:
+            now: 現在時間
+        回傳:
+            list[Session]: 被移除的對話們
+        """
+        evicted: list[Session] = []
+
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if len(self.sessions) <= self.max_sessions and not self.__is_expired__(session, now): break
+            evicted.append(self.sessions.pop(key))
+
+        return evicted
+
+    def __evicted__(self, sessions: list[Session]) -> None:
+        if not self.onEvicted: return
+        for session in sessions: self.onEvicted(session)
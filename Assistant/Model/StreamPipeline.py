@@ -0,0 +1,209 @@
+import time
+import queue
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Iterator
+from Assistant.Model.Constant import StreamEventKind
+
+CoalescedKinds = frozenset({ StreamEventKind.Text, StreamEventKind.CodeInput })
+
+@dataclass(slots=True)
+class StreamEvent:
+    """
+    串流的事件
+
+    參數:
+        kind: StreamEventKind (文字 / 程式碼輸入 / 執行記錄 / 工具呼叫)
+        value: 內容 (文字 / 程式碼輸入是合併後的delta)
+    """
+    kind: StreamEventKind
+    value: str
+
+def sse_frame(data: str, event: str | None = None) -> str:
+    """
+    文字 => SSE的frame (多行文字拆成多個「data: 」，所以文字裡有換行也不會讓frame提早結束)
+
+    參數:
+        data: 文字
+        event: 事件類型 (None = 不加「event: 」，用預設的message)
+    回傳:
+        str: 「event: 類型」+「data: 每一行」+ 空行
+    """
+    frame = "".join(f"data: {line}\n" for line in data.split("\n"))
+    if event is not None: frame = f"event: {event}\n{frame}"
+
+    return f"{frame}\n"
+
+class StreamClosed(Exception):
+    """
+    讀取端已經不讀了 (用來中斷背景的串流)
+    """
+
+class DeltaBuffer:
+    """
+    合併同類型的delta (累積到max_bytes個字元，或第一個delta等了max_delay秒就送出)
+    """
+    def __init__(self, max_bytes: int, max_delay: float) -> None:
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.kind = None
+        self.parts: list[str] = []
+        self.size = 0
+        self.deadline = None
+
+    def timeout(self) -> float | None:
+        """
+        最多還能等多久就要送出 (None = 沒有累積中的delta)
+        """
+        if self.deadline is None: return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def add(self, kind: StreamEventKind, value: str) -> tuple[StreamEvent, ...]:
+        """
+        加入一個delta
+
+        回傳:
+            tuple[StreamEvent, ...]: 要送出的事件們 (通常是空的)
+        """
+        if kind not in CoalescedKinds: return (*self.flush(), StreamEvent(kind, value))
+
+        flushed = self.flush() if self.kind is not None and kind != self.kind else ()
+
+        if self.kind is None:
+            self.kind = kind
+            self.deadline = time.monotonic() + self.max_delay
+
+        self.parts.append(value)
+        self.size += len(value)
+
+        if self.size >= self.max_bytes or time.monotonic() >= self.deadline: return (*flushed, *self.flush())
+        return flushed
+
+    def flush(self) -> tuple[StreamEvent, ...]:
+        """
+        送出累積中的delta
+        """
+        if self.kind is None: return ()
+
+        event = StreamEvent(self.kind, "".join(self.parts))
+        self.kind, self.size, self.deadline = None, 0, None
+        self.parts.clear()
+
+        return (event,)
+
+class StreamPipeline:
+    """
+    串流事件的管線
+      - 讀取串流的是背景的執行緒 / Task，事件放進有上限的佇列
+      - 讀取端太慢時，佇列滿了背景就會停下來不讀串流 (backpressure)
+      - 讀取端中途不讀了，背景的串流會被中斷
+    """
+    End = object()
+
+    def __init__(self, max_bytes: int = 32, max_delay: float = 0.02, max_pending: int = 256) -> None:
+        """
+        初始化
+
+        參數:
+            max_bytes: 累積多少字元就送出 (<= 1 = 不合併)
+            max_delay: 第一個delta最多等多久就送出 (秒)
+            max_pending: 佇列最多暫存的delta數量
+        """
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.max_pending = max(1, max_pending)
+
+    def run(self, produce: Callable[[Callable[[StreamEventKind, str], None]], None]) -> Iterator[StreamEvent]:
+        """
+        在背景執行produce，合併它送出的delta
+
+        參數:
+            produce: 讀取串流的函式 (參數 = emit(kind, value)，佇列滿了emit會卡住)
+        回傳:
+            Iterator[StreamEvent]
+        """
+        pending = queue.Queue(maxsize=self.max_pending)
+        closed = threading.Event()
+
+        def emit(kind: StreamEventKind, value: str) -> None:
+            while True:
+                if closed.is_set(): raise StreamClosed()
+                try:
+                    return pending.put((kind, value), timeout=0.1)
+                except queue.Full:
+                    continue
+
+        def worker() -> None:
+            try:
+                produce(emit)
+                emit(self.End, None)
+            except StreamClosed:
+                pass
+            except BaseException as error:
+                try:
+                    emit(self.End, error)
+                except StreamClosed:
+                    pass
+
+        threading.Thread(target=worker, name="StreamPipeline", daemon=True).start()
+        buffer = DeltaBuffer(self.max_bytes, self.max_delay)
+
+        try:
+            while True:
+                try:
+                    kind, value = pending.get(timeout=buffer.timeout())
+                except queue.Empty:
+                    yield from buffer.flush()
+                    continue
+
+                if kind is self.End:
+                    yield from buffer.flush()
+                    if value is not None: raise value
+                    return
+
+                yield from buffer.add(kind, value)
+        finally:
+            closed.set()
+
+    async def run_async(self, produce: Callable[[Callable[[StreamEventKind, str], Awaitable[None]]], Awaitable[None]]) -> AsyncIterator[StreamEvent]:
+        """
+        在背景Task執行produce，合併它送出的delta (非同步版本)
+
+        參數:
+            produce: 讀取串流的coroutine函式 (參數 = await emit(kind, value)，佇列滿了emit會等待)
+        回傳:
+            AsyncIterator[StreamEvent]
+        """
+        pending = asyncio.Queue(maxsize=self.max_pending)
+
+        async def emit(kind: StreamEventKind, value: str) -> None:
+            await pending.put((kind, value))
+
+        async def worker() -> None:
+            try:
+                await produce(emit)
+                await emit(self.End, None)
+            except Exception as error:
+                await emit(self.End, error)
+
+        task = asyncio.create_task(worker())
+        buffer = DeltaBuffer(self.max_bytes, self.max_delay)
+
+        try:
+            while True:
+                try:
+                    timeout = buffer.timeout()
+                    kind, value = await (pending.get() if timeout is None else asyncio.wait_for(pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    for event in buffer.flush(): yield event
+                    continue
+
+                if kind is self.End:
+                    for event in buffer.flush(): yield event
+                    if value is not None: raise value
+                    return
+
+                for event in buffer.add(kind, value): yield event
+        finally:
+            task.cancel()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import asyncio
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from openai.types.beta.thread import Thread
+
+class ThreadReserve:
+    """
+    預先建立好的Thread們 (第一次對話時直接拿來用，不用等threads.create)
+      - 拿走一個後，在背景補回size個
+      - size = 0 時不預先建立，take()直接建立新的
+    """
+    def __init__(self, size: int = 0) -> None:
+        """
+        初始化
+
+        參數:
+            size: 預先建立的Thread數量
+        """
+        self.size = max(0, size)
+        self.threads: deque[Thread] = deque()
+        self.filling = False
+        self.task: asyncio.Task | None = None
+        self.lock = threading.Lock()
+
+    def take(self, create: Callable[[], Thread]) -> Thread:
+        """
+        拿一個預先建立好的Thread (沒有就直接建立)
+
+        參數:
+            create: 建立Thread的函式 (client.beta.threads.create)
+        回傳:
+            Thread
+        """
+        thread = self.__pop__()
+        self.fill(create)
+
+        return thread or create()
+
+    async def take_async(self, create: Callable[[], Awaitable[Thread]]) -> Thread:
+        """
+        拿一個預先建立好的Thread (非同步版本)
+
+        參數:
+            create: 建立Thread的coroutine函式 (client.beta.threads.create)
+        回傳:
+            Thread
+        """
+        thread = self.__pop__()
+        self.fill_async(create)
+
+        return thread or await create()
+
+    def fill(self, create: Callable[[], Thread]) -> None:
+        """
+        在背景執行緒補滿size個Thread (同時只有一個在補)
+
+        參數:
+            create: 建立Thread的函式
+        """
+        if not self.__start_filling__(): return
+
+        def worker() -> None:
+            try:
+                while len(self) < self.size: self.__push__(create())
+            except Exception:
+                pass
+            finally:
+                with self.lock: self.filling = False
+
+        threading.Thread(target=worker, name="ThreadReserve", daemon=True).start()
+
+    def fill_async(self, create: Callable[[], Awaitable[Thread]]) -> None:
+        """
+        在背景Task補滿size個Thread (非同步版本，要在event loop裡呼叫)
+
+        參數:
+            create: 建立Thread的coroutine函式
+        """
+        if not self.__start_filling__(): return
+
+        async def worker() -> None:
+            try:
+                while len(self) < self.size: self.__push__(await create())
+            except Exception:
+                pass
+            finally:
+                with self.lock: self.filling = False
+
+        self.task = asyncio.get_running_loop().create_task(worker())
+
+    def __len__(self) -> int:
+        with self.lock: return len(self.threads)
+
+    def __start_filling__(self) -> bool:
+        with self.lock:
+            if self.filling or len(self.threads) >= self.size: return False
+            self.filling = True
+            return True
+
+    def __pop__(self) -> Thread | None:
+        with self.lock: return self.threads.popleft() if self.threads else None
+
+    def __push__(self, thread: Thread) -> None:
+        with self.lock: self.threads.append(thread)
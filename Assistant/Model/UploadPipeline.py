@@ -0,0 +1,176 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from returns.result import Result, Success, Failure
+from Assistant.Model.FileManifest import FileManifest, file_sha256
+
+@dataclass
+class UploadReport:
+    """
+    批次上傳的結果
+
+    參數:
+        uploaded: 這次真的有上傳的 FILE_ID => 檔案名稱
+        reused: 內容沒變、直接沿用的 FILE_ID => 檔案名稱
+        failed: 上傳失敗的 檔案名稱 => 錯誤
+    """
+    uploaded: dict[str, str] = field(default_factory=dict)
+    reused: dict[str, str] = field(default_factory=dict)
+    failed: dict[str, Exception] = field(default_factory=dict)
+
+    @property
+    def files(self) -> dict[str, str]:
+        """
+        可以使用的 FILE_ID => 檔案名稱 (上傳 + 沿用)
+        """
+        return { **self.reused, **self.uploaded }
+
+class UploadPipeline:
+    """
+    平行上傳 + 內容雜湊去重
+      - 最多max_workers個檔案同時在處理 (讀檔 / 雜湊 / 上傳)
+      - 用清單檔記住 SHA-256 => FILE_ID，內容沒變的檔案不會再上傳
+      - 同一批裡內容一樣的檔案只上傳一次 (第一個檔案上傳，其它的等它的FILE_ID)
+      - 每個檔案各自回報成功 / 失敗，不會因為一個失敗就中斷
+    """
+    def __init__(self, manifest: FileManifest, max_workers: int = 4) -> None:
+        """
+        初始化
+
+        參數:
+            manifest: 雜湊清單 (SHA-256 => { file_id, filename, uploaded_at })
+            max_workers: 最多同時處理的檔案數量
+        """
+        self.manifest = manifest
+        self.max_workers = max(1, max_workers)
+
+    def run(self, files: dict[str, str], upload: Callable[[str], Result[str, Exception]], exists: Callable[[str], bool]) -> UploadReport:
+        """
+        批次上傳
+
+        參數:
+            files: 檔案名稱 => 檔案路徑
+            upload: 上傳單一檔案的函式 (檔案名稱 => Result[<FILE_ID>, Exception])
+            exists: 檢查遠端FILE_ID是否還存在的函式
+        回傳:
+            UploadReport
+        """
+        report = UploadReport()
+        flights: dict[str, Future] = {}
+        lock = threading.Lock()
+
+        def task(item: tuple[str, str]) -> None:
+            filename, file_path = item
+
+            try:
+                digest = file_sha256(file_path)
+            except Exception as error:
+                report.failed[filename] = error
+                return
+
+            with lock:
+                flight = flights.get(digest)
+                leader = flight is None
+                if leader: flight = flights[digest] = Future()
+
+            if not leader:
+                file_id = flight.result()
+                if file_id: report.reused[file_id] = filename; return
+
+            file_id = None
+
+            try:
+                file_id = self.__reusable_file_id__(digest, exists)
+                if file_id: report.reused[file_id] = filename; return
+
+                file_id = self.__record__(report, filename, digest, upload(filename))
+            finally:
+                if leader: flight.set_result(file_id)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(files)))) as executor:
+            list(executor.map(task, files.items()))
+
+        self.manifest.save()
+        return report
+
+    async def run_async(self, files: dict[str, str], upload: Callable[[str], Awaitable[Result[str, Exception]]], exists: Callable[[str], Awaitable[bool]]) -> UploadReport:
+        """
+        批次上傳 (非同步版本)
+
+        參數:
+            files: 檔案名稱 => 檔案路徑
+            upload: 上傳單一檔案的coroutine函式 (檔案名稱 => Result[<FILE_ID>, Exception])
+            exists: 檢查遠端FILE_ID是否還存在的coroutine函式
+        回傳:
+            UploadReport
+        """
+        report = UploadReport()
+        semaphore = asyncio.Semaphore(self.max_workers)
+        flights: dict[str, asyncio.Future] = {}
+
+        async def task(filename: str, file_path: str) -> None:
+            async with semaphore:
+                try:
+                    digest = await asyncio.to_thread(file_sha256, file_path)
+                except Exception as error:
+                    report.failed[filename] = error
+                    return
+
+            flight = flights.get(digest)
+            leader = flight is None
+
+            if leader:
+                flight = flights[digest] = asyncio.get_running_loop().create_future()
+            else:
+                file_id = await flight
+                if file_id: report.reused[file_id] = filename; return
+
+            file_id = None
+
+            try:
+                async with semaphore:
+                    entry = self.manifest.get(digest)
+                    if entry and await exists(entry["file_id"]): file_id = entry["file_id"]; report.reused[file_id] = filename; return
+
+                    file_id = self.__record__(report, filename, digest, await upload(filename))
+            finally:
+                if leader: flight.set_result(file_id)
+
+        await asyncio.gather(*(task(filename, file_path) for filename, file_path in files.items()))
+        await asyncio.to_thread(self.manifest.save)
+
+        return report
+
+    def __reusable_file_id__(self, digest: str, exists: Callable[[str], bool]) -> str | None:
+        """
+        清單裡有同樣內容、而且遠端還存在的FILE_ID
+
+        參數:
+            digest: 檔案的SHA-256
+            exists: 檢查遠端FILE_ID是否還存在的函式
+        回傳:
+            str | None
+        """
+        entry = self.manifest.get(digest)
+        if entry and exists(entry["file_id"]): return entry["file_id"]
+
+        return None
+
+    def __record__(self, report: UploadReport, filename: str, digest: str, result: Result[str, Exception]) -> str | None:
+        """
+        記錄上傳的結果
+
+        回傳:
+            str | None: 上傳成功的FILE_ID (失敗 = None)
+        """
+        match result:
+            case Failure(error):
+                report.failed[filename] = error
+                return None
+            case Success(file_id):
+                report.uploaded[file_id] = filename
+                self.manifest.set(digest, { "file_id": file_id, "filename": filename, "uploaded_at": int(time.time()) })
+                return file_id
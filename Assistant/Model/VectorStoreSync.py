@@ -0,0 +1,153 @@
+import os
+from dataclasses import dataclass, field
+from Assistant.Model.FileManifest import FileManifest, file_sha256
+
+@dataclass
+class VectorStoreSyncPlan:
+    """
+    資料夾 => VectorStore 同步時要做的事
+
+    參數:
+        added: 新增的檔案們 (相對路徑)
+        replaced: 內容有變的檔案們 (相對路徑 => 舊的FILE_ID)
+        removed: 被刪掉的檔案們 (相對路徑 => 舊的FILE_ID)
+        unchanged: 沒有變的檔案們 (相對路徑)
+        stats: 要上傳的檔案們的 (相對路徑 => { sha256, mtime, size })
+    """
+    added: list[str] = field(default_factory=list)
+    replaced: dict[str, str] = field(default_factory=dict)
+    removed: dict[str, str] = field(default_factory=dict)
+    unchanged: list[str] = field(default_factory=list)
+    stats: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def uploads(self) -> list[str]:
+        """
+        需要上傳的檔案們 (新增 + 內容有變)
+        """
+        return self.added + list(self.replaced.keys())
+
+@dataclass
+class VectorStoreSyncReport:
+    """
+    資料夾 => VectorStore 同步的結果
+
+    參數:
+        vector_store_id: VECTOR_STORE_ID
+        added: 新增的 相對路徑 => FILE_ID
+        replaced: 更新的 相對路徑 => FILE_ID
+        removed: 移除的相對路徑們
+        unchanged: 沒有變的檔案數量
+        failed: 失敗的 相對路徑 => 錯誤
+    """
+    vector_store_id: str
+    added: dict[str, str] = field(default_factory=dict)
+    replaced: dict[str, str] = field(default_factory=dict)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+    failed: dict[str, Exception] = field(default_factory=dict)
+
+class VectorStoreSync:
+    """
+    比對本地資料夾與清單檔 (相對路徑 => { sha256, file_id, mtime, size })，找出要新增 / 取代 / 移除的檔案
+      - mtime + size沒變 => 視為沒變，不用重算雜湊
+      - mtime有變但雜湊一樣 => 只更新清單的mtime
+    """
+    def __init__(self, folder_path: str, manifest: FileManifest, vector_store_id: str) -> None:
+        """
+        初始化
+
+        參數:
+            folder_path: 要同步的資料夾
+            manifest: 清單檔 (同一個清單檔可以記錄多個VectorStore)
+            vector_store_id: VECTOR_STORE_ID
+        """
+        self.folder_path = os.path.expanduser(folder_path)
+        self.manifest = manifest
+        self.vector_store_id = vector_store_id
+
+    def plan(self) -> VectorStoreSyncPlan:
+        """
+        比對資料夾與清單檔
+
+        回傳:
+            VectorStoreSyncPlan
+        """
+        plan = VectorStoreSyncPlan()
+        entries = self.entries()
+
+        for relative_path in self.files():
+            file_path = self.file_path(relative_path)
+            stat = os.stat(file_path)
+            entry = entries.pop(relative_path, None)
+
+            if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                plan.unchanged.append(relative_path)
+                continue
+
+            digest = file_sha256(file_path)
+
+            if entry and entry["sha256"] == digest:
+                self.commit(relative_path, entry["file_id"], { "sha256": digest, "mtime": stat.st_mtime, "size": stat.st_size })
+                plan.unchanged.append(relative_path)
+                continue
+
+            plan.stats[relative_path] = { "sha256": digest, "mtime": stat.st_mtime, "size": stat.st_size }
+            if entry: plan.replaced[relative_path] = entry["file_id"]
+            else: plan.added.append(relative_path)
+
+        plan.removed = { relative_path: entry["file_id"] for relative_path, entry in entries.items() }
+        return plan
+
+    def files(self) -> list[str]:
+        """
+        資料夾裡所有要同步的檔案 (相對路徑，略過 . 開頭的隱藏檔 / 資料夾)
+
+        回傳:
+            list[str]
+        """
+        relative_paths: list[str] = []
+
+        for root, folders, filenames in os.walk(self.folder_path):
+            folders[:] = sorted(folder for folder in folders if not folder.startswith("."))
+            for filename in sorted(filenames):
+                if filename.startswith("."): continue
+                relative_paths.append(os.path.relpath(os.path.join(root, filename), self.folder_path))
+
+        return relative_paths
+
+    def entries(self) -> dict[str, dict]:
+        """
+        清單檔裡屬於這個VectorStore的記錄
+
+        回傳:
+            dict[<相對路徑>, { sha256, file_id, mtime, size }]
+        """
+        prefix = self.__key__("")
+        return { key[len(prefix):]: entry for key, entry in self.manifest.items() if key.startswith(prefix) }
+
+    def file_path(self, relative_path: str) -> str:
+        return os.path.join(self.folder_path, relative_path)
+
+    def commit(self, relative_path: str, file_id: str, stat: dict) -> None:
+        """
+        記錄已經同步好的檔案
+
+        參數:
+            relative_path: 相對路徑
+            file_id: FILE_ID
+            stat: { sha256, mtime, size }
+        """
+        self.manifest.set(self.__key__(relative_path), { **stat, "file_id": file_id })
+
+    def forget(self, relative_path: str) -> None:
+        """
+        移除已經不在的檔案記錄
+
+        參數:
+            relative_path: 相對路徑
+        """
+        self.manifest.remove(self.__key__(relative_path))
+
+    def __key__(self, relative_path: str) -> str:
+        return f"{self.vector_store_id}/{relative_path}"
@@ -1,6 +1,10 @@
 import time
-from returns.result import Success, Failure
+Started_At = time.perf_counter()
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from returns.result import Result, Success, Failure
 from Assistant.CustomAssistant import CustomAssistant
+from Assistant.Model.Constant import RunWaitMode
 
 Api_Key = "<你猜猜>"
 Assistant_Id = "<不告訴你>"
@@ -9,28 +13,54 @@ Instructions = "想要翻身致富、一夜暴富嗎？不用等待,馬上行動
 
 File_Folder_Path = "~/NoMoneyNoTalking"
 Download_Folder_Path = "~/NoMoneyNoHoney"
+Run_Wait_Mode = RunWaitMode.Streaming
+Thread_Reserve = 1
 
 def main():
 
-    menuAssistant = CustomAssistant(Api_Key, File_Folder_Path, Download_Folder_Path)
+    imported_at = time.perf_counter()
+    startup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Startup").submit(start)
+
+    print(f"啟動時間: import {imported_at - Started_At:.3f}s / 顯示輸入提示 {time.perf_counter() - Started_At:.3f}s")
+    chat(startup)
+
+def start() -> tuple[CustomAssistant, Result[str, Exception], dict[str, float]]:
+    """
+    在背景建立助手 (使用者打字的同時載入openai / 取得助手 / 預先建立Thread)
+    """
+    timings = {}
+    started_at = time.perf_counter()
+
+    menuAssistant = CustomAssistant(Api_Key, File_Folder_Path, Download_Folder_Path, thread_reserve=Thread_Reserve)
+    timings["init"] = time.perf_counter() - started_at
+
     # result = menuAssistant.create(Assistant_Name, Instructions, "gpt-4o")
-    result = menuAssistant.use_by_id(Assistant_Id)
+    result = menuAssistant.use_by_id(Assistant_Id, lazy=True)
+    timings["use_by_id"] = time.perf_counter() - started_at - timings["init"]
 
-    match result:
-        case Failure(error): print(error)
-        case Success(name): chat(menuAssistant, name)
+    return menuAssistant, result, timings
 
-def chat(assistant: CustomAssistant, name: str):
+def chat(startup: Future, mode: RunWaitMode = Run_Wait_Mode):
 
-    print(f"開始跟<{name}>對話 (輸入 'quit' 結束)：")
+    print("開始對話 (輸入 'quit' 結束)：")
+    assistant = None
 
     while True:
 
         user_input = input("You: ")
         if user_input.lower() == 'quit': break
-        
+
+        if assistant is None:
+            waited_at = time.perf_counter()
+            assistant, result, timings = startup.result()
+            result = result.bind(lambda _: assistant.ready())
+
+            match result:
+                case Failure(error): print(error); break
+                case Success(name): print(f"<{name}> (init {timings['init']:.3f}s / use_by_id {timings['use_by_id']:.3f}s / 等待 {time.perf_counter() - waited_at:.3f}s)")
+
         time.sleep(0.5)
-        result = assistant.chat(user_input)
+        result = assistant.chat(user_input, mode=mode)
         match result:
             case Success(value): print(value)
             case Failure(error): print(error)
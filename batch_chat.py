@@ -0,0 +1,33 @@
+import argparse
+from returns.result import Success, Failure
+from Assistant.CustomAssistant import CustomAssistant
+from Assistant.Model.Constant import RunWaitMode
+
+Api_Key = "<你猜猜>"
+Assistant_Id = "<不告訴你>"
+
+File_Folder_Path = "~/NoMoneyNoTalking"
+Download_Folder_Path = "~/NoMoneyNoHoney"
+
+def main():
+
+    parser = argparse.ArgumentParser(description="批次對話 (JSONL的問題們 => JSONL的回答們，中斷後再執行會續跑)")
+    parser.add_argument("input", help="輸入的JSONL檔 (每行: \"問題\" 或 {\"content\": \"問題\", \"id\": ...})")
+    parser.add_argument("output", help="輸出的JSONL檔")
+    parser.add_argument("--checkpoint", help="進度檔的路徑 (預設: <輸出檔>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="最多同時進行的對話數量")
+    parser.add_argument("--streaming", action="store_true", help="用串流事件等待Run完成 (預設: 輪詢)")
+    arguments = parser.parse_args()
+
+    assistant = CustomAssistant(Api_Key, File_Folder_Path, Download_Folder_Path)
+    result = assistant.use_by_id(Assistant_Id, lazy=True)
+
+    match result:
+        case Failure(error): print(error)
+        case Success(_):
+            mode = RunWaitMode.Streaming if arguments.streaming else RunWaitMode.Polling
+            report = assistant.batch_chat(arguments.input, arguments.output, arguments.checkpoint, concurrency=arguments.concurrency, mode=mode)
+            print(f"成功 {report.succeeded} / 失敗 {report.failed} / 略過 {report.skipped} / 格式錯誤 {report.invalid}，花費 {report.elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import argparse
+import tempfile
+from Assistant.CustomAssistant import CustomAssistant
+from Assistant.Model.RequestScheduler import RequestScheduler
+from Assistant.Benchmark.MockServer import MockServer
+from Assistant.Benchmark.BenchmarkRunner import BenchmarkRunner, format_report, save_report, load_report
+from Assistant.Benchmark.Scenarios import BenchmarkScenarios
+
+def main():
+
+    parser = argparse.ArgumentParser(description="CustomAssistant效能測試 (連到本地的MockServer，不會呼叫真的API)")
+    parser.add_argument("--scenarios", nargs="*", choices=BenchmarkScenarios.Names, help="要執行的情境 (預設全部)")
+    parser.add_argument("--iterations", type=int, default=20, help="每個情境計時的次數")
+    parser.add_argument("--concurrency", type=int, default=1, help="同時執行的數量")
+    parser.add_argument("--batch-size", type=int, default=10, help="批次上傳 / 刪除時，每次操作的數量")
+    parser.add_argument("--latency", type=float, default=0.02, help="每個請求的延遲 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.005, help="延遲的隨機變動範圍 (秒)")
+    parser.add_argument("--queue-time", type=float, default=0.05, help="Run排隊的時間 (秒)")
+    parser.add_argument("--run-time", type=float, default=0.2, help="Run執行中的時間 (秒)")
+    parser.add_argument("--seed", type=int, default=42, help="延遲的亂數種子")
+    parser.add_argument("--output", help="結果存成JSON的路徑")
+    parser.add_argument("--compare", help="之前存的JSON (顯示跟它的差異)")
+    arguments = parser.parse_args()
+
+    parameters = { key: value for key, value in vars(arguments).items() if key not in ("output", "compare") }
+
+    with MockServer(latency=arguments.latency, jitter=arguments.jitter, queue_time=arguments.queue_time, run_time=arguments.run_time, seed=arguments.seed) as server, tempfile.TemporaryDirectory() as folder_path:
+
+        scheduler = RequestScheduler(requests_per_minute=None, tokens_per_minute=None)
+        assistant = CustomAssistant("benchmark", folder_path, folder_path, scheduler=scheduler, base_url=server.base_url)
+        assistant.create("benchmark", "效能測試用的助手")
+
+        runner = BenchmarkRunner(iterations=arguments.iterations, concurrency=arguments.concurrency)
+        results = BenchmarkScenarios(assistant, runner, batch_size=arguments.batch_size).run(arguments.scenarios)
+
+    print(format_report(results, load_report(arguments.compare) if arguments.compare else None))
+    if arguments.output: save_report(arguments.output, results, parameters)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import asyncio
+import argparse
+from returns.result import Success, Failure
+from Assistant.AsyncCustomAssistant import AsyncCustomAssistant
+from Assistant.Gateway.ChatGateway import ChatGateway
+
+Api_Key = "<你猜猜>"
+Assistant_Id = "<不告訴你>"
+
+File_Folder_Path = "~/NoMoneyNoTalking"
+Download_Folder_Path = "~/NoMoneyNoHoney"
+
+async def main():
+
+    parser = argparse.ArgumentParser(description="把助手的對話開放成HTTP服務 (POST /chat、GET / POST /chat/stream、GET /health)")
+    parser.add_argument("--host", default="127.0.0.1", help="監聽的位址")
+    parser.add_argument("--port", type=int, default=8080, help="監聽的Port")
+    parser.add_argument("--max-streams", type=int, default=1000, help="同時進行中的對話上限")
+    parser.add_argument("--heartbeat", type=float, default=15.0, help="SSE閒置多久送一次keep-alive (秒)")
+    parser.add_argument("--warm-up", type=int, default=4, help="啟動時先建立的連線數")
+    arguments = parser.parse_args()
+
+    assistant = AsyncCustomAssistant(Api_Key, File_Folder_Path, Download_Folder_Path, max_sessions=arguments.max_streams * 10)
+    if arguments.warm_up: await assistant.client_factory.warm_up_async(Api_Key, connections=arguments.warm_up)
+
+    result = await assistant.use_by_id(Assistant_Id)
+
+    match result:
+        case Failure(error): print(error)
+        case Success(name):
+            print(f"<{name}> 開始服務: http://{arguments.host}:{arguments.port}")
+            await ChatGateway(assistant, arguments.host, arguments.port, max_streams=arguments.max_streams, heartbeat=arguments.heartbeat).serve()
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from returns.result import Success
+from Assistant.Model.BatchChat import BatchChat
+
+class BatchChatTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+
+        self.input_path = os.path.join(folder.name, "input.jsonl")
+        self.output_path = os.path.join(folder.name, "output.jsonl")
+        self.checkpoint_path = f"{self.output_path}.checkpoint"
+
+        with open(self.input_path, "w", encoding="utf-8") as file:
+            for index in range(6): file.write(json.dumps({ "content": f"問題{index}", "id": index }, ensure_ascii=False) + "\n")
+
+    def checkpoint(self) -> dict:
+        with open(self.checkpoint_path, "r", encoding="utf-8") as file: return json.load(file)
+
+    def outputs(self) -> list[dict]:
+        with open(self.output_path, "r", encoding="utf-8") as file: return [json.loads(line) for line in file]
+
+    def test_resume_skips_completed_lines(self) -> None:
+        with open(self.checkpoint_path, "w", encoding="utf-8") as file: json.dump({ "watermark": 2, "done": [3] }, file)
+
+        lines = []
+        report = BatchChat(concurrency=2).run(self.input_path, self.output_path, lambda content, line: lines.append(line) or Success(content), self.checkpoint_path)
+
+        self.assertEqual(sorted(lines), [2, 4, 5])
+        self.assertEqual((report.succeeded, report.skipped), (3, 3))
+        self.assertEqual(self.checkpoint(), { "watermark": 6, "done": [] })
+
+    def test_resume_after_cancelled_line_async(self) -> None:
+        async def interrupted(content: str, line: int):
+            if line == 3: raise asyncio.CancelledError()
+            return Success(content)
+
+        asyncio.run(BatchChat(concurrency=1).run_async(self.input_path, self.output_path, interrupted, self.checkpoint_path))
+        self.assertEqual(self.checkpoint(), { "watermark": 3, "done": [4, 5] })
+
+        lines = []
+
+        async def chat(content: str, line: int):
+            lines.append(line)
+            return Success(content)
+
+        report = asyncio.run(BatchChat(concurrency=2).run_async(self.input_path, self.output_path, chat, self.checkpoint_path))
+
+        self.assertEqual(lines, [3])
+        self.assertEqual(report.skipped, 5)
+        self.assertEqual(sorted(entry["line"] for entry in self.outputs()), list(range(6)))
+
+    def test_exception_is_written_as_failure(self) -> None:
+        def chat(content: str, line: int):
+            if line == 1: raise RuntimeError("連線中斷")
+            return Success(content)
+
+        report = BatchChat(concurrency=3).run(self.input_path, self.output_path, chat, self.checkpoint_path)
+
+        self.assertEqual((report.succeeded, report.failed), (5, 1))
+        self.assertEqual(self.checkpoint()["watermark"], 6)
+        self.assertIn({ "line": 1, "id": 1, "content": "問題1", "error": "連線中斷" }, self.outputs())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import time
+import asyncio
+import unittest
+from types import SimpleNamespace
+from Assistant.Model.GarbageCollector import GarbageCollector
+
+Old = time.time() - 7 * 86400
+
+def page(items: list) -> SimpleNamespace:
+    return SimpleNamespace(data=items, has_more=False, has_next_page=lambda: False)
+
+class FakeClient:
+    """
+    只有GarbageCollector會用到的列表API (同步 / 非同步)
+    """
+    def __init__(self, assistants: list, vector_stores: dict[str, list[str]], files: list[str], asynchronous: bool = False) -> None:
+        wrap = self.__async__ if asynchronous else (lambda value: value)
+
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(list=lambda **_: wrap(page(assistants))),
+            vector_stores=SimpleNamespace(
+                list=lambda **_: wrap(page([SimpleNamespace(id=id, created_at=Old, usage_bytes=0) for id in vector_stores])),
+                files=SimpleNamespace(list=lambda vector_store_id, **_: wrap(page([SimpleNamespace(id=id) for id in vector_stores[vector_store_id]]))),
+            ),
+        )
+        self.files = SimpleNamespace(list=lambda **_: wrap(page([SimpleNamespace(id=id, created_at=Old, bytes=1) for id in files])))
+
+    async def __async__(self, value):
+        return value
+
+def assistant(vector_store_ids: list[str]) -> SimpleNamespace:
+    return SimpleNamespace(tool_resources=SimpleNamespace(code_interpreter=None, file_search=SimpleNamespace(vector_store_ids=vector_store_ids)))
+
+class GarbageCollectorTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.assistants = [assistant(["vs_assistant"])]
+        self.vector_stores = { "vs_assistant": ["file-in-assistant-vs"], "vs_thread": ["file-in-vs"], "vs_orphan": ["file-in-orphan-vs"] }
+        self.files = ["file-in-assistant-vs", "file-in-vs", "file-in-orphan-vs", "file-orphan"]
+
+    def test_files_in_protected_vector_store_are_kept(self) -> None:
+        deleted = []
+        client = FakeClient(self.assistants, self.vector_stores, self.files)
+        report = GarbageCollector().run(client, deleted.append, deleted.append, dry_run=False, protected_ids=["vs_thread"])
+
+        self.assertTrue(report.complete)
+        self.assertIn("file-in-vs", report.referenced_file_ids)
+        self.assertEqual(set(deleted), { "vs_orphan", "file-in-orphan-vs", "file-orphan" })
+
+    def test_files_in_protected_vector_store_are_kept_async(self) -> None:
+        deleted = []
+
+        async def delete(id: str) -> None:
+            deleted.append(id)
+
+        client = FakeClient(self.assistants, self.vector_stores, self.files, asynchronous=True)
+        report = asyncio.run(GarbageCollector().run_async(client, delete, delete, dry_run=False, protected_ids=["vs_thread"]))
+
+        self.assertTrue(report.complete)
+        self.assertEqual(set(deleted), { "vs_orphan", "file-in-orphan-vs", "file-orphan" })
+
+    def test_files_in_recent_vector_store_are_kept(self) -> None:
+        client = FakeClient(self.assistants, self.vector_stores, self.files)
+        report = GarbageCollector(grace_period=30 * 86400).run(client, print, print)
+
+        self.assertIn("file-in-vs", report.referenced_file_ids)
+        self.assertIn("file-in-orphan-vs", report.referenced_file_ids)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+import httpx
+from Assistant.Model.RequestCoalescer import RequestCoalescer, CoalescingTransport, AsyncCoalescingTransport
+
+class SlowTransport(httpx.BaseTransport):
+    """
+    GET會卡住直到release被設定 (讓同時到的請求有機會合併)
+    """
+    def __init__(self) -> None:
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self.lock: self.calls += 1
+        if request.method != "GET": return httpx.Response(200, json={ "path": request.url.path })
+
+        self.started.set()
+        self.release.wait(5.0)
+        return httpx.Response(200, json={ "path": request.url.path })
+
+class AsyncSlowTransport(httpx.AsyncBaseTransport):
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if request.method == "GET": await asyncio.wait_for(self.release.wait(), 5.0)
+        return httpx.Response(200, json={ "path": request.url.path })
+
+class RequestCoalescerTests(unittest.TestCase):
+
+    def test_concurrent_identical_reads_share_one_upstream_request(self) -> None:
+        upstream = SlowTransport()
+        client = httpx.Client(transport=CoalescingTransport(RequestCoalescer(), upstream), base_url="http://test")
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(client.get, "/v1/assistants/asst_a") for _ in range(10)]
+            threading.Timer(0.2, upstream.release.set).start()
+            responses = [future.result() for future in futures]
+
+        self.assertEqual(upstream.calls, 1)
+        self.assertTrue(all(response.json() == { "path": "/v1/assistants/asst_a" } for response in responses))
+
+    def test_concurrent_identical_reads_share_one_upstream_request_async(self) -> None:
+        async def main() -> tuple[int, list]:
+            upstream = AsyncSlowTransport()
+            client = httpx.AsyncClient(transport=AsyncCoalescingTransport(RequestCoalescer(), upstream), base_url="http://test")
+            asyncio.get_running_loop().call_later(0.1, upstream.release.set)
+            responses = await asyncio.gather(*(client.get("/v1/threads/thread_a/messages") for _ in range(20)))
+            return upstream.calls, responses
+
+        calls, responses = asyncio.run(main())
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(responses), 20)
+
+    def test_detach_only_affects_written_resource(self) -> None:
+        coalescer = RequestCoalescer()
+        coalescer.join(("messages_a",), "/v1/threads/thread_a/messages", Future)
+        coalescer.join(("threads",), "/v1/threads", Future)
+        coalescer.join(("assistant",), "/v1/assistants/asst_a", Future)
+
+        coalescer.detach("/v1/threads/thread_b/runs")
+        self.assertFalse(coalescer.join(("messages_a",), "/v1/threads/thread_a/messages", Future)[1])
+        self.assertTrue(coalescer.join(("threads",), "/v1/threads", Future)[1])
+
+        coalescer.detach("/v1/threads/thread_a/messages")
+        self.assertTrue(coalescer.join(("messages_a",), "/v1/threads/thread_a/messages", Future)[1])
+        self.assertFalse(coalescer.join(("assistant",), "/v1/assistants/asst_a", Future)[1])
+
+    def test_write_detaches_in_flight_read_of_same_resource(self) -> None:
+        upstream = SlowTransport()
+        client = httpx.Client(transport=CoalescingTransport(RequestCoalescer(), upstream), base_url="http://test")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(client.get, "/v1/threads/thread_a/messages")
+            upstream.started.wait(5.0)
+
+            client.post("/v1/threads/thread_a/messages", json={ "content": "hi" })
+            second = executor.submit(client.get, "/v1/threads/thread_a/messages")
+            upstream.release.set()
+            first.result(), second.result()
+
+        self.assertEqual(upstream.calls, 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import time
+import asyncio
+import threading
+import unittest
+import httpx
+from Assistant.Model.Constant import RequestPriority
+from Assistant.Model.RequestScheduler import RequestScheduler, SchedulingTransport, AsyncSchedulingTransport
+
+def responses(*statuses: int, headers: dict[str, str] | None = None):
+    """
+    依序回傳statuses的handler (最後一個之後一直回傳最後一個)，記錄每次請求的時間
+    """
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(time.monotonic())
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return httpx.Response(status, headers=headers if status == 429 else None, json={})
+
+    return handler, calls
+
+class RequestSchedulerTests(unittest.TestCase):
+
+    def test_retry_after_429_pauses_every_request(self) -> None:
+        scheduler = RequestScheduler(backoff=0.01)
+        handler, calls = responses(429, 200, headers={ "retry-after-ms": "200" })
+        client = httpx.Client(transport=SchedulingTransport(scheduler, httpx.MockTransport(handler)), base_url="http://test")
+
+        response = client.get("/v1/assistants")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.2)
+        self.assertGreater(scheduler.paused_until, calls[0])
+
+    def test_retry_after_429_async(self) -> None:
+        scheduler = RequestScheduler(backoff=0.01)
+        handler, calls = responses(429, 429, 200, headers={ "retry-after-ms": "50" })
+
+        async def main() -> httpx.Response:
+            async with httpx.AsyncClient(transport=AsyncSchedulingTransport(scheduler, httpx.MockTransport(handler)), base_url="http://test") as client:
+                return await client.get("/v1/assistants")
+
+        self.assertEqual(asyncio.run(main()).status_code, 200)
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_max_retries(self) -> None:
+        handler, calls = responses(503)
+        client = httpx.Client(transport=SchedulingTransport(RequestScheduler(max_retries=2, backoff=0.01), httpx.MockTransport(handler)), base_url="http://test")
+
+        self.assertEqual(client.get("/v1/assistants").status_code, 503)
+        self.assertEqual(len(calls), 3)
+
+    def test_pause_blocks_acquire(self) -> None:
+        scheduler = RequestScheduler()
+        scheduler.pause(0.2)
+
+        self.assertGreaterEqual(scheduler.acquire(RequestPriority.Interactive), 0.15)
+
+    def test_uncalibrated_until_rate_limit_headers(self) -> None:
+        scheduler = RequestScheduler()
+        self.assertLess(sum(scheduler.acquire(RequestPriority.Interactive) for _ in range(1000)), 0.5)
+
+        scheduler.observe(httpx.Headers({ "x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0" }))
+        self.assertGreater(scheduler.acquire(RequestPriority.Interactive), 0.5)
+
+    def test_background_waits_for_interactive_at_most_max_priority_wait(self) -> None:
+        scheduler = RequestScheduler(max_priority_wait=0.2)
+        with scheduler.condition: scheduler.waiting[RequestPriority.Interactive] += 1
+
+        waited = []
+        worker = threading.Thread(target=lambda: waited.append(scheduler.acquire(RequestPriority.Background)))
+        worker.start()
+        worker.join(2.0)
+
+        self.assertEqual(len(waited), 1)
+        self.assertGreaterEqual(waited[0], 0.2)
+        self.assertLess(waited[0], 1.0)
+
+if __name__ == "__main__":
+    unittest.main()
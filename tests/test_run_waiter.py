@@ -0,0 +1,112 @@
+import time
+import asyncio
+import unittest
+from unittest import mock
+from openai import OpenAI, AsyncOpenAI
+from Assistant.Benchmark.MockServer import MockServer, MockHandler
+from Assistant.Model.RunWaiter import RunWaiter
+
+def silent_stream(self, state, run: dict) -> None:
+    """
+    只送出標頭，直到Run被取消前都不送任何事件 (模擬卡住的串流)
+    """
+    self.send_response(200)
+    self.send_header("Content-Type", "text/event-stream")
+    self.end_headers()
+    self.close_connection = True
+    while run["status"] == "queued": time.sleep(0.01)
+
+class RunWaiterTests(unittest.TestCase):
+
+    def start(self, stall_rate: float = 0.0) -> OpenAI:
+        self.server = MockServer(latency=0.0, jitter=0.0, queue_time=0.05, run_time=0.05, stall_rate=stall_rate).start()
+        self.addCleanup(self.server.stop)
+
+        client = OpenAI(api_key="test", base_url=self.server.base_url, max_retries=0)
+        self.assistant_id = client.beta.assistants.create(model="gpt-4o", name="test").id
+        self.thread_id = client.beta.threads.create().id
+        return client
+
+    def test_wait_until_completed(self) -> None:
+        client = self.start()
+        run = client.beta.threads.runs.create(thread_id=self.thread_id, assistant_id=self.assistant_id)
+        run, timing = RunWaiter(initial_delay=0.01, max_delay=0.05).wait(client, self.thread_id, run, timeout=5.0)
+
+        self.assertEqual(run.status, "completed")
+        self.assertFalse(timing.timed_out)
+        self.assertEqual(timing.statuses[-1], "completed")
+        self.assertGreater(timing.poll_count, 0)
+
+    def test_wait_cancels_stalled_run_at_deadline(self) -> None:
+        client = self.start(stall_rate=1.0)
+        run = client.beta.threads.runs.create(thread_id=self.thread_id, assistant_id=self.assistant_id)
+
+        started_at = time.monotonic()
+        run, timing = RunWaiter(initial_delay=0.01, max_delay=0.05).wait(client, self.thread_id, run, timeout=0.3)
+
+        self.assertTrue(timing.timed_out)
+        self.assertEqual(run.status, "cancelled")
+        self.assertLess(time.monotonic() - started_at, 2.0)
+
+    def test_wait_hedges_queued_run(self) -> None:
+        client = self.start(stall_rate=1.0)
+        run = client.beta.threads.runs.create(thread_id=self.thread_id, assistant_id=self.assistant_id)
+
+        def hedge():
+            self.server.state.stall_rate = 0.0
+            return client.beta.threads.create_and_run(assistant_id=self.assistant_id, thread={ "messages": [{ "role": "user", "content": "hi" }] })
+
+        winner, timing = RunWaiter(initial_delay=0.01, max_delay=0.05).wait(client, self.thread_id, run, timeout=5.0, hedge=hedge, hedge_after=0.1)
+
+        self.assertTrue(timing.hedged)
+        self.assertEqual(winner.status, "completed")
+        self.assertNotEqual(winner.thread_id, self.thread_id)
+        self.assertEqual(client.beta.threads.runs.retrieve(thread_id=self.thread_id, run_id=run.id).status, "cancelled")
+
+    def test_stream_until_completed(self) -> None:
+        client = self.start()
+        run, timing = RunWaiter().stream(client, self.thread_id, self.assistant_id, timeout=5.0)
+
+        self.assertEqual(run.status, "completed")
+        self.assertFalse(timing.timed_out)
+        self.assertEqual(timing.poll_count, 0)
+
+    def test_stream_cancels_silent_stream_at_deadline(self) -> None:
+        client = self.start(stall_rate=1.0)
+
+        with mock.patch.object(MockHandler, "__stream__", silent_stream):
+            started_at = time.monotonic()
+            run, timing = RunWaiter().stream(client, self.thread_id, self.assistant_id, timeout=0.3)
+
+        self.assertTrue(timing.timed_out)
+        self.assertEqual(run.status, "cancelled")
+        self.assertLess(time.monotonic() - started_at, 2.0)
+
+    def test_wait_async_cancels_stalled_run_at_deadline(self) -> None:
+        self.start(stall_rate=1.0)
+
+        async def main():
+            client = AsyncOpenAI(api_key="test", base_url=self.server.base_url, max_retries=0)
+            run = await client.beta.threads.runs.create(thread_id=self.thread_id, assistant_id=self.assistant_id)
+            return await RunWaiter(initial_delay=0.01, max_delay=0.05).wait_async(client, self.thread_id, run, timeout=0.3)
+
+        run, timing = asyncio.run(main())
+
+        self.assertTrue(timing.timed_out)
+        self.assertEqual(run.status, "cancelled")
+
+    def test_stream_async_cancels_silent_stream_at_deadline(self) -> None:
+        self.start(stall_rate=1.0)
+
+        async def main():
+            client = AsyncOpenAI(api_key="test", base_url=self.server.base_url, max_retries=0)
+            return await RunWaiter().stream_async(client, self.thread_id, self.assistant_id, timeout=0.3)
+
+        with mock.patch.object(MockHandler, "__stream__", silent_stream):
+            run, timing = asyncio.run(main())
+
+        self.assertTrue(timing.timed_out)
+        self.assertEqual(run.status, "cancelled")
+
+if __name__ == "__main__":
+    unittest.main()